@@ -0,0 +1,158 @@
+"""End-to-end throughput benchmark for VideoProcessor.process_video.
+
+Gemini and ElevenLabs are replaced by local stand-in servers with configurable
+latency; Whisper and ffmpeg run for real. Each concurrency level processes the
+same set of synthetic videos in a pool of worker processes and reports
+per-stage latency, peak RSS and jobs/hour as JSON.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_pipeline --durations 30 120 --concurrency 1 2 4 --output bench.json
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import resource
+import shutil
+import statistics
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from benchmarks.stub_servers import ElevenLabsStubHandler, GeminiStubHandler, start_server
+from benchmarks.synthetic_media import generate_video
+
+_processor = None
+
+
+def _init_worker():
+    global _processor
+    from services.video_processor import VideoProcessor
+
+    _processor = VideoProcessor()
+    # Load Whisper up front so model loading is not billed to the first job
+    _processor.whisper_model
+
+
+def _run_job(video_path: str, target_language: str, preserve_voice: bool) -> dict:
+    # Each job works on its own copy, since outputs are written next to the input
+    work_dir = tempfile.mkdtemp(prefix='bench_job_')
+    job_path = os.path.join(work_dir, os.path.basename(video_path))
+    shutil.copyfile(video_path, job_path)
+    try:
+        start = time.time()
+        result = _processor.process_video(job_path, target_language, preserve_voice=preserve_voice)
+        return {
+            'video': os.path.basename(video_path),
+            'status': result['status'],
+            'error': result.get('error'),
+            'seconds': time.time() - start,
+            'step_timing': result.get('step_timing', {}),
+            'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        }
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def _summarize(values: list) -> dict:
+    values = sorted(values)
+    return {
+        'mean': statistics.mean(values),
+        'p50': values[len(values) // 2],
+        'p95': values[min(len(values) - 1, int(len(values) * 0.95))],
+        'max': values[-1]
+    }
+
+
+def run_concurrency(videos: list, concurrency: int, repeats: int, target_language: str,
+                    preserve_voice: bool) -> dict:
+    jobs = videos * repeats
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=concurrency, mp_context=context, initializer=_init_worker) as pool:
+        # Make sure every worker has finished loading before the clock starts
+        list(pool.map(time.sleep, [0.5] * concurrency))
+        start = time.time()
+        results = list(pool.map(_run_job, jobs, [target_language] * len(jobs), [preserve_voice] * len(jobs)))
+        wall = time.time() - start
+
+    succeeded = [r for r in results if r['status'] == 'success']
+    stages = sorted({stage for r in succeeded for stage in r['step_timing']})
+    return {
+        'concurrency': concurrency,
+        'jobs': len(jobs),
+        'succeeded': len(succeeded),
+        'errors': [r['error'] for r in results if r['status'] != 'success'],
+        'wall_seconds': wall,
+        'jobs_per_hour': len(succeeded) / wall * 3600 if wall else 0.0,
+        'job_latency': _summarize([r['seconds'] for r in succeeded]) if succeeded else None,
+        'stage_latency': {
+            stage: _summarize([r['step_timing'][stage] for r in succeeded if stage in r['step_timing']])
+            for stage in stages
+        },
+        'peak_rss_mb': max(r['peak_rss_mb'] for r in results) if results else 0.0
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--durations', type=float, nargs='+', default=[30])
+    parser.add_argument('--codecs', nargs='+', default=['h264'])
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 2])
+    parser.add_argument('--repeats', type=int, default=1, help="Times each video is processed per level")
+    parser.add_argument('--gemini-latency', type=float, default=0.5)
+    parser.add_argument('--tts-latency', type=float, default=0.8)
+    parser.add_argument('--target-language', default='Spanish')
+    parser.add_argument('--preserve-voice', action='store_true')
+    parser.add_argument('--whisper-model', default='tiny')
+    parser.add_argument('--media-dir', default='benchmark_media')
+    parser.add_argument('--output', help="Write the JSON report to this file")
+    args = parser.parse_args()
+
+    gemini = start_server(GeminiStubHandler, args.gemini_latency)
+    elevenlabs = start_server(ElevenLabsStubHandler, args.tts_latency)
+
+    # Workers are spawned, so they pick these up when they import the services
+    os.environ.update({
+        'GEMINI_API_KEY': 'benchmark',
+        'GEMINI_API_ENDPOINT': f"http://127.0.0.1:{gemini.server_port}",
+        'ELEVENLABS_API_KEY': 'benchmark',
+        'ELEVENLABS_API_URL': f"http://127.0.0.1:{elevenlabs.server_port}",
+        'WHISPER_MODEL_SIZES': args.whisper_model,
+        # Every job must do the full work, not hit a previous run's cache
+        'RESULT_CACHE_ENABLED': 'false',
+    })
+
+    videos = [
+        generate_video(args.media_dir, duration, codec)
+        for codec in args.codecs
+        for duration in args.durations
+    ]
+
+    report = {
+        'config': {
+            'videos': [os.path.basename(v) for v in videos],
+            'repeats': args.repeats,
+            'gemini_latency': args.gemini_latency,
+            'tts_latency': args.tts_latency,
+            'whisper_model': args.whisper_model,
+            'preserve_voice': args.preserve_voice,
+            'cpu_count': os.cpu_count(),
+            'started_at': time.strftime('%Y-%m-%dT%H:%M:%S')
+        },
+        'runs': []
+    }
+    for concurrency in args.concurrency:
+        print(f"Running {len(videos) * args.repeats} jobs at concurrency {concurrency}...")
+        run = run_concurrency(videos, concurrency, args.repeats, args.target_language, args.preserve_voice)
+        print(f"  {run['jobs_per_hour']:.1f} jobs/hour, peak RSS {run['peak_rss_mb']:.0f} MB")
+        report['runs'].append(run)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output)
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""Compare single-call Whisper transcription against the segment-parallel engine.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_transcription path/to/audio.wav --workers 2 4 8
+"""
+import argparse
+import json
+import os
+import time
+
+from services.model_registry import get_whisper_model
+from services.transcription_engine import TranscriptionEngine, SAMPLE_RATE, load_wav
+
+
+def run_benchmark(audio_path: str, workers_list: list, model_size: str, window_seconds: float) -> dict:
+    audio = load_wav(audio_path)
+    model = get_whisper_model(model_size)
+
+    start = time.time()
+    baseline = model.transcribe(audio)
+    baseline_time = time.time() - start
+
+    report = {
+        'audio_path': audio_path,
+        'audio_seconds': len(audio) / SAMPLE_RATE,
+        'model_size': model_size,
+        'cpu_count': os.cpu_count(),
+        'baseline': {
+            'seconds': baseline_time,
+            'segments': len(baseline['segments'])
+        },
+        'parallel': []
+    }
+
+    for workers in workers_list:
+        engine = TranscriptionEngine(model, model_size, workers=workers, window_seconds=window_seconds)
+        # Warm the pool so model loading is not counted as transcription time
+        engine.transcribe(audio[:SAMPLE_RATE * 2])
+        try:
+            start = time.time()
+            result = engine.transcribe(audio)
+            elapsed = time.time() - start
+        finally:
+            engine.shutdown()
+        report['parallel'].append({
+            'workers': workers,
+            'seconds': elapsed,
+            'speedup': baseline_time / elapsed if elapsed else None,
+            'segments': len(result['segments'])
+        })
+        print(f"workers={workers}: {elapsed:.2f}s ({baseline_time / elapsed:.2f}x)")
+
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('audio_path', help="16 kHz mono WAV, e.g. the output of extract_audio")
+    parser.add_argument('--workers', type=int, nargs='+', default=[2, 4])
+    parser.add_argument('--model-size', default='base')
+    parser.add_argument('--window-seconds', type=float, default=60.0)
+    parser.add_argument('--output', help="Write the JSON report to this file")
+    args = parser.parse_args()
+
+    report = run_benchmark(args.audio_path, args.workers, args.model_size, args.window_seconds)
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output)
+    print(output)
@@ -0,0 +1,112 @@
+"""Compare Whisper transcription profiles (model size x quantization) for speed and accuracy.
+
+Each profile transcribes the same audio in-process with the configured torch
+thread count. Accuracy is the word error rate against ``--reference`` (a
+plain-text transcript), or, without one, against the first profile's output,
+so list the most accurate profile first.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_whisper_profiles path/to/audio.wav \\
+        --profiles small:none base:none base:int8 tiny:int8 --language en --threads 4
+"""
+import argparse
+import json
+import os
+import re
+import time
+
+from services.model_registry import get_whisper_model, registry
+from services.transcription_engine import SAMPLE_RATE, load_wav
+
+
+def _words(text: str) -> list:
+    return re.sub(r"[^\w\s']", ' ', text.lower()).split()
+
+
+def word_error_rate(reference: str, hypothesis: str) -> float:
+    """Word-level edit distance divided by the reference length."""
+    ref, hyp = _words(reference), _words(hypothesis)
+    if not ref:
+        return 0.0 if not hyp else 1.0
+    previous = list(range(len(hyp) + 1))
+    for i, ref_word in enumerate(ref, start=1):
+        current = [i] + [0] * len(hyp)
+        for j, hyp_word in enumerate(hyp, start=1):
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ref_word != hyp_word))
+        previous = current
+    return previous[-1] / len(ref)
+
+
+def run_benchmark(audio_path: str, profiles: list, language: str = None, reference: str = None) -> dict:
+    import torch
+
+    audio = load_wav(audio_path)
+    audio_seconds = len(audio) / SAMPLE_RATE
+    report = {
+        'audio_path': audio_path,
+        'audio_seconds': audio_seconds,
+        'language': language,
+        'threads': torch.get_num_threads(),
+        'reference': 'file' if reference is not None else profiles[0],
+        'profiles': []
+    }
+
+    for profile in profiles:
+        size, _, quantization = profile.partition(':')
+        quantization = quantization or 'none'
+
+        start = time.time()
+        model = get_whisper_model(size, quantization)
+        load_seconds = time.time() - start
+
+        options = {'fp16': False}
+        if language:
+            options['language'] = language
+        start = time.time()
+        result = model.transcribe(audio, **options)
+        elapsed = time.time() - start
+
+        if reference is None:
+            reference = result['text']
+        entry = {
+            'profile': profile,
+            'load_seconds': load_seconds,
+            'seconds': elapsed,
+            'realtime_factor': elapsed / audio_seconds if audio_seconds else None,
+            'wer': word_error_rate(reference, result['text']),
+            'detected_language': result.get('language'),
+            'model_bytes': registry.stats()['models'][-1]['bytes']
+        }
+        report['profiles'].append(entry)
+        print(f"{profile}: {elapsed:.2f}s (RTF {entry['realtime_factor']:.3f}), WER {entry['wer']:.3f}")
+        # Keep only the profile under test resident
+        registry.clear()
+
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('audio_path', help="16 kHz mono WAV, e.g. the output of extract_audio")
+    parser.add_argument('--profiles', nargs='+', default=['small:none', 'base:none', 'base:int8', 'tiny:int8'],
+                        help="size:quantization pairs, quantization being none or int8")
+    parser.add_argument('--language', help="Language hint passed to Whisper, e.g. en (default: auto-detect)")
+    parser.add_argument('--reference', help="Plain-text reference transcript for WER")
+    parser.add_argument('--threads', type=int, default=os.cpu_count(), help="torch threads")
+    parser.add_argument('--output', help="Write the JSON report to this file")
+    args = parser.parse_args()
+
+    import torch
+
+    torch.set_num_threads(args.threads)
+    reference_text = None
+    if args.reference:
+        with open(args.reference) as f:
+            reference_text = f.read()
+
+    report = run_benchmark(args.audio_path, args.profiles, args.language, reference_text)
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output)
+    print(output)
@@ -0,0 +1,132 @@
+"""Local stand-ins for the Gemini and ElevenLabs APIs with configurable latency.
+
+Point the pipeline at them with ``GEMINI_API_ENDPOINT`` and ``ELEVENLABS_API_URL``.
+"""
+import json
+import re
+import subprocess
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Rough speaking rate used to size synthesized clips
+CHARS_PER_SECOND = 15
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    latency = 0.0
+
+    def log_message(self, format, *args):
+        pass
+
+    def _read_body(self) -> bytes:
+        length = int(self.headers.get('Content-Length') or 0)
+        return self.rfile.read(length) if length else b''
+
+    def _send(self, status: int, body: bytes, content_type: str):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_json(self, payload, status: int = 200):
+        self._send(status, json.dumps(payload).encode('utf-8'), 'application/json')
+
+
+class GeminiStubHandler(_StubHandler):
+    """Answers ``generateContent`` by tagging each line with the target language."""
+
+    def do_POST(self):
+        body = json.loads(self._read_body() or b'{}')
+        time.sleep(self.latency)
+        if not self.path.split('?')[0].endswith(':generateContent'):
+            self._send_json({'error': {'message': 'not found'}}, 404)
+            return
+
+        prompt = ''.join(
+            part.get('text', '')
+            for content in body.get('contents', [])
+            for part in content.get('parts', [])
+        )
+        self._send_json({
+            'candidates': [{
+                'content': {'parts': [{'text': self._translate(prompt)}], 'role': 'model'},
+                'finishReason': 'STOP',
+                'index': 0
+            }]
+        })
+
+    @staticmethod
+    def _translate(prompt: str) -> str:
+        language = re.search(r'to ([^.\n]+)\.', prompt)
+        tag = f"[{language.group(1).strip()}]" if language else "[translated]"
+        if 'Lines:' in prompt:
+            lines = json.loads(prompt.split('Lines:', 1)[1].strip())
+            return json.dumps([f"{tag} {line}" for line in lines], ensure_ascii=False)
+        text = prompt.split('Text to translate:', 1)[-1].strip().strip("'")
+        return f"{tag} {text}"
+
+
+class ElevenLabsStubHandler(_StubHandler):
+    """Returns a sine-tone MP3 sized to the request text, and fake voice ids."""
+
+    _clips = {}
+    _clips_lock = threading.Lock()
+
+    def do_POST(self):
+        body = self._read_body()
+        time.sleep(self.latency)
+        if self.path.startswith('/v1/voices/add'):
+            self._send_json({'voice_id': 'stub-voice'})
+        elif self.path.startswith('/v1/text-to-speech/'):
+            text = json.loads(body or b'{}').get('text', '')
+            self._send(200, self._clip(len(text) / CHARS_PER_SECOND), 'audio/mpeg')
+        else:
+            self._send_json({'detail': 'not found'}, 404)
+
+    def do_DELETE(self):
+        time.sleep(self.latency)
+        self._send_json({'status': 'ok'})
+
+    @classmethod
+    def _clip(cls, seconds: float) -> bytes:
+        # Clips are cached per tenth of a second so ffmpeg runs once per length
+        seconds = max(0.3, round(seconds, 1))
+        with cls._clips_lock:
+            if seconds not in cls._clips:
+                cls._clips[seconds] = subprocess.run(
+                    ['ffmpeg', '-loglevel', 'error', '-f', 'lavfi',
+                     '-i', f'sine=frequency=220:duration={seconds}',
+                     '-ac', '1', '-ar', '24000', '-f', 'mp3', 'pipe:1'],
+                    check=True, capture_output=True
+                ).stdout
+            return cls._clips[seconds]
+
+
+def start_server(handler_class, latency: float = 0.0, port: int = 0) -> ThreadingHTTPServer:
+    """Start a stub server in a daemon thread and return it (``server_port`` has the port)."""
+    handler = type(handler_class.__name__, (handler_class,), {'latency': latency})
+    server = ThreadingHTTPServer(('127.0.0.1', port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--gemini-port', type=int, default=8101)
+    parser.add_argument('--elevenlabs-port', type=int, default=8102)
+    parser.add_argument('--gemini-latency', type=float, default=0.5)
+    parser.add_argument('--tts-latency', type=float, default=0.8)
+    args = parser.parse_args()
+
+    start_server(GeminiStubHandler, args.gemini_latency, args.gemini_port)
+    start_server(ElevenLabsStubHandler, args.tts_latency, args.elevenlabs_port)
+    print(f"GEMINI_API_ENDPOINT=http://127.0.0.1:{args.gemini_port}")
+    print(f"ELEVENLABS_API_URL=http://127.0.0.1:{args.elevenlabs_port}")
+    while True:
+        time.sleep(3600)
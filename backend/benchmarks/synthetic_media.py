@@ -0,0 +1,51 @@
+"""Generate synthetic test videos with ffmpeg's lavfi sources."""
+import os
+import subprocess
+
+# codec name -> (container extension, video codec, audio codec)
+CODECS = {
+    'h264': ('.mp4', 'libx264', 'aac'),
+    'mpeg4': ('.avi', 'mpeg4', 'libmp3lame'),
+    'vp9': ('.mkv', 'libvpx-vp9', 'libopus'),
+}
+
+
+def generate_video(output_dir: str, duration: float, codec: str = 'h264',
+                   size: str = '640x360', rate: int = 25) -> str:
+    """Write a test-pattern video whose audio alternates tone bursts and silence.
+
+    The 3 s on / 1 s off gating gives silence splitting and VAD real
+    boundaries to find.
+    """
+    extension, vcodec, acodec = CODECS[codec]
+    output_path = os.path.join(output_dir, f"synthetic_{codec}_{int(duration)}s{extension}")
+    if os.path.exists(output_path):
+        return output_path
+
+    os.makedirs(output_dir, exist_ok=True)
+    audio = (
+        f"aevalsrc='0.3*sin(2*PI*(180+40*sin(2*PI*0.5*t))*t)*lt(mod(t,4),3)'"
+        f":s=44100:d={duration}"
+    )
+    subprocess.run(
+        ['ffmpeg', '-loglevel', 'error', '-y',
+         '-f', 'lavfi', '-i', f'testsrc2=size={size}:rate={rate}:duration={duration}',
+         '-f', 'lavfi', '-i', audio,
+         '-c:v', vcodec, '-c:a', acodec, '-shortest', output_path],
+        check=True
+    )
+    return output_path
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--output-dir', default='benchmark_media')
+    parser.add_argument('--durations', type=float, nargs='+', default=[30, 120])
+    parser.add_argument('--codecs', nargs='+', default=['h264'], choices=sorted(CODECS))
+    args = parser.parse_args()
+
+    for codec in args.codecs:
+        for duration in args.durations:
+            print(generate_video(args.output_dir, duration, codec))
@@ -1,5 +1,12 @@
 from celery import Celery
+from typing import Optional
+from celery.signals import celeryd_after_setup, task_postrun, task_revoked, worker_process_init
 from services.video_processor import VideoProcessor
+from services import model_registry
+from services.artifact_store import get_artifact_store
+from services.job_registry import job_registry
+from services.status_stream import publish_status, report_progress
+from services.ffmpeg_executor import install_revoke_handler
 import os
 from dotenv import load_dotenv
 
@@ -9,10 +16,14 @@ load_dotenv()
 # Get Redis URL from environment variables, fallback to default if not set
 REDIS_URL = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
 
+# Tasks whose result is a job's result (the merge stages run under the pipeline's job id)
+FINAL_TASKS = ('celery_app.process_video_task', 'pipeline_tasks.merge_stage', 'pipeline_tasks.chunk_merge_stage')
+
 # Initialize Celery
 app = Celery('video_translator',
              broker=REDIS_URL,
-             backend=REDIS_URL)
+             backend=REDIS_URL,
+             include=['pipeline_tasks'])
 
 # Configure Celery
 app.conf.update(
@@ -23,11 +34,78 @@ app.conf.update(
     enable_utc=True,
     task_track_started=True,
     task_time_limit=3600,  # 1 hour timeout for tasks
+    # Pipeline stage tasks go to per-resource queues so each pool scales independently
+    task_routes={
+        'pipeline_tasks.extract_audio_stage': {'queue': 'ffmpeg'},
+        'pipeline_tasks.transcribe_stage': {'queue': 'cpu'},
+        'pipeline_tasks.translate_stage': {'queue': 'io'},
+        'pipeline_tasks.tts_stage': {'queue': 'io'},
+        'pipeline_tasks.separate_stage': {'queue': 'cpu'},
+        'pipeline_tasks.merge_stage': {'queue': 'ffmpeg'},
+        'pipeline_tasks.chunk_prepare_stage': {'queue': 'ffmpeg'},
+        'pipeline_tasks.chunk_window_stage': {'queue': 'cpu'},
+        'pipeline_tasks.chunk_merge_stage': {'queue': 'ffmpeg'},
+    },
+    # Long stages should not prefetch work away from idle workers on other nodes
+    worker_prefetch_multiplier=1,
 )
 
+@worker_process_init.connect
+def kill_ffmpeg_on_revoke(**kwargs):
+    """Make revoke(terminate=True) also stop the task's running ffmpeg processes."""
+    install_revoke_handler()
+
+@celeryd_after_setup.connect
+def record_worker_concurrency(sender=None, instance=None, **kwargs):
+    """Expose the pool size to the worker's processes so they split the cores between them."""
+    pool = str(instance.pool_cls).lower()
+    in_process = 'solo' in pool or 'gevent' in pool or 'eventlet' in pool
+    if not os.getenv('WORKER_CONCURRENCY'):
+        os.environ['WORKER_CONCURRENCY'] = '1' if in_process else str(instance.concurrency)
+    if 'solo' in pool:
+        # Solo workers run tasks in this process, which never sees worker_process_init
+        model_registry.configure_threads()
+
+@worker_process_init.connect
+def limit_torch_threads(**kwargs):
+    """Cap each forked process's torch threads at its share of the host's cores."""
+    print(f"Using {model_registry.configure_threads()} torch threads in this worker process")
+
+@worker_process_init.connect
+def warm_model_cache(**kwargs):
+    """Load models once per worker process so tasks reuse them."""
+    try:
+        model_registry.warm_up()
+    except Exception as e:
+        # Tasks will load lazily if warm-up fails (e.g. missing API key)
+        print(f"Model warm-up failed: {str(e)}")
+
+@task_postrun.connect
+def publish_final_status(sender=None, task_id=None, retval=None, state=None, **kwargs):
+    """Record a job's final status and push it to stream watchers once its result is stored."""
+    if sender.name in FINAL_TASKS and state in ('SUCCESS', 'FAILURE'):
+        job_registry.record_result(task_id, retval)
+        publish_status(task_id, state, retval)
+        release_job_slot(task_id)
+
+@task_revoked.connect
+def release_revoked_job(sender=None, request=None, **kwargs):
+    """Give a revoked job's fair-share slot back to its owner."""
+    if sender is not None and sender.name in FINAL_TASKS:
+        release_job_slot(request.id)
+
+def release_job_slot(task_id: str):
+    # Imported here since pipeline_tasks imports this module
+    from pipeline_tasks import scheduler
+    try:
+        scheduler.release(task_id)
+    except Exception as e:
+        print(f"Failed to release scheduler slot for {task_id}: {str(e)}")
+
 @app.task(bind=True)
-def process_video_task(self, file_path: str, target_language: str, preserve_voice: bool = True):
-    """Celery task for processing videos."""
+def process_video_task(self, file_path: str, target_language: str, preserve_voice: bool = True,
+                       content_hash: Optional[str] = None, options: Optional[dict] = None):
+    """Celery task for processing videos; ``options`` carries per-job settings."""
     try:
         # Update task state to processing
         self.update_state(state='PROCESSING',
@@ -36,21 +114,20 @@ def process_video_task(self, file_path: str, target_language: str, preserve_voic
         
         processor = VideoProcessor()
         
-        # Update progress for audio extraction
-        self.update_state(state='PROCESSING',
-                         meta={'current': 'Extracting audio...',
-                               'percent': 20})
-        
-        # Process the video
+        # Process the video, publishing throttled per-stage progress
         result = processor.process_video(
             video_path=file_path,
             target_language=target_language,
-            preserve_voice=preserve_voice
+            preserve_voice=preserve_voice,
+            content_hash=content_hash,
+            progress_callback=lambda meta: report_progress(self, meta),
+            options=options
         )
         
-        # Clean up the original file
+        # Clean up the original file, and its uploaded copy in the artifact store
         if os.path.exists(file_path):
             os.remove(file_path)
+        get_artifact_store().discard(file_path)
         
         return {
             'status': 'success',
@@ -61,6 +138,7 @@ def process_video_task(self, file_path: str, target_language: str, preserve_voic
         # Clean up on error
         if os.path.exists(file_path):
             os.remove(file_path)
+        get_artifact_store().discard(file_path)
         
         return {
             'status': 'error',
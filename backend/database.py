@@ -9,7 +9,8 @@ load_dotenv()
 # Get database URL
 db_url = os.getenv("DATABASE_URL")
 
-# Create engine with proper configuration for Supabase
+# Create engine with proper configuration for Supabase (left unset when no database
+# is configured, so modules importing this one still load)
 engine = create_engine(
     db_url,
     pool_size=20,
@@ -21,7 +22,7 @@ engine = create_engine(
         "sslmode": "require",
         "application_name": "video_translation_app"
     }
-)
+) if db_url else None
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
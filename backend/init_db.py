@@ -1,13 +1,43 @@
+from sqlalchemy import inspect, text
+
 from database import engine
 from models import Base
 import os
 from dotenv import load_dotenv
 
+
+def migrate(bind=None):
+    """Bring an existing database up to the current models.
+
+    ``create_all`` only creates missing tables, so columns and indexes added
+    to existing tables (e.g. ``translations.task_id``) are added here with
+    ``ALTER TABLE``/``CREATE INDEX``. Safe to run on every start.
+    """
+    bind = bind or engine
+    Base.metadata.create_all(bind=bind)
+    inspector = inspect(bind)
+    with bind.begin() as connection:
+        for table in Base.metadata.sorted_tables:
+            existing = {column['name'] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                column_type = column.type.compile(dialect=bind.dialect)
+                print(f"Adding column {table.name}.{column.name}")
+                connection.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
+
+            indexed = {index['name'] for index in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name not in indexed:
+                    print(f"Creating index {index.name}")
+                    index.create(bind=connection)
+
+
 def init_db():
     load_dotenv()
-    # Create all tables
-    Base.metadata.create_all(bind=engine)
+    # Create all tables, then add columns and indexes missing from older schemas
+    migrate()
     print("Database tables created successfully!")
 
 if __name__ == "__main__":
-    init_db() 
\ No newline at end of file
+    init_db()
@@ -1,16 +1,30 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException, Depends, Form
+from fastapi import FastAPI, UploadFile, File, HTTPException, Depends, Form, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
+from fastapi.responses import RedirectResponse, StreamingResponse
 from pydantic import BaseModel
-from typing import Optional
+from typing import Literal, Optional
 import os
-from datetime import datetime
 import uuid
+import ipaddress
 import json
 from celery_app import process_video_task
+from pipeline_tasks import scheduler
+from auth import get_optional_user
+from models import User
 from services.video_processor import VideoProcessor
+from services.status_stream import TERMINAL_STATUSES, StatusBroadcaster, status_payload
+from services.job_registry import job_registry, job_status_payload
+from services.artifact_store import get_artifact_store
+from services.tts_engine import default_tts_backend, local_tts_supports
+from services.download_engine import DownloadEngine, DownloadNotFoundError, RangeNotSatisfiableError, is_output
+from services.upload_engine import (
+    ALLOWED_EXTENSIONS,
+    UploadEngine,
+    UploadNotFoundError,
+    UploadOffsetError,
+    UploadTooLargeError,
+)
 import asyncio
-from fastapi import BackgroundTasks
 
 # Load environment variables
 from dotenv import load_dotenv
@@ -36,16 +50,140 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+upload_engine = UploadEngine(os.path.join("uploads"))
+download_engine = DownloadEngine(os.path.join("uploads"))
+artifact_store = get_artifact_store()
+status_broadcaster = StatusBroadcaster()
+
+# Seconds between SSE keep-alive comments, so proxies do not close idle streams
+STATUS_STREAM_KEEPALIVE = float(os.getenv('STATUS_STREAM_KEEPALIVE', '15'))
+
+# Seconds between sweeps that reclaim scheduler slots of jobs whose worker died
+SCHEDULER_RECONCILE_INTERVAL = float(os.getenv('SCHEDULER_RECONCILE_INTERVAL', '60'))
+
+# Reverse proxies whose X-Forwarded-For is trusted to name the real client
+TRUSTED_PROXIES = [
+    ipaddress.ip_network(proxy.strip(), strict=False)
+    for proxy in os.getenv('TRUSTED_PROXIES', '').split(',') if proxy.strip()
+]
+
+def _is_trusted_proxy(address: str) -> bool:
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(ip in network for network in TRUSTED_PROXIES)
+
+def client_address(request: Request) -> str:
+    """The client's IP, looking through X-Forwarded-For only as far as trusted proxies reach."""
+    address = request.client.host if request.client else 'unknown'
+    if not _is_trusted_proxy(address):
+        return address
+    forwarded = [hop.strip() for hop in request.headers.get('x-forwarded-for', '').split(',') if hop.strip()]
+    # Each trusted proxy appends the address it received from; the rightmost untrusted hop is the client
+    for hop in reversed(forwarded):
+        address = hop
+        if not _is_trusted_proxy(hop):
+            break
+    return address
+
+def job_owner(request: Request, user: Optional[User]) -> str:
+    """Fair-share key for a request: the signed-in user, else the client address."""
+    if user is not None:
+        return f"user:{user.id}"
+    return f"anon:{client_address(request)}"
+
+def enqueue_job(stored: dict, params: "TranslationParams", owner: str,
+                owner_id: Optional[int] = None) -> dict:
+    """Register a translation job and hand it to the scheduler.
+
+    The Celery task id is chosen up front so the job's ``translations`` row
+    exists, under the same id, before any worker reports progress for it.
+    The upload is published to the artifact store first, so a worker on any
+    node can fetch it. Returns the task id with the lane and estimated wait
+    the scheduler chose; raises ``ValueError`` (and discards the upload) if
+    the job's TTS backend cannot dub into its target language.
+    """
+    # Rejected before any work is queued, rather than failing after transcription and translation
+    if (params.tts_backend or default_tts_backend()) == 'local' and not local_tts_supports(params.target_language):
+        os.remove(stored['file_path'])
+        raise ValueError(f"Local TTS does not support {params.target_language}; use the elevenlabs backend")
+
+    task_id = str(uuid.uuid4())
+    estimate = scheduler.estimate(stored['file_path'], params.preserve_voice)
+    stored['duration'] = estimate['duration']
+    artifact_store.publish(stored['file_path'])
+    if artifact_store.remote:
+        # Removed before dispatch, so a worker on this node cannot race the deletion
+        os.remove(stored['file_path'])
+    job_registry.create_job(
+        task_id,
+        stored,
+        params.source_language,
+        params.target_language,
+        params.preserve_voice,
+        owner_id=owner_id
+    )
+    admission = scheduler.submit({
+        'task_id': task_id,
+        'file_path': stored['file_path'],
+        'target_language': params.target_language,
+        'preserve_voice': params.preserve_voice,
+        'content_hash': stored['sha256'],
+        'options': params.job_options(),
+        'duration': estimate['duration'],
+        'owner': owner,
+        'lane': estimate['lane'],
+        'cost': estimate['cost']
+    })
+    return {'task_id': task_id, **admission}
+
 # Models
 class TranslationParams(BaseModel):
     source_language: Optional[str] = "auto"
     target_language: str
     preserve_voice: bool = True
+    keep_original_audio: bool = False
+    # None uses the worker's MERGE_KEEP_BACKGROUND_AUDIO; keeps music and ambience outside speech
+    keep_background_audio: Optional[bool] = None
+    # None uses SEPARATE_BACKGROUND_AUDIO; mixes the dub over the source with its vocals removed
+    separate_background: Optional[bool] = None
+    # None uses the worker's TTS_BACKEND; "local" trades cloned voices for in-process synthesis
+    tts_backend: Optional[Literal['elevenlabs', 'local']] = None
+    # None uses the worker's TRANSLATION_BACKEND; "local" translates in-process without Gemini
+    translation_backend: Optional[Literal['gemini', 'local']] = None
+    # None picks the Whisper size from WHISPER_SIZE_BY_DURATION or the worker default
+    whisper_model: Optional[Literal['tiny', 'base', 'small', 'medium', 'large']] = None
+
+    def job_options(self) -> dict:
+        """Per-job settings passed through to the processing task."""
+        options = {'keep_original_audio': self.keep_original_audio}
+        if self.source_language and self.source_language.lower() != 'auto':
+            # A known source language lets Whisper skip language detection
+            options['source_language'] = self.source_language.lower()
+        if self.keep_background_audio is not None:
+            options['keep_background_audio'] = self.keep_background_audio
+        if self.separate_background is not None:
+            options['separate_background'] = self.separate_background
+        if self.whisper_model:
+            options['whisper_model'] = self.whisper_model
+        if self.tts_backend:
+            options['tts_backend'] = self.tts_backend
+        if self.translation_backend:
+            options['translation_backend'] = self.translation_backend
+        return options
 
 class TranslationResponse(BaseModel):
     task_id: str
     status: str
     message: str
+    content_hash: Optional[str] = None
+    lane: Optional[str] = None
+    estimated_wait_seconds: Optional[float] = None
+
+class UploadSessionRequest(BaseModel):
+    filename: str
+    size: int
 
 # Routes
 @app.get("/")
@@ -54,88 +192,224 @@ async def read_root():
 
 @app.post("/api/upload", response_model=TranslationResponse)
 async def upload_video(
+    request: Request,
     video_file: UploadFile = File(...),
-    translation_params: str = Form(...)
+    translation_params: str = Form(...),
+    current_user: Optional[User] = Depends(get_optional_user)
 ):
     try:
         # Parse translation parameters
         params = TranslationParams(**json.loads(translation_params))
         
         # Validate file format
-        if not video_file.filename.lower().endswith(('.mp4', '.avi', '.mov', '.mkv')):
+        if not video_file.filename.lower().endswith(ALLOWED_EXTENSIONS):
             raise HTTPException(status_code=400, detail="Unsupported file format")
         
-        # Create uploads directory if it doesn't exist
-        upload_dir = os.path.join("uploads")
-        os.makedirs(upload_dir, exist_ok=True)
+        # Stream the upload to disk in chunks
+        stored = await upload_engine.save(video_file)
+        stored['filename'] = video_file.filename
         
-        # Generate unique filename
-        file_extension = os.path.splitext(video_file.filename)[1]
-        unique_filename = f"{uuid.uuid4()}{file_extension}"
-        file_path = os.path.join(upload_dir, unique_filename)
+        # Register and schedule processing task
+        job = await asyncio.to_thread(
+            enqueue_job, stored, params, job_owner(request, current_user),
+            current_user.id if current_user else None
+        )
         
-        # Save uploaded file
-        with open(file_path, "wb") as buffer:
-            content = await video_file.read()
-            buffer.write(content)
+        return TranslationResponse(
+            task_id=job['task_id'],
+            status="queued",
+            message="Video upload successful. Processing started.",
+            content_hash=stored['sha256'],
+            lane=job['lane'],
+            estimated_wait_seconds=job['estimated_wait_seconds']
+        )
         
-        # Generate task ID
-        task_id = str(uuid.uuid4())
+    except json.JSONDecodeError:
+        raise HTTPException(status_code=400, detail="Invalid translation parameters format")
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/api/uploads")
+async def create_upload_session(session_request: UploadSessionRequest):
+    """Start a resumable multi-part upload."""
+    if not session_request.filename.lower().endswith(ALLOWED_EXTENSIONS):
+        raise HTTPException(status_code=400, detail="Unsupported file format")
+    try:
+        return upload_engine.create_session(session_request.filename, session_request.size)
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/api/uploads/{upload_id}")
+async def get_upload_session(upload_id: str):
+    """Report how many bytes of a resumable upload have been received."""
+    try:
+        return upload_engine.get_session(upload_id)
+    except UploadNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+@app.put("/api/uploads/{upload_id}")
+async def upload_chunk(upload_id: str, request: Request, offset: int = 0):
+    """Append the raw request body to a resumable upload at ``offset``."""
+    try:
+        return await upload_engine.append_chunk(upload_id, offset, request.stream())
+    except UploadNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except UploadOffsetError as e:
+        raise HTTPException(status_code=409, detail={"message": str(e), "offset": e.expected_offset})
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+
+@app.delete("/api/uploads/{upload_id}")
+async def abort_upload(upload_id: str):
+    """Abandon a resumable upload and discard what was received."""
+    try:
+        await asyncio.to_thread(upload_engine.abort, upload_id)
+        return {"upload_id": upload_id, "status": "aborted"}
+    except UploadNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except UploadOffsetError as e:
+        raise HTTPException(status_code=409, detail={"message": str(e), "offset": e.expected_offset})
+
+@app.post("/api/uploads/{upload_id}/complete", response_model=TranslationResponse)
+async def complete_upload(
+    request: Request,
+    upload_id: str,
+    translation_params: str = Form(...),
+    current_user: Optional[User] = Depends(get_optional_user)
+):
+    """Finalize a resumable upload and start processing it."""
+    try:
+        params = TranslationParams(**json.loads(translation_params))
+        stored = await upload_engine.complete(upload_id)
         
-        # Start processing task
-        process_video_task.delay(
-            file_path,
-            params.target_language,
-            params.preserve_voice
+        job = await asyncio.to_thread(
+            enqueue_job, stored, params, job_owner(request, current_user),
+            current_user.id if current_user else None
         )
         
         return TranslationResponse(
-            task_id=task_id,
+            task_id=job['task_id'],
             status="queued",
-            message="Video upload successful. Processing started."
+            message="Video upload successful. Processing started.",
+            content_hash=stored['sha256'],
+            lane=job['lane'],
+            estimated_wait_seconds=job['estimated_wait_seconds']
         )
         
     except json.JSONDecodeError:
         raise HTTPException(status_code=400, detail="Invalid translation parameters format")
+    except UploadNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except UploadOffsetError as e:
+        raise HTTPException(status_code=409, detail={"message": "Upload is incomplete", "offset": e.expected_offset})
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/status/{task_id}")
 async def get_status(task_id: str):
     try:
-        # Get task result from Celery
-        task = process_video_task.AsyncResult(task_id)
+        # Unfinished and failed jobs are answered from the job registry
+        job = await asyncio.to_thread(job_registry.get_job, task_id)
+        if job is not None and job['status'] != 'completed':
+            return job_status_payload(job)
         
-        if task.state == 'PENDING':
-            return {
-                "task_id": task_id,
-                "status": "queued",
-                "progress": {
-                    "step": "waiting",
-                    "percentage": 0
-                }
-            }
-        elif task.state == 'PROCESSING':
-            return {
-                "task_id": task_id,
-                "status": "processing",
-                "progress": task.info
-            }
-        elif task.state == 'SUCCESS':
-            return {
-                "task_id": task_id,
-                "status": "completed",
-                "result": task.get()
-            }
-        else:
-            return {
-                "task_id": task_id,
-                "status": "error",
-                "error": str(task.info)
-            }
+        # Completed results (and jobs without a registry row) come from Celery
+        task = process_video_task.AsyncResult(task_id)
+        return status_payload(task_id, task.state, task.info)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/queue")
+async def queue_stats():
+    """Queue depth and estimated wait for each scheduling lane."""
+    try:
+        return {"lanes": await asyncio.to_thread(scheduler.stats)}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/jobs")
+async def list_jobs(status: Optional[str] = None, limit: int = 50, offset: int = 0):
+    """List jobs newest-first from the job registry, optionally filtered by status."""
+    if not job_registry.enabled:
+        raise HTTPException(status_code=503, detail="Job registry is not configured")
+    if status is not None and status not in ('queued', 'processing', 'completed', 'error'):
+        raise HTTPException(status_code=400, detail="Unknown status")
+    try:
+        jobs = await asyncio.to_thread(job_registry.list_jobs, status, min(max(limit, 1), 200), max(offset, 0))
+        return {"jobs": jobs, "limit": limit, "offset": offset}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/status/{task_id}/stream")
+async def stream_status(task_id: str):
+    """Push status updates as server-sent events until the job completes or fails."""
+    async def events():
+        # Subscribe before reading the stored state so no update can fall in between
+        queue = await status_broadcaster.subscribe(task_id)
+        try:
+            task = process_video_task.AsyncResult(task_id)
+            payload = await asyncio.to_thread(lambda: status_payload(task_id, task.state, task.info))
+            while True:
+                yield f"data: {json.dumps(payload)}\n\n"
+                if payload["status"] in TERMINAL_STATUSES:
+                    return
+                while True:
+                    try:
+                        payload = await asyncio.wait_for(queue.get(), timeout=STATUS_STREAM_KEEPALIVE)
+                        break
+                    except asyncio.TimeoutError:
+                        yield ": keep-alive\n\n"
+        finally:
+            await status_broadcaster.unsubscribe(task_id, queue)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.on_event("startup")
+async def start_download_sweeper():
+    download_engine.start()
+    upload_engine.start()
+
+@app.on_event("startup")
+async def start_scheduler_reconciler():
+    """Periodically reclaim fair-share slots held by jobs that never reported back."""
+    async def reconcile_loop():
+        while True:
+            try:
+                await asyncio.to_thread(scheduler.reconcile)
+            except Exception as e:
+                print(f"Scheduler reconcile failed: {str(e)}")
+            await asyncio.sleep(SCHEDULER_RECONCILE_INTERVAL)
+
+    app.state.scheduler_reconciler = asyncio.get_running_loop().create_task(reconcile_loop())
+
+@app.on_event("startup")
+async def migrate_database():
+    """Add columns and tables newer code expects before the first job is recorded."""
+    if job_registry.enabled:
+        from init_db import migrate
+        await asyncio.to_thread(migrate)
+
+@app.on_event("shutdown")
+async def close_status_broadcaster():
+    await status_broadcaster.close()
+    await download_engine.stop()
+    await upload_engine.stop()
+    app.state.scheduler_reconciler.cancel()
+
 @app.post("/api/test-process")
 async def test_process(
     video_file: UploadFile = File(...),
@@ -146,22 +420,12 @@ async def test_process(
         params = TranslationParams(**json.loads(translation_params))
         
         # Validate file format
-        if not video_file.filename.lower().endswith(('.mp4', '.avi', '.mov', '.mkv')):
+        if not video_file.filename.lower().endswith(ALLOWED_EXTENSIONS):
             raise HTTPException(status_code=400, detail="Unsupported file format")
         
-        # Create uploads directory if it doesn't exist
-        upload_dir = os.path.join("uploads")
-        os.makedirs(upload_dir, exist_ok=True)
-        
-        # Generate unique filename
-        file_extension = os.path.splitext(video_file.filename)[1]
-        unique_filename = f"{uuid.uuid4()}{file_extension}"
-        file_path = os.path.join(upload_dir, unique_filename)
-        
-        # Save uploaded file
-        with open(file_path, "wb") as buffer:
-            content = await video_file.read()
-            buffer.write(content)
+        # Stream the upload to disk in chunks
+        stored = await upload_engine.save(video_file)
+        file_path = stored['file_path']
         
         # Run test process
         processor = VideoProcessor()
@@ -177,6 +441,10 @@ async def test_process(
         
     except json.JSONDecodeError:
         raise HTTPException(status_code=400, detail="Invalid translation parameters format")
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
     finally:
@@ -184,39 +452,37 @@ async def test_process(
         if 'file_path' in locals() and os.path.exists(file_path):
             os.remove(file_path)
 
-@app.get("/download/{file_path:path}")
-async def download_file(file_path: str):
-    """Download a processed video file and delete it after download."""
+@app.api_route("/download/{file_path:path}", methods=["GET", "HEAD"])
+async def download_file(file_path: str, request: Request):
+    """Download a processed video, with Range and ETag support.
+
+    The file is kept for repeat and resumed downloads and deleted once it has
+    been fully downloaded ``DOWNLOAD_MAX_COMPLETED`` times or its TTL expires.
+    """
     try:
-        # Ensure the file path is within the uploads directory
-        full_path = os.path.join("backend", file_path)
-        if not os.path.exists(full_path):
-            # Try without 'backend' prefix
-            full_path = file_path
-            if not os.path.exists(full_path):
-                raise HTTPException(status_code=404, detail="File not found")
-        
-        # Verify it's a video file
-        if not full_path.lower().endswith(('.mp4', '.avi', '.mov', '.mkv')):
-            raise HTTPException(status_code=400, detail="Invalid file type")
-        
-        # Create a background task to delete the file
-        async def delete_file():
-            try:
-                await asyncio.sleep(5)  # Wait a bit to ensure file is fully downloaded
-                if os.path.exists(full_path):
-                    os.remove(full_path)
-                    print(f"Successfully deleted file: {full_path}")
-            except Exception as e:
-                print(f"Error deleting file {full_path}: {str(e)}")
-        
-        return FileResponse(
-            full_path,
-            media_type='video/mp4',
-            filename=os.path.basename(full_path),
-            background=BackgroundTasks().add_task(delete_file)
+        if artifact_store.remote:
+            # Clients fetch straight from object storage with a short-lived signed URL,
+            # and only for outputs: uploads and intermediate artifacts share the bucket
+            if not is_output(file_path):
+                raise ValueError("Invalid file type")
+            if not await asyncio.to_thread(artifact_store.exists, file_path):
+                raise DownloadNotFoundError("File not found")
+            url = await asyncio.to_thread(artifact_store.download_url, file_path, os.path.basename(file_path))
+            return RedirectResponse(url, status_code=307)
+        return await asyncio.to_thread(
+            download_engine.response,
+            file_path,
+            range_header=request.headers.get('range'),
+            if_none_match=request.headers.get('if-none-match'),
+            if_range=request.headers.get('if-range'),
+            head=request.method == 'HEAD'
         )
-        
+    except DownloadNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except RangeNotSatisfiableError as e:
+        raise HTTPException(status_code=416, detail=str(e), headers={"Content-Range": f"bytes */{e.size}"})
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey, Float
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey, Float, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from datetime import datetime
@@ -41,16 +41,23 @@ class Video(Base):
 
 class Translation(Base):
     __tablename__ = "translations"
+    __table_args__ = (
+        # Job listings filter by status and page newest-first
+        Index("ix_translations_status_created_at", "status", "created_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
+    task_id = Column(String, unique=True, index=True)  # Celery task id (job id in DAG mode)
     video_id = Column(Integer, ForeignKey("videos.id"))
     source_language = Column(String)
     target_language = Column(String)
     status = Column(String)  # Using ProcessingStatus enum values
     progress = Column(Float, default=0.0)  # 0-100
+    current_step = Column(String, nullable=True)
     error_message = Column(String, nullable=True)
     preserve_voice = Column(Boolean, default=True)
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+    updated_at = Column(DateTime, default=datetime.utcnow)
     completed_at = Column(DateTime, nullable=True)
     
     # Output files
@@ -58,4 +65,15 @@ class Translation(Base):
     subtitle_path = Column(String, nullable=True)
     transcript_path = Column(String, nullable=True)
 
-    video = relationship("Video", back_populates="translations") 
\ No newline at end of file
+    video = relationship("Video", back_populates="translations") 
+
+class Voice(Base):
+    __tablename__ = "voices"
+
+    id = Column(Integer, primary_key=True, index=True)
+    voice_id = Column(String, unique=True, index=True)  # Provider's cloned voice id
+    provider = Column(String, default="elevenlabs")
+    fingerprint = Column(String)  # JSON list of floats from services.voice_registry.speaker_fingerprint
+    use_count = Column(Integer, default=1)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    last_used_at = Column(DateTime, default=datetime.utcnow, index=True)  # Least recently used is evicted first
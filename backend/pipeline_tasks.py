@@ -0,0 +1,564 @@
+import json
+import os
+import shutil
+import time
+import uuid
+from typing import Optional
+
+from celery import chain, chord
+
+from celery_app import app, process_video_task
+from services.artifact_store import get_artifact_store
+from services.chunking import plan_windows, stitch_transcripts, stitch_wavs
+from services.job_registry import job_registry
+from services.progress import ProgressReporter
+from services.scheduler import LANES, JobScheduler
+from services.source_separation import get_source_separator
+from services.status_stream import publish_status, report_progress
+from services.transcription_engine import load_wav
+from services.video_processor import VideoProcessor
+
+# Each stage is routed to a queue by resource type (see task_routes in celery_app):
+#   ffmpeg - audio extraction and final merge
+#   cpu    - Whisper transcription and background separation
+#   io     - Gemini translation and ElevenLabs speech (network-bound)
+# Jobs using a local translation or TTS backend send that stage to "cpu" instead.
+# Stages may run on different nodes, so each localizes its inputs from the
+# artifact store and publishes its outputs to it.
+#
+# Media of at least CHUNKED_MIN_SECONDS instead runs as fixed time windows:
+# one task per window transcribes, translates and dubs it (in parallel across
+# cpu workers), then a final task stitches the windows and merges. No task
+# holds more than one window's audio, so memory and task time stay bounded
+# however long the video is. Chunking is off by default: its stages run on the
+# ffmpeg and cpu queues, so enable it only where those workers are deployed.
+STAGE_RETRY_DELAY = int(os.getenv('STAGE_RETRY_DELAY', '10'))
+STAGE_MAX_RETRIES = int(os.getenv('STAGE_MAX_RETRIES', '2'))
+
+# "single" runs the whole pipeline in one task; "dag" chains per-stage tasks
+PIPELINE_MODE = os.getenv('PIPELINE_MODE', 'single').lower()
+
+# Default for jobs that do not set options['separate_background']
+SEPARATE_BACKGROUND_AUDIO = os.getenv('SEPARATE_BACKGROUND_AUDIO', 'false').lower() == 'true'
+
+# Media at least this long is processed window by window (0 disables chunking)
+CHUNKED_MIN_SECONDS = float(os.getenv('CHUNKED_MIN_SECONDS', '0'))
+# Audio from the start of a chunked job used to clone the speaker's voice once for every window
+CHUNKED_VOICE_SAMPLE_SECONDS = float(os.getenv('CHUNKED_VOICE_SAMPLE_SECONDS', '120'))
+
+_processor = None
+
+
+def get_processor() -> VideoProcessor:
+    """Return this worker process's shared VideoProcessor."""
+    global _processor
+    if _processor is None:
+        _processor = VideoProcessor()
+    return _processor
+
+
+def start_pipeline(file_path: str, target_language: str, preserve_voice: bool = True,
+                   content_hash: Optional[str] = None, job_id: Optional[str] = None,
+                   options: Optional[dict] = None) -> str:
+    """Queue the stage chain for a video and return the job id used for status lookups."""
+    job = _new_job(file_path, target_language, preserve_voice, content_hash, job_id, options)
+    job_id = job['job_id']
+
+    stages = [
+        extract_audio_stage.s(job),
+        transcribe_stage.s(),
+        _backend_stage(translate_stage, job['options'], 'translation_backend'),
+        _backend_stage(tts_stage, job['options'], 'tts_backend'),
+    ]
+    if job['options'].get('separate_background', SEPARATE_BACKGROUND_AUDIO):
+        stages.append(separate_stage.s())
+    # The merge stage runs under the job id, so its result is the job's result
+    stages.append(merge_stage.s().set(task_id=job_id))
+    workflow = chain(*stages)
+    workflow.apply_async(link_error=pipeline_failed.s(job_id, file_path))
+    return job_id
+
+
+def start_chunked_pipeline(file_path: str, target_language: str, duration: float, preserve_voice: bool = True,
+                           content_hash: Optional[str] = None, job_id: Optional[str] = None,
+                           options: Optional[dict] = None) -> str:
+    """Queue a long video as per-window tasks feeding one stitch-and-merge task; return the job id."""
+    job = _new_job(file_path, target_language, preserve_voice, content_hash, job_id, options)
+    windows = plan_windows(duration)
+    job.update(duration=duration, windows=len(windows))
+    print(f"Processing job {job['job_id']} ({duration:.0f}s) as {len(windows)} windows")
+
+    # The voice is cloned once up front; the chord's header tasks each receive the prepared job
+    workflow = chain(
+        chunk_prepare_stage.s(job),
+        chord(
+            [chunk_window_stage.s(window) for window in windows],
+            chunk_merge_stage.s(job).set(task_id=job['job_id'])
+        ),
+    )
+    workflow.apply_async(link_error=pipeline_failed.s(job['job_id'], file_path, len(windows)))
+    return job['job_id']
+
+
+def _new_job(file_path: str, target_language: str, preserve_voice: bool, content_hash: Optional[str],
+             job_id: Optional[str], options: Optional[dict]) -> dict:
+    return {
+        'job_id': job_id or str(uuid.uuid4()),
+        'video_path': file_path,
+        'target_language': target_language,
+        'preserve_voice': preserve_voice,
+        'content_hash': content_hash,
+        'options': options or {},
+        'started_at': time.time(),
+        'step_timing': {}
+    }
+
+
+def _backend_stage(task, options: dict, backend_option: str):
+    """Signature for a network-bound stage, moved to the cpu queue when the job runs it locally."""
+    signature = task.s()
+    if options.get(backend_option) == 'local':
+        signature = signature.set(queue='cpu')
+    return signature
+
+
+def dispatch_job(job: dict):
+    """Queue an admitted job under its pre-assigned task id."""
+    if 0 < CHUNKED_MIN_SECONDS <= job.get('duration', 0):
+        start_chunked_pipeline(job['file_path'], job['target_language'], job['duration'], job['preserve_voice'],
+                               job['content_hash'], job_id=job['task_id'], options=job.get('options'))
+        return
+    if PIPELINE_MODE == 'dag':
+        # Stages are routed by resource type, so lanes only govern admission here
+        start_pipeline(job['file_path'], job['target_language'], job['preserve_voice'],
+                       job['content_hash'], job_id=job['task_id'], options=job.get('options'))
+        return
+    process_video_task.apply_async(
+        (job['file_path'], job['target_language'], job['preserve_voice'], job['content_hash']),
+        {'options': job.get('options')},
+        task_id=job['task_id'],
+        queue=LANES[job['lane']]
+    )
+
+
+scheduler = JobScheduler(dispatch_job)
+
+
+def _reporter(task, job: dict, stage: str) -> ProgressReporter:
+    """Enter ``stage`` and return a reporter publishing under the job id rather than the stage's own task id."""
+    progress = ProgressReporter(lambda meta: report_progress(task, meta, task_id=job['job_id']))
+    progress.stage(stage)
+    return progress
+
+
+def _artifact_path(job: dict, suffix: str) -> str:
+    return job['video_path'].rsplit('.', 1)[0] + suffix
+
+
+def _run_stage(task, job: dict, name: str, func):
+    """Run one stage with timing and retry on failure."""
+    step_start = time.time()
+    try:
+        func()
+    except Exception as e:
+        print(f"Stage {name} failed for job {job['job_id']}: {str(e)}")
+        raise task.retry(exc=e, countdown=STAGE_RETRY_DELAY * (task.request.retries + 1))
+    job['step_timing'][name] = time.time() - step_start
+    return job
+
+
+@app.task(bind=True, max_retries=STAGE_MAX_RETRIES)
+def extract_audio_stage(self, job: dict) -> dict:
+    """Extract the 16 kHz mono WAV the later stages read by path."""
+    processor = get_processor()
+    _reporter(self, job, 'audio_extraction')
+
+    def run():
+        audio_path = processor.result_cache.fetch_file(
+            job['content_hash'], 'audio', {}, _artifact_path(job, '.wav')
+        )
+        if audio_path is None:
+            audio_path = processor.extract_audio(processor.artifact_store.localize(job['video_path']))
+            processor.result_cache.store_file(job['content_hash'], 'audio', {}, audio_path)
+        processor.artifact_store.publish(audio_path)
+        job['audio_path'] = audio_path
+        job['audio_duration'] = processor._get_audio_duration(audio_path)
+        _drop_local(job['video_path'], audio_path)
+
+    return _run_stage(self, job, 'audio_extraction', run)
+
+
+@app.task(bind=True, max_retries=STAGE_MAX_RETRIES)
+def transcribe_stage(self, job: dict) -> dict:
+    """Transcribe the extracted audio and persist the transcript as JSON."""
+    processor = get_processor()
+    progress = _reporter(self, job, 'transcription')
+    model_size = processor.whisper_size_for(job['video_path'], job['options'], duration=job['audio_duration'])
+    language = job['options'].get('source_language')
+    params = processor.transcription_params(model_size, language)
+    # Later stages extend their cache keys with the transcript's parameters
+    job['transcription_params'] = params
+
+    def run():
+        transcription = processor.result_cache.fetch_json(job['content_hash'], 'transcription', params)
+        if transcription is None:
+            transcription = processor.transcribe_audio(
+                processor.artifact_store.localize(job['audio_path']), on_progress=progress.tracker('windows'), model_size=model_size, language=language
+            )
+            transcription['duration'] = job['audio_duration']
+            processor.result_cache.store_json(job['content_hash'], 'transcription', params, transcription)
+        job['transcription_path'] = _artifact_path(job, '.transcription.json')
+        with open(job['transcription_path'], 'w') as f:
+            json.dump(transcription, f)
+        processor.artifact_store.publish(job['transcription_path'])
+        _drop_local(job['audio_path'], job['transcription_path'])
+
+    return _run_stage(self, job, 'transcription', run)
+
+
+@app.task(bind=True, max_retries=STAGE_MAX_RETRIES)
+def translate_stage(self, job: dict) -> dict:
+    """Translate the transcript and persist the translated text as JSON."""
+    processor = get_processor()
+    progress = _reporter(self, job, 'translation')
+    params = processor.translation_params(job['target_language'], job['options'].get('translation_backend'),
+                                          job.get('transcription_params'))
+
+    def run():
+        translation = processor.result_cache.fetch_json(job['content_hash'], 'translation', params)
+        if translation is None:
+            with open(processor.artifact_store.localize(job['transcription_path'])) as f:
+                transcription = json.load(f)
+            translation = processor.translate_segments(
+                transcription, job['target_language'], on_progress=progress.tracker('batches'),
+                backend=job['options'].get('translation_backend')
+            )
+            processor.result_cache.store_json(job['content_hash'], 'translation', params, translation)
+        job['translation_path'] = _artifact_path(job, '.translation.json')
+        with open(job['translation_path'], 'w') as f:
+            json.dump(translation, f)
+        processor.artifact_store.publish(job['translation_path'])
+        _drop_local(job['transcription_path'], job['translation_path'])
+
+    return _run_stage(self, job, 'translation', run)
+
+
+@app.task(bind=True, max_retries=STAGE_MAX_RETRIES)
+def tts_stage(self, job: dict) -> dict:
+    """Clone the speaker's voice if requested and synthesize the translated speech."""
+    processor = get_processor()
+    tts = processor.tts(job['options'].get('tts_backend'))
+    # Backends without voice cloning synthesize in their own voice
+    preserve_voice = job['preserve_voice'] and tts.supports_voice_cloning
+    progress = _reporter(self, job, 'voice_cloning' if preserve_voice else 'speech_generation')
+    params = dict(
+        processor.translation_params(job['target_language'], job['options'].get('translation_backend'),
+                                     job.get('transcription_params')),
+        preserve_voice=preserve_voice,
+        dubbing=processor.dubbing_mode,
+        tts=tts.name
+    )
+
+    def run():
+        speech_path = _artifact_path(job, '.speech.wav')
+        cached = processor.result_cache.fetch_file(job['content_hash'], 'speech', params, speech_path)
+        if cached is None:
+            with open(processor.artifact_store.localize(job['translation_path'])) as f:
+                translation = json.load(f)
+            voice_id = None
+            if preserve_voice:
+                voice_id = processor.reuse_or_clone_voice(
+                    load_wav(processor.artifact_store.localize(job['audio_path'])),
+                    job['audio_path'],
+                    f"voice_{os.path.basename(job['video_path'])}"
+                )
+                progress.stage('speech_generation')
+            temp_path = processor.synthesize_translation(
+                translation, job['target_language'].lower(), job['audio_duration'], voice_id=voice_id,
+                on_progress=progress.tracker('chunks'), backend=tts.name
+            )
+            # Move next to the upload so the merge stage can find it by path
+            shutil.move(temp_path, speech_path)
+            processor.result_cache.store_file(job['content_hash'], 'speech', params, speech_path)
+            job['voice_id'] = voice_id
+        processor.artifact_store.publish(speech_path)
+        job['speech_path'] = speech_path
+        _drop_local(job['translation_path'], job['audio_path'], speech_path)
+
+    return _run_stage(self, job, 'speech_generation', run)
+
+
+@app.task(bind=True, max_retries=STAGE_MAX_RETRIES)
+def separate_stage(self, job: dict) -> dict:
+    """Separate the source's music and effects from its vocals for the merge to mix under the dub."""
+    processor = get_processor()
+    progress = _reporter(self, job, 'background_separation')
+    params = {'model': get_source_separator().model_name}
+
+    def run():
+        background_path = _artifact_path(job, '.background.wav')
+        try:
+            cached = processor.result_cache.fetch_file(job['content_hash'], 'background', params, background_path)
+            if cached is None:
+                processor.separate_background_audio(
+                    processor.artifact_store.localize(job['video_path']), background_path,
+                    on_progress=progress.update
+                )
+                processor.result_cache.store_file(job['content_hash'], 'background', params, background_path)
+        except Exception as e:
+            # The dub is still usable without its background
+            print(f"Background separation failed for job {job['job_id']}: {str(e)}")
+            return
+        processor.artifact_store.publish(background_path)
+        job['background_path'] = background_path
+        _drop_local(job['video_path'], background_path)
+
+    return _run_stage(self, job, 'background_separation', run)
+
+
+@app.task(bind=True, max_retries=STAGE_MAX_RETRIES)
+def merge_stage(self, job: dict) -> dict:
+    """Mux the synthesized speech into the video and clean up stage artifacts."""
+    processor = get_processor()
+    progress = _reporter(self, job, 'audio_merge')
+
+    store = processor.artifact_store
+    with open(store.localize(job['transcription_path'])) as f:
+        transcription = json.load(f)
+    keep_background_audio = job['options'].get('keep_background_audio', processor.keep_background_audio)
+
+    def run():
+        job['output_path'] = processor.merge_audio_video(
+            store.localize(job['video_path']), store.localize(job['speech_path']),
+            keep_original_audio=job['options'].get('keep_original_audio', processor.keep_original_audio),
+            on_progress=progress.update,
+            speech_regions=transcription.get('speech_regions') if keep_background_audio else None,
+            background_path=store.localize(job['background_path']) if job.get('background_path') else None
+        )
+        store.publish(job['output_path'])
+
+    job = _run_stage(self, job, 'audio_merge', run)
+
+    with open(store.localize(job['translation_path'])) as f:
+        translation = json.load(f)
+
+    file_size = os.path.getsize(job['output_path'])
+    _cleanup_artifacts(job)
+    # The output is downloaded from the store, so no node keeps a local copy
+    _drop_local(job['output_path'])
+    return {
+        'status': 'success',
+        'result': {
+            'status': 'success',
+            'video_path': job['output_path'],
+            'transcription': transcription,
+            'translation': translation['text'],
+            'translated_segments': translation['segments'],
+            'processing_time': time.time() - job['started_at'],
+            'step_timing': job['step_timing'],
+            'audio_duration': job.get('audio_duration', 0.0),
+            'file_size': file_size,
+            'voice_id': job.get('voice_id')
+        }
+    }
+
+
+def _chunked_output_params(processor: VideoProcessor, job: dict) -> dict:
+    """Whole-job cache key of a chunked job, the same one a single-task run of it uses."""
+    tts = processor.tts(job['options'].get('tts_backend'))
+    return processor.stage_params(
+        job['video_path'], job['target_language'], job['preserve_voice'] and tts.supports_voice_cloning,
+        job['options'], duration=job['duration']
+    )['output']
+
+
+@app.task(bind=True, max_retries=STAGE_MAX_RETRIES)
+def chunk_prepare_stage(self, job: dict) -> dict:
+    """Check the whole-job cache, then clone the speaker's voice once before a chunked job fans out."""
+    processor = get_processor()
+    tts = processor.tts(job['options'].get('tts_backend'))
+    job['voice_id'] = None
+
+    # A cached result makes every window a no-op; window 0 carries it to the merge stage
+    cached_job = processor.fetch_cached_job(
+        job['content_hash'], _chunked_output_params(processor, job),
+        job['video_path'].rsplit('.', 1)[0] + '_translated.mp4'
+    )
+    if cached_job:
+        print(f"Returning cached translated video for chunked job {job['job_id']}")
+        processor.artifact_store.publish(cached_job['video_path'])
+        _drop_local(cached_job['video_path'])
+        job['cached_result'] = cached_job
+        return job
+
+    if not (job['preserve_voice'] and tts.supports_voice_cloning):
+        return job
+    _reporter(self, job, 'voice_cloning')
+
+    def run():
+        samples = processor.extract_audio_array(
+            _media_source(job['video_path']), duration=min(job['duration'], CHUNKED_VOICE_SAMPLE_SECONDS)
+        )
+        voice_path = _artifact_path(job, '.voice.wav')
+        try:
+            job['voice_id'] = processor.reuse_or_clone_voice(
+                samples, voice_path, f"voice_{os.path.basename(job['video_path'])}"
+            )
+        finally:
+            if os.path.exists(voice_path):
+                os.remove(voice_path)
+
+    return _run_stage(self, job, 'voice_cloning', run)
+
+
+@app.task(bind=True, max_retries=STAGE_MAX_RETRIES)
+def chunk_window_stage(self, job: dict, window: dict) -> dict:
+    """Transcribe, translate and dub one window of a chunked job, publishing its speech track."""
+    if job.get('cached_result'):
+        return {'index': window['index'], 'cached_result': job['cached_result'] if window['index'] == 0 else None}
+    processor = get_processor()
+    progress = ProgressReporter(lambda meta: report_progress(self, meta, task_id=job['job_id']))
+    store = processor.artifact_store
+    separate_background = job['options'].get('separate_background', SEPARATE_BACKGROUND_AUDIO)
+    prefix = f".window{window['index']}"
+    step_start = time.time()
+    try:
+        result = processor.process_window(
+            _media_source(job['video_path']), window, job['target_language'],
+            _artifact_path(job, prefix + '.speech.wav'),
+            voice_id=job.get('voice_id'),
+            options=job['options'],
+            # Sized for the whole video so every window uses the same model
+            whisper_size=processor.whisper_size_for(job['video_path'], job['options'], duration=job['duration']),
+            background_path=_artifact_path(job, prefix + '.background.wav') if separate_background else None,
+            progress=progress
+        )
+    except Exception as e:
+        print(f"Window {window['index']} failed for job {job['job_id']}: {str(e)}")
+        raise self.retry(exc=e, countdown=STAGE_RETRY_DELAY * (self.request.retries + 1))
+
+    for path in (result['speech_path'], result['background_path']):
+        if path:
+            store.publish(path)
+    _drop_local(result['speech_path'], result['background_path'])
+    result['voice_id'] = job.get('voice_id')
+    result['seconds'] = time.time() - step_start
+    return result
+
+
+@app.task(bind=True, max_retries=STAGE_MAX_RETRIES)
+def chunk_merge_stage(self, window_results: list, job: dict) -> dict:
+    """Stitch a chunked job's windows into one transcript and speech track and mux it into the video."""
+    processor = get_processor()
+    store = processor.artifact_store
+    window_results = sorted(window_results, key=lambda r: r['index'])
+    cached_job = window_results[0].get('cached_result') if window_results else None
+    if cached_job:
+        _cleanup_artifacts(job)
+        return {'status': 'success', 'result': dict(cached_job, processing_time=time.time() - job['started_at'])}
+
+    progress = _reporter(self, job, 'audio_merge')
+    transcription, translation = stitch_transcripts(window_results)
+    transcription['duration'] = job['duration']
+    keep_background_audio = job['options'].get('keep_background_audio', processor.keep_background_audio)
+    job['step_timing']['windows'] = sum(r['seconds'] for r in window_results)
+
+    def run():
+        job['speech_path'] = stitch_wavs(
+            [(r.get('speech_start', r['start']), store.localize(r['speech_path']))
+             for r in window_results if r['speech_path']],
+            _artifact_path(job, '.speech.wav'), job['duration']
+        )
+        if window_results and all(r['background_path'] for r in window_results):
+            job['background_path'] = stitch_wavs(
+                [(r['start'], store.localize(r['background_path'])) for r in window_results],
+                _artifact_path(job, '.background.wav'), job['duration']
+            )
+        job['output_path'] = processor.merge_audio_video(
+            store.localize(job['video_path']), job['speech_path'],
+            keep_original_audio=job['options'].get('keep_original_audio', processor.keep_original_audio),
+            on_progress=progress.update,
+            speech_regions=transcription.get('speech_regions') if keep_background_audio else None,
+            background_path=job.get('background_path')
+        )
+        store.publish(job['output_path'])
+
+    job = _run_stage(self, job, 'audio_merge', run)
+
+    file_size = os.path.getsize(job['output_path'])
+    voice_id = window_results[0]['voice_id'] if window_results else None
+    result = {
+        'status': 'success',
+        'video_path': job['output_path'],
+        'transcription': transcription,
+        'translation': translation['text'],
+        'translated_segments': translation['segments'],
+        'processing_time': time.time() - job['started_at'],
+        'step_timing': job['step_timing'],
+        'audio_duration': job['duration'],
+        'file_size': file_size,
+        'voice_id': voice_id,
+        'windows': len(window_results)
+    }
+    # Cached under the whole-job key, so a repeat of this video (chunked or not) skips every stage
+    output_params = _chunked_output_params(processor, job)
+    processor.result_cache.store_file(job['content_hash'], 'output', output_params, job['output_path'])
+    processor.result_cache.store_json(job['content_hash'], 'job', output_params, result)
+    _cleanup_artifacts(job)
+    _drop_local(job['output_path'])
+    return {'status': 'success', 'result': result}
+
+
+@app.task
+def pipeline_failed(request, exc, traceback, job_id: str, video_path: str, windows: int = 0):
+    """Record a failed stage under the job id and remove the job's files."""
+    print(f"Pipeline {job_id} failed in {request.task}: {str(exc)}")
+    base = video_path.rsplit('.', 1)[0]
+    _cleanup_artifacts({
+        'video_path': video_path,
+        'audio_path': base + '.wav',
+        'transcription_path': base + '.transcription.json',
+        'translation_path': base + '.translation.json',
+        'speech_path': base + '.speech.wav',
+        'background_path': base + '.background.wav',
+        'windows': windows
+    })
+    # Match process_video_task, which reports errors as a successful task with an error payload
+    failure = {'status': 'error', 'error': str(exc)}
+    app.backend.store_result(job_id, failure, 'SUCCESS')
+    job_registry.record_result(job_id, failure)
+    scheduler.release(job_id)
+    publish_status(job_id, 'SUCCESS', failure)
+
+
+def _media_source(path: str) -> str:
+    """Where ffmpeg reads an upload: a presigned URL with a remote store, so only the needed range is fetched."""
+    store = get_artifact_store()
+    return store.download_url(path) if store.remote else store.localize(path)
+
+
+def _drop_local(*paths):
+    """With a remote artifact store, remove this node's copies once a stage is done with them."""
+    if not get_artifact_store().remote:
+        return
+    for path in paths:
+        if path and os.path.exists(path):
+            os.remove(path)
+
+
+def _cleanup_artifacts(job: dict):
+    """Remove the job's intermediate files locally and from the artifact store."""
+    store = get_artifact_store()
+    paths = [job.get(key) for key in ('video_path', 'audio_path', 'transcription_path', 'translation_path',
+                                      'speech_path', 'background_path')]
+    base = job['video_path'].rsplit('.', 1)[0]
+    for index in range(job.get('windows', 0)):
+        paths += [f"{base}.window{index}.speech.wav", f"{base}.window{index}.background.wav"]
+    for path in paths:
+        if path and store.remote:
+            store.discard(path)
+        if path and os.path.exists(path):
+            try:
+                os.remove(path)
+            except Exception as e:
+                print(f"Failed to remove {path}: {str(e)}")
@@ -0,0 +1,163 @@
+import os
+import tempfile
+import threading
+from typing import Optional
+from urllib.parse import quote
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+class ArtifactNotFoundError(Exception):
+    """Raised when an artifact is neither on local disk nor in the store."""
+
+
+class LocalArtifactStore:
+    """Artifacts live on the shared local ``uploads/`` directory.
+
+    This is the single-node (or shared-volume) layout: the local file is the
+    artifact, so publishing, localizing and discarding are no-ops and
+    downloads are served by the API's own download endpoint.
+    """
+
+    remote = False
+
+    def __init__(self, root: str = "uploads"):
+        self.root = root
+
+    def publish(self, path: str):
+        """Make a local file available to every node."""
+
+    def localize(self, path: str) -> str:
+        """Ensure ``path`` exists on this node and return it."""
+        if not os.path.exists(path):
+            raise ArtifactNotFoundError(f"Artifact not found: {path}")
+        return path
+
+    def discard(self, path: str):
+        """Remove the shared copy of an artifact (the caller removes local files)."""
+
+    def exists(self, path: str) -> bool:
+        return os.path.exists(path)
+
+    def download_url(self, path: str, filename: Optional[str] = None) -> Optional[str]:
+        """A direct download URL, or None when the API serves the file itself."""
+        return None
+
+
+class S3ArtifactStore:
+    """Artifacts live in an S3-compatible bucket, so API and workers can run on separate nodes.
+
+    Each local path under ``uploads/`` maps to the object key
+    ``ARTIFACT_S3_PREFIX`` + its path relative to that directory. Uploads
+    stream from disk as concurrent multipart parts of
+    ``ARTIFACT_MULTIPART_CHUNK_SIZE`` bytes, and downloads are handed to
+    clients as presigned URLs valid for ``ARTIFACT_PRESIGN_EXPIRY`` seconds.
+    ``ARTIFACT_S3_ENDPOINT_URL`` points the client at MinIO or another
+    S3-compatible server. Expire objects with a bucket lifecycle rule.
+    """
+
+    remote = True
+
+    def __init__(self, bucket: Optional[str] = None, root: str = "uploads", prefix: Optional[str] = None,
+                 endpoint_url: Optional[str] = None, client=None):
+        import boto3
+        from boto3.s3.transfer import TransferConfig
+
+        self.bucket = bucket or os.getenv('ARTIFACT_S3_BUCKET')
+        if not self.bucket:
+            raise ValueError("ARTIFACT_S3_BUCKET not found in environment variables")
+        self.root = root
+        self.prefix = prefix if prefix is not None else os.getenv('ARTIFACT_S3_PREFIX', '')
+        self.presign_expiry = int(os.getenv('ARTIFACT_PRESIGN_EXPIRY', '3600'))
+        self.client = client or boto3.client(
+            's3',
+            endpoint_url=endpoint_url or os.getenv('ARTIFACT_S3_ENDPOINT_URL') or None,
+            region_name=os.getenv('ARTIFACT_S3_REGION') or None
+        )
+        chunk_size = int(os.getenv('ARTIFACT_MULTIPART_CHUNK_SIZE', str(16 * 1024 * 1024)))
+        self.transfer_config = TransferConfig(
+            multipart_threshold=chunk_size,
+            multipart_chunksize=chunk_size,
+            max_concurrency=int(os.getenv('ARTIFACT_MAX_CONCURRENCY', '8')),
+            use_threads=True
+        )
+
+    def key(self, path: str) -> str:
+        relative = os.path.relpath(path, self.root)
+        if relative.startswith('..'):
+            relative = os.path.basename(path)
+        return self.prefix + relative.replace(os.sep, '/')
+
+    def publish(self, path: str):
+        """Upload a local file, in parallel multipart parts once it exceeds one chunk."""
+        self.client.upload_file(path, self.bucket, self.key(path), Config=self.transfer_config)
+
+    def localize(self, path: str) -> str:
+        """Download ``path`` from the bucket unless this node already has it."""
+        if os.path.exists(path):
+            return path
+        from botocore.exceptions import ClientError
+
+        directory = os.path.dirname(path) or '.'
+        os.makedirs(directory, exist_ok=True)
+        # A private temp file per call, so processes localizing the same key never share one
+        fd, tmp_path = tempfile.mkstemp(prefix=f".{os.path.basename(path)}.", suffix='.part', dir=directory)
+        os.close(fd)
+        try:
+            self.client.download_file(self.bucket, self.key(path), tmp_path, Config=self.transfer_config)
+            os.replace(tmp_path, path)
+        except ClientError as e:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            if e.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey'):
+                raise ArtifactNotFoundError(f"Artifact not found: {path}")
+            raise
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return path
+
+    def discard(self, path: str):
+        try:
+            self.client.delete_object(Bucket=self.bucket, Key=self.key(path))
+        except Exception as e:
+            print(f"Failed to delete artifact {path}: {str(e)}")
+
+    def exists(self, path: str) -> bool:
+        from botocore.exceptions import ClientError
+
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=self.key(path))
+            return True
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound'):
+                return False
+            raise
+
+    def download_url(self, path: str, filename: Optional[str] = None) -> Optional[str]:
+        params = {'Bucket': self.bucket, 'Key': self.key(path)}
+        if filename:
+            params['ResponseContentDisposition'] = f"attachment; filename*=utf-8''{quote(filename)}"
+        return self.client.generate_presigned_url('get_object', Params=params, ExpiresIn=self.presign_expiry)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_artifact_store():
+    """Return this process's artifact store, chosen by ``ARTIFACT_STORE`` (``local`` or ``s3``)."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            backend = os.getenv('ARTIFACT_STORE', 'local').lower()
+            if backend == 's3':
+                _store = S3ArtifactStore()
+            elif backend == 'local':
+                _store = LocalArtifactStore()
+            else:
+                raise ValueError(f"Unknown artifact store: {backend}")
+        return _store
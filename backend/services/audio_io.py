@@ -0,0 +1,74 @@
+from typing import Callable, Optional
+
+import ffmpeg
+import numpy as np
+
+from services.ffmpeg_executor import FFmpegError, ffmpeg_executor
+
+SAMPLE_RATE = 16000
+
+
+def probe_duration(media_path: str) -> float:
+    """Return a media file's duration in seconds, or 0.0 if it cannot be probed."""
+    try:
+        return float(ffmpeg.probe(media_path)['format']['duration'])
+    except Exception:
+        return 0.0
+
+
+def time_window(start: Optional[float] = None, duration: Optional[float] = None) -> dict:
+    """ffmpeg input options that read only ``duration`` seconds from ``start``."""
+    options = {}
+    if start:
+        options['ss'] = f"{start:.3f}"
+    if duration:
+        options['t'] = f"{duration:.3f}"
+    return options
+
+
+def read_audio_pcm(media_path: str, sample_rate: int = SAMPLE_RATE,
+                   on_progress: Optional[Callable[[float], None]] = None,
+                   start: float = 0.0, duration: Optional[float] = None) -> np.ndarray:
+    """Decode a media file's audio to mono float32 straight from ffmpeg's stdout.
+
+    The buffer is preallocated from the probed duration and filled in place,
+    so no temporary WAV is written and the PCM is decoded exactly once.
+    ``start`` and ``duration`` (seconds) decode just that part of the file,
+    seeking on input so the rest is never read; ``media_path`` may be a URL.
+    ``on_progress(fraction)`` is called as samples arrive.
+    """
+    if duration is None:
+        duration = max(0.0, probe_duration(media_path) - start)
+    expected = int(duration * sample_rate) + sample_rate
+    state = {'buffer': np.empty(expected, dtype=np.float32), 'filled': 0, 'leftover': b''}
+
+    def consume(data: bytes):
+        data = state['leftover'] + data
+        usable = len(data) - (len(data) % 2)
+        state['leftover'] = data[usable:]
+        samples = np.frombuffer(data[:usable], dtype=np.int16)
+
+        buffer, filled = state['buffer'], state['filled']
+        if filled + len(samples) > len(buffer):
+            grown = np.empty(max(len(buffer) * 2, filled + len(samples)), dtype=np.float32)
+            grown[:filled] = buffer[:filled]
+            buffer = state['buffer'] = grown
+        np.multiply(samples, 1.0 / 32768.0, out=buffer[filled:filled + len(samples)], casting='unsafe')
+        state['filled'] = filled + len(samples)
+        if on_progress:
+            on_progress(min(1.0, state['filled'] / expected))
+
+    stream = (
+        ffmpeg
+        .input(media_path, **time_window(start, duration))
+        .output('pipe:1', format='s16le', acodec='pcm_s16le', ac=1, ar=sample_rate,
+                loglevel='error', threads='auto')
+    )
+    try:
+        ffmpeg_executor.run(stream, duration=duration, label='read_audio_pcm', on_stdout=consume)
+    except FFmpegError as e:
+        raise Exception(str(e))
+
+    if state['filled'] == 0:
+        raise Exception("Audio extraction produced no samples")
+    return state['buffer'][:state['filled']]
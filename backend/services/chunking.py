@@ -0,0 +1,199 @@
+import math
+import os
+import wave
+from typing import Optional
+
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Samples per block when writing silence, so long gaps never allocate a long buffer
+_SILENCE_BLOCK = 1 << 20
+
+
+def plan_windows(duration: float, window_seconds: Optional[float] = None,
+                 overlap_seconds: Optional[float] = None) -> list:
+    """Split ``duration`` seconds into fixed windows for chunked processing.
+
+    Each window owns ``[start, end)`` and is read as ``[read_start, read_end)``,
+    which extends ``overlap_seconds`` past both edges so speech crossing a
+    boundary is heard whole by whichever window owns it.
+    """
+    window_seconds = window_seconds or float(os.getenv('CHUNKED_WINDOW_SECONDS', '600'))
+    overlap_seconds = overlap_seconds if overlap_seconds is not None else float(
+        os.getenv('CHUNKED_OVERLAP_SECONDS', '15')
+    )
+    count = max(1, math.ceil(duration / window_seconds))
+    windows = []
+    for index in range(count):
+        start = index * window_seconds
+        end = duration if index == count - 1 else (index + 1) * window_seconds
+        windows.append({
+            'index': index,
+            'count': count,
+            'start': start,
+            'end': end,
+            'read_start': max(0.0, start - overlap_seconds),
+            'read_end': min(duration, end + overlap_seconds),
+        })
+    return windows
+
+
+def _owns(window: dict, time: float) -> bool:
+    # The first and last windows also own anything before or after the track's nominal edges
+    after_start = window['index'] == 0 or time >= window['start']
+    before_end = window['index'] == window['count'] - 1 or time < window['end']
+    return after_start and before_end
+
+
+def owned_segments(segments: list, window: dict) -> list:
+    """Shift a window's Whisper segments to track time and keep those it owns.
+
+    A segment belongs to the window containing its midpoint, so a sentence
+    transcribed by two neighbouring windows (from their overlap) is kept once.
+    """
+    offset = window['read_start']
+    owned = []
+    for segment in segments:
+        start, end = segment['start'] + offset, segment['end'] + offset
+        if not _owns(window, (start + end) / 2):
+            continue
+        segment = dict(segment, start=start, end=end)
+        if segment.get('words'):
+            segment['words'] = [
+                dict(word, start=word['start'] + offset, end=word['end'] + offset) for word in segment['words']
+            ]
+        owned.append(segment)
+    return owned
+
+
+def window_speech_start(segments: list, window: dict) -> float:
+    """Track time at which a window's speech track starts.
+
+    Segments are owned by their midpoint, so one that crosses the window's
+    leading edge starts inside the overlap, before ``window['start']``; the
+    track then starts at that segment so no segment has a negative offset.
+    """
+    return min([window['start']] + [segment['start'] for segment in segments])
+
+
+def owned_regions(regions: Optional[list], window: dict) -> Optional[list]:
+    """Shift a window's VAD speech regions to track time and clip them to the window."""
+    if regions is None:
+        return None
+    offset = window['read_start']
+    low = 0.0 if window['index'] == 0 else window['start']
+    high = math.inf if window['index'] == window['count'] - 1 else window['end']
+    clipped = []
+    for start, end in regions:
+        start, end = max(start + offset, low), min(end + offset, high)
+        if end > start:
+            clipped.append([round(start, 3), round(end, 3)])
+    return clipped
+
+
+def stitch_transcripts(window_results: list) -> tuple:
+    """Combine per-window results into one ``(transcription, translation)`` pair in track order."""
+    window_results = sorted(window_results, key=lambda r: r['index'])
+    segments, translated_segments, regions = [], [], []
+    has_regions = False
+    for result in window_results:
+        for segment in result['segments']:
+            segments.append(dict(segment, id=len(segments)))
+        for segment in result['translated_segments']:
+            translated_segments.append(dict(segment, id=len(translated_segments)))
+        if result.get('speech_regions') is not None:
+            has_regions = True
+            for region in result['speech_regions']:
+                if regions and region[0] <= regions[-1][1]:
+                    # Padded regions meeting at a window edge are one region
+                    regions[-1][1] = max(regions[-1][1], region[1])
+                else:
+                    regions.append(list(region))
+
+    languages = [r['language'] for r in window_results if r.get('language')]
+    transcription = {
+        'text': ' '.join(r['text'] for r in window_results if r['text']),
+        'segments': segments,
+        # Windows detect the language independently; the most common answer is taken for the track
+        'language': max(set(languages), key=languages.count) if languages else None,
+    }
+    if has_regions:
+        transcription['speech_regions'] = regions
+    translation = {
+        'text': ' '.join(r['translation'] for r in window_results if r['translation']),
+        'segments': translated_segments,
+    }
+    return transcription, translation
+
+
+def _read_wav(path: str) -> tuple:
+    with wave.open(path, 'rb') as wav:
+        if wav.getsampwidth() != 2:
+            raise Exception(f"Expected 16-bit PCM audio, got {wav.getsampwidth() * 8}-bit")
+        channels, sample_rate = wav.getnchannels(), wav.getframerate()
+        frames = wav.readframes(wav.getnframes())
+    samples = np.frombuffer(frames, dtype=np.int16).reshape(-1, channels).astype(np.float32) / 32768.0
+    return samples, sample_rate
+
+
+def stitch_wavs(parts: list, output_path: str, total_duration: float = 0.0,
+                sample_rate: int = 24000, channels: int = 1) -> str:
+    """Place WAVs at their track offsets and write one 16-bit WAV, holding one part in memory at a time.
+
+    ``parts`` is a list of ``(start_seconds, wav_path)`` in track order. A
+    part that runs past the next part's start (speech overrunning its
+    window) is mixed into it rather than cut; gaps are silence, and the
+    output is padded to ``total_duration``. ``sample_rate`` and
+    ``channels`` apply when there are no parts and must match the parts
+    otherwise.
+    """
+    with wave.open(output_path, 'wb') as out:
+        out.setsampwidth(2)
+        opened = False
+        buffer = np.zeros((0, channels), dtype=np.float32)
+        buffer_start = 0  # Track position, in samples, of buffer[0]
+
+        def write(samples: np.ndarray):
+            out.writeframes((np.clip(samples, -1.0, 1.0) * 32767).astype(np.int16).tobytes())
+
+        def write_silence(count: int):
+            while count > 0:
+                block = min(count, _SILENCE_BLOCK)
+                out.writeframes(bytes(block * channels * 2))
+                count -= block
+
+        for start, path in parts:
+            clip, rate = _read_wav(path)
+            if not opened:
+                sample_rate, channels = rate, clip.shape[1]
+                out.setnchannels(channels)
+                out.setframerate(sample_rate)
+                buffer = np.zeros((0, channels), dtype=np.float32)
+                opened = True
+            elif (rate, clip.shape[1]) != (sample_rate, channels):
+                raise Exception(f"Cannot stitch {path}: {rate} Hz x{clip.shape[1]}, "
+                                f"expected {sample_rate} Hz x{channels}")
+
+            offset = int(round(start * sample_rate))
+            # Everything before this part's offset is final
+            flush = max(0, min(len(buffer), offset - buffer_start))
+            write(buffer[:flush])
+            buffer, buffer_start = buffer[flush:], buffer_start + flush
+            if buffer_start < offset:
+                write_silence(offset - buffer_start)
+                buffer_start = offset
+
+            position = offset - buffer_start
+            if position + len(clip) > len(buffer):
+                buffer = np.concatenate([buffer, np.zeros((position + len(clip) - len(buffer), channels),
+                                                          dtype=np.float32)])
+            buffer[position:position + len(clip)] += clip
+
+        if not opened:
+            out.setnchannels(channels)
+            out.setframerate(sample_rate)
+        write(buffer)
+        write_silence(int(total_duration * sample_rate) - buffer_start - len(buffer))
+    return output_path
@@ -0,0 +1,275 @@
+import asyncio
+import os
+import re
+import threading
+import time
+from typing import Optional
+from urllib.parse import quote
+
+from dotenv import load_dotenv
+from starlette.responses import Response
+
+load_dotenv()
+
+DOWNLOAD_EXTENSIONS = ('.mp4', '.avi', '.mov', '.mkv')
+OUTPUT_SUFFIX = '_translated'
+
+_RANGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def is_output(path: str) -> bool:
+    """Whether ``path`` names a translated video, the only files the download endpoint serves."""
+    name, extension = os.path.splitext(os.path.basename(path))
+    return name.endswith(OUTPUT_SUFFIX) and extension.lower() in DOWNLOAD_EXTENSIONS
+
+
+class DownloadNotFoundError(Exception):
+    """Raised when a requested file does not exist or is outside the download root."""
+
+
+class RangeNotSatisfiableError(Exception):
+    """Raised when a Range header lies entirely beyond the end of the file."""
+
+    def __init__(self, size: int):
+        super().__init__(f"Requested range not satisfiable for {size} bytes")
+        self.size = size
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[tuple]:
+    """Return the inclusive ``(start, end)`` byte range requested, or None for the whole file.
+
+    Only single ranges are honoured; multi-range and malformed headers are
+    ignored, which HTTP allows, and the whole file is served instead.
+    """
+    if not header:
+        return None
+    match = _RANGE.match(header.strip())
+    if not match or (not match.group(1) and not match.group(2)):
+        return None
+    first, last = match.groups()
+    if not first:
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0:
+            raise RangeNotSatisfiableError(size)
+        return max(0, size - length), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size:
+        raise RangeNotSatisfiableError(size)
+    if end < start:
+        return None
+    return start, end
+
+
+class FileRangeResponse(Response):
+    """Sends a byte range of a file, zero-copy where the server supports it.
+
+    Servers advertising the ASGI ``http.response.zerocopysend`` extension
+    get the file descriptor and let the kernel copy with ``sendfile``. With
+    ``accel_redirect`` the body is left to a fronting nginx
+    (``X-Accel-Redirect``), which also uses ``sendfile``. Otherwise the range
+    is read with ``pread`` in a worker thread and streamed in chunks.
+    ``on_complete(delivered)`` runs once the response ends, with ``delivered``
+    true only if the range's last byte went out before the client hung up.
+    """
+
+    chunk_size = 1024 * 1024
+
+    def __init__(self, path: str, start: int, end: int, size: int, headers: dict, status_code: int = 200,
+                 accel_redirect: Optional[str] = None, head: bool = False, on_complete=None):
+        super().__init__(status_code=status_code, headers=headers)
+        self.path = path
+        self.start = start
+        self.end = end
+        self.size = size
+        self.accel_redirect = accel_redirect
+        self.head = head
+        self.on_complete = on_complete
+        self.headers['content-length'] = str(end - start + 1 if size else 0)
+
+    async def __call__(self, scope, receive, send):
+        delivered = False
+        disconnected = asyncio.Event()
+
+        async def watch_disconnect():
+            while (await receive())['type'] != 'http.disconnect':
+                pass
+            disconnected.set()
+
+        watcher = asyncio.ensure_future(watch_disconnect())
+        try:
+            if self.accel_redirect:
+                self.headers['x-accel-redirect'] = self.accel_redirect
+            await send({'type': 'http.response.start', 'status': self.status_code, 'headers': self.raw_headers})
+            if self.head or self.accel_redirect or self.size == 0:
+                await send({'type': 'http.response.body', 'body': b''})
+                # Nginx reports nothing back, so handing the body off counts as delivery
+                delivered = bool(self.accel_redirect)
+                return
+
+            with open(self.path, 'rb') as f:
+                if 'http.response.zerocopysend' in scope.get('extensions', {}):
+                    await send({
+                        'type': 'http.response.zerocopysend',
+                        'file': f.fileno(),
+                        'offset': self.start,
+                        'count': self.end - self.start + 1
+                    })
+                else:
+                    offset = self.start
+                    while offset <= self.end and not disconnected.is_set():
+                        length = min(self.chunk_size, self.end - offset + 1)
+                        chunk = await asyncio.to_thread(os.pread, f.fileno(), length, offset)
+                        if not chunk:
+                            break
+                        offset += len(chunk)
+                        await send({'type': 'http.response.body', 'body': chunk,
+                                    'more_body': offset <= self.end})
+            delivered = self.end == self.size - 1 and not disconnected.is_set()
+        finally:
+            watcher.cancel()
+            if self.on_complete:
+                self.on_complete(delivered)
+
+
+class DownloadEngine:
+    """Serves translated videos with Range/ETag support and reference-counted retention.
+
+    Each output stays on disk until it has been downloaded to the end
+    ``DOWNLOAD_MAX_COMPLETED`` times or ``DOWNLOAD_TTL_SECONDS`` have passed
+    since it was written, and never while a response is still reading it.
+    Outputs nobody downloads expire too, via a periodic sweep. Counts are
+    kept per web process; the TTL uses file mtimes, so it holds across
+    processes and restarts.
+    """
+
+    def __init__(self, root: str = "uploads", ttl: Optional[float] = None, max_completed: Optional[int] = None,
+                 sweep_interval: Optional[float] = None, accel_prefix: Optional[str] = None):
+        self.root = os.path.realpath(root)
+        self.ttl = ttl if ttl is not None else float(os.getenv('DOWNLOAD_TTL_SECONDS', '3600'))
+        self.max_completed = max_completed if max_completed is not None else int(
+            os.getenv('DOWNLOAD_MAX_COMPLETED', '3')
+        )
+        self.sweep_interval = sweep_interval or float(os.getenv('DOWNLOAD_SWEEP_INTERVAL', '60'))
+        # e.g. "/protected/" when nginx maps that internal location onto the upload directory
+        self.accel_prefix = accel_prefix if accel_prefix is not None else os.getenv('DOWNLOAD_ACCEL_REDIRECT_PREFIX')
+        self._active = {}
+        self._completed = {}
+        self._lock = threading.Lock()
+        self._sweeper = None
+
+    def resolve(self, file_path: str) -> str:
+        """Map a requested path onto a video file inside the download root."""
+        for candidate in (os.path.join("backend", file_path), file_path):
+            full_path = os.path.realpath(candidate)
+            if full_path.startswith(self.root + os.sep) and os.path.isfile(full_path):
+                if not is_output(full_path):
+                    raise ValueError("Invalid file type")
+                return full_path
+        raise DownloadNotFoundError("File not found")
+
+    @staticmethod
+    def etag(stat: os.stat_result) -> str:
+        return f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+
+    def response(self, file_path: str, range_header: Optional[str] = None, if_none_match: Optional[str] = None,
+                 if_range: Optional[str] = None, head: bool = False) -> Response:
+        """Build the response for a GET/HEAD of ``file_path`` given the request's conditional headers."""
+        full_path = self.resolve(file_path)
+        stat = os.stat(full_path)
+        etag = self.etag(stat)
+        filename = os.path.basename(full_path)
+        headers = {
+            'accept-ranges': 'bytes',
+            'etag': etag,
+            'last-modified': time.strftime('%a, %d %b %Y %H:%M:%S GMT', time.gmtime(stat.st_mtime)),
+            'content-type': 'video/mp4',
+            'content-disposition': f"attachment; filename*=utf-8''{quote(filename)}",
+            'cache-control': 'private, no-transform'
+        }
+
+        if if_none_match and (if_none_match.strip() == '*' or etag in [t.strip() for t in if_none_match.split(',')]):
+            return Response(status_code=304, headers={'etag': etag, 'accept-ranges': 'bytes'})
+
+        size = stat.st_size
+        accel_redirect = None
+        requested = None
+        if self.accel_prefix:
+            # Nginx serves the internal location itself, including any Range
+            accel_redirect = self.accel_prefix.rstrip('/') + '/' + quote(os.path.relpath(full_path, self.root))
+        elif not if_range or if_range.strip() == etag:
+            # A stale If-Range means the client's partial copy is outdated: send everything
+            requested = parse_range(range_header, size)
+        start, end = requested or (0, size - 1)
+        status_code = 206 if requested else 200
+        if requested:
+            headers['content-range'] = f"bytes {start}-{end}/{size}"
+
+        # Seeks through nginx are indistinguishable from downloads, so only plain requests count
+        counted = not head and not (accel_redirect and range_header)
+        self._acquire(full_path)
+        return FileRangeResponse(
+            full_path, start, end, size, headers, status_code=status_code, accel_redirect=accel_redirect,
+            head=head, on_complete=lambda delivered: self._release(full_path, delivered and counted)
+        )
+
+    def _acquire(self, full_path: str):
+        with self._lock:
+            self._active[full_path] = self._active.get(full_path, 0) + 1
+
+    def _release(self, full_path: str, delivered: bool):
+        with self._lock:
+            self._active[full_path] -= 1
+            if not self._active[full_path]:
+                del self._active[full_path]
+            if delivered:
+                self._completed[full_path] = self._completed.get(full_path, 0) + 1
+            expired = self._completed.get(full_path, 0) >= self.max_completed > 0
+        if expired:
+            self._delete(full_path, f"downloaded {self.max_completed} times")
+
+    def _delete(self, full_path: str, reason: str):
+        with self._lock:
+            if self._active.get(full_path):
+                # Still being read; the last reader's release deletes it
+                return
+            self._completed.pop(full_path, None)
+            try:
+                os.remove(full_path)
+                print(f"Deleted download {full_path} ({reason})")
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                print(f"Error deleting file {full_path}: {str(e)}")
+
+    def sweep(self):
+        """Delete translated outputs older than the TTL that nobody is downloading."""
+        if self.ttl <= 0:
+            return
+        cutoff = time.time() - self.ttl
+        for entry in os.scandir(self.root):
+            if not is_output(entry.name):
+                continue
+            try:
+                if entry.stat().st_mtime < cutoff:
+                    self._delete(os.path.realpath(entry.path), "expired")
+            except FileNotFoundError:
+                continue
+
+    def start(self):
+        """Run the TTL sweep periodically on the current event loop."""
+        if self._sweeper is None or self._sweeper.done():
+            self._sweeper = asyncio.get_running_loop().create_task(self._sweep_loop())
+
+    async def stop(self):
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+
+    async def _sweep_loop(self):
+        while True:
+            try:
+                await asyncio.to_thread(self.sweep)
+            except Exception as e:
+                print(f"Download sweep failed: {str(e)}")
+            await asyncio.sleep(self.sweep_interval)
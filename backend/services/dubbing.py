@@ -0,0 +1,122 @@
+import os
+import wave
+from typing import Callable, Optional
+
+import ffmpeg
+import numpy as np
+from dotenv import load_dotenv
+
+from services.ffmpeg_executor import ffmpeg_executor
+
+load_dotenv()
+
+# atempo accepts 0.5-2.0 per filter instance, so larger factors are chained
+_ATEMPO_MAX = 2.0
+
+
+def decode_audio_bytes(data: bytes, sample_rate: int) -> np.ndarray:
+    """Decode compressed audio (e.g. MP3 from the TTS API) to mono float32 in memory."""
+    stream = (
+        ffmpeg
+        .input('pipe:0')
+        .output('pipe:1', format='f32le', acodec='pcm_f32le', ac=1, ar=sample_rate, loglevel='error')
+    )
+    try:
+        # 128 kbps MP3 is 16000 bytes per second of audio
+        out = ffmpeg_executor.run(stream, duration=len(data) / 16000, label='decode_speech',
+                                  input=data, capture_stdout=True)
+    except ffmpeg.Error as e:
+        error_message = e.stderr.decode() if e.stderr else str(e)
+        raise Exception(f"Failed to decode speech audio: {error_message}")
+    return np.frombuffer(out, dtype=np.float32)
+
+
+def time_stretch(samples: np.ndarray, rate: float, sample_rate: int) -> np.ndarray:
+    """Speed audio up by ``rate`` without changing pitch, entirely through pipes."""
+    if abs(rate - 1.0) < 0.01 or len(samples) == 0:
+        return samples
+
+    stream = ffmpeg.input('pipe:0', format='f32le', ac=1, ar=sample_rate)
+    remaining = rate
+    while remaining > _ATEMPO_MAX:
+        stream = stream.filter('atempo', _ATEMPO_MAX)
+        remaining /= _ATEMPO_MAX
+    stream = stream.filter('atempo', remaining)
+    stream = stream.output('pipe:1', format='f32le', acodec='pcm_f32le', ac=1, ar=sample_rate, loglevel='error')
+    try:
+        out = ffmpeg_executor.run(stream, duration=len(samples) / sample_rate, label='time_stretch',
+                                  input=samples.astype(np.float32).tobytes(), capture_stdout=True)
+    except ffmpeg.Error as e:
+        error_message = e.stderr.decode() if e.stderr else str(e)
+        raise Exception(f"Failed to time-stretch speech: {error_message}")
+    return np.frombuffer(out, dtype=np.float32)
+
+
+def write_wav(path: str, samples: np.ndarray, sample_rate: int):
+    """Write mono float32 samples as a 16-bit PCM WAV."""
+    pcm = (np.clip(samples, -1.0, 1.0) * 32767).astype(np.int16)
+    with wave.open(path, 'wb') as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(pcm.tobytes())
+
+
+class Dubber:
+    """Builds a dubbed speech track aligned to the original segment timings.
+
+    Every translated segment is synthesized on its own, decoded in memory and
+    placed on a NumPy timeline at its Whisper ``start`` time. A clip longer
+    than its slot (up to the next segment's start) is sped up by at most
+    ``max_stretch``; anything still left over overlaps the following slot.
+    """
+
+    def __init__(self, synthesize_many: Callable[[list], list], sample_rate: int = 24000,
+                 max_stretch: Optional[float] = None):
+        self.synthesize_many = synthesize_many
+        self.sample_rate = sample_rate
+        self.max_stretch = max_stretch or float(os.getenv('DUBBING_MAX_STRETCH', '1.5'))
+
+    def render(self, segments: list, total_duration: float, output_path: str) -> dict:
+        """Synthesize, place and mix ``segments`` into one WAV at ``output_path``."""
+        segments = [s for s in sorted(segments, key=lambda s: s['start']) if s.get('translation', '').strip()]
+        if not segments:
+            raise Exception("No translated segments to dub")
+
+        clips = self.synthesize_many([s['translation'] for s in segments])
+
+        end_time = max(total_duration, segments[-1]['end'])
+        timeline = np.zeros(int(end_time * self.sample_rate) + 1, dtype=np.float32)
+        stretched = 0
+        overruns = 0
+
+        for i, (segment, clip_bytes) in enumerate(zip(segments, clips)):
+            clip = decode_audio_bytes(clip_bytes, self.sample_rate)
+            slot_end = segments[i + 1]['start'] if i + 1 < len(segments) else end_time
+            slot = max(slot_end - segment['start'], segment['end'] - segment['start'])
+            duration = len(clip) / self.sample_rate
+
+            if slot > 0 and duration > slot:
+                rate = min(duration / slot, self.max_stretch)
+                clip = time_stretch(clip, rate, self.sample_rate)
+                stretched += 1
+                if len(clip) / self.sample_rate > slot + 0.05:
+                    overruns += 1
+
+            start = int(segment['start'] * self.sample_rate)
+            if start < 0:
+                # A segment starting before the track (e.g. in a window's leading overlap) loses its head
+                clip, start = clip[-start:], 0
+            end = start + len(clip)
+            if end > len(timeline):
+                timeline = np.concatenate([timeline, np.zeros(end - len(timeline), dtype=np.float32)])
+            timeline[start:end] += clip
+
+        write_wav(output_path, timeline, self.sample_rate)
+        print(f"Dubbed {len(segments)} segments ({stretched} stretched, {overruns} overrunning their slot)")
+        return {
+            'segments': len(segments),
+            'stretched': stretched,
+            'overruns': overruns,
+            'duration': len(timeline) / self.sample_rate
+        }
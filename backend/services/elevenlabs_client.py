@@ -0,0 +1,178 @@
+import os
+import random
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Optional
+
+import requests
+from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+
+load_dotenv()
+
+DEFAULT_VOICE_ID = "pNInz6obpgDQGcFmaJgB"  # Adam voice ID
+DEFAULT_MODEL_ID = "eleven_multilingual_v1"  # Free tier model
+DEFAULT_VOICE_SETTINGS = {
+    "stability": 0.5,
+    "similarity_boost": 0.75,
+    "style": 0.0,
+    "use_speaker_boost": True
+}
+
+# Sentence ends: Latin/Arabic punctuation followed by whitespace, or CJK full stops
+_SENTENCE_END = re.compile(r'(?<=[.!?;؟])\s+|(?<=[。！？；])')
+_CJK_STOPS = ('。', '！', '？', '；')
+
+
+def split_into_chunks(text: str, max_chars: int = 2500) -> list:
+    """Split text into chunks of at most ``max_chars``, breaking on sentence boundaries.
+
+    Sentences longer than ``max_chars`` are broken on whitespace, and only as a
+    last resort mid-word.
+    """
+    sentences = [s.strip() for s in _SENTENCE_END.split(text) if s and s.strip()]
+    chunks = []
+    current = ""
+    for sentence in sentences:
+        for piece in _split_long(sentence, max_chars):
+            separator = '' if current.endswith(_CJK_STOPS) else ' '
+            candidate = f"{current}{separator}{piece}" if current else piece
+            if len(candidate) <= max_chars:
+                current = candidate
+            else:
+                chunks.append(current)
+                current = piece
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def _split_long(sentence: str, max_chars: int) -> list:
+    if len(sentence) <= max_chars:
+        return [sentence]
+    pieces = []
+    current = ""
+    for word in sentence.split():
+        while len(word) > max_chars:
+            if current:
+                pieces.append(current)
+                current = ""
+            pieces.append(word[:max_chars])
+            word = word[max_chars:]
+        candidate = f"{current} {word}" if current else word
+        if len(candidate) <= max_chars:
+            current = candidate
+        else:
+            pieces.append(current)
+            current = word
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+class ElevenLabsClient:
+    """ElevenLabs API client with a shared keep-alive session and concurrent synthesis.
+
+    Requests are capped at ``max_concurrency`` in flight across all callers in
+    the process, and 429/5xx responses are retried with exponential backoff
+    that honours the server's ``Retry-After`` header, up to ``max_retry_after``
+    seconds.
+    """
+
+    def __init__(self, api_key: str, base_url: Optional[str] = None, max_concurrency: Optional[int] = None,
+                 max_retries: Optional[int] = None, max_retry_after: Optional[float] = None,
+                 timeout: float = 120):
+        self.api_key = api_key
+        self.base_url = (base_url or os.getenv('ELEVENLABS_API_URL', 'https://api.elevenlabs.io')).rstrip('/')
+        self.max_concurrency = max_concurrency or int(os.getenv('TTS_MAX_CONCURRENCY', '4'))
+        self.max_retries = max_retries if max_retries is not None else int(os.getenv('TTS_MAX_RETRIES', '5'))
+        self.max_retry_after = (max_retry_after if max_retry_after is not None
+                                else float(os.getenv('TTS_MAX_RETRY_AFTER', '60')))
+        self.timeout = timeout
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_concurrency)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers.update({"xi-api-key": api_key})
+        self._slots = threading.BoundedSemaphore(self.max_concurrency)
+
+    def request(self, method: str, path: str, **kwargs) -> requests.Response:
+        """Send a request, retrying rate-limited and transient server errors."""
+        url = f"{self.base_url}{path}"
+        kwargs.setdefault('timeout', self.timeout)
+        for attempt in range(self.max_retries + 1):
+            with self._slots:
+                response = self.session.request(method, url, **kwargs)
+            if response.status_code != 429 and response.status_code < 500:
+                return response
+            if attempt == self.max_retries:
+                return response
+
+            delay = self._retry_delay(response, attempt)
+            print(f"ElevenLabs returned {response.status_code}, retrying in {delay:.1f}s "
+                  f"(attempt {attempt + 1}/{self.max_retries})")
+            time.sleep(delay)
+        return response
+
+    def synthesize(self, text: str, voice_id: Optional[str] = None, model_id: str = DEFAULT_MODEL_ID) -> bytes:
+        """Synthesize one chunk of text to MP3 bytes."""
+        data = {
+            "text": text,
+            "model_id": model_id,
+            "voice_settings": DEFAULT_VOICE_SETTINGS
+        }
+        response = self.request(
+            'POST',
+            f"/v1/text-to-speech/{voice_id or DEFAULT_VOICE_ID}",
+            json=data,
+            headers={"Accept": "audio/mpeg", "Content-Type": "application/json"}
+        )
+        if response.status_code != 200:
+            raise Exception(f"ElevenLabs API error: {response.text}")
+        return response.content
+
+    def delete_voice(self, voice_id: str):
+        """Delete a cloned voice from the account."""
+        response = self.request('DELETE', f"/v1/voices/{voice_id}")
+        if response.status_code not in (200, 404):
+            raise Exception(f"ElevenLabs API error: {response.text}")
+
+    def synthesize_many(self, chunks: list, voice_id: Optional[str] = None, model_id: str = DEFAULT_MODEL_ID,
+                        on_progress: Optional[Callable[[int, int], None]] = None) -> list:
+        """Synthesize chunks concurrently, returning MP3 bytes in input order.
+
+        ``on_progress(done, total)`` is called as chunks finish.
+        """
+        if not chunks:
+            return []
+
+        with ThreadPoolExecutor(max_workers=min(self.max_concurrency, len(chunks))) as executor:
+            futures = [executor.submit(self.synthesize, chunk, voice_id, model_id) for chunk in chunks]
+            for done, _ in enumerate(as_completed(futures), start=1):
+                if on_progress:
+                    on_progress(done, len(chunks))
+            return [future.result() for future in futures]
+
+    def _retry_delay(self, response: requests.Response, attempt: int) -> float:
+        retry_after = response.headers.get('Retry-After')
+        if retry_after:
+            try:
+                return min(max(float(retry_after), 0.0), self.max_retry_after)
+            except ValueError:
+                pass
+        return min(30.0, (2 ** attempt) + random.uniform(0, 1))
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_elevenlabs_client(api_key: str) -> ElevenLabsClient:
+    """Return the per-process client for ``api_key`` so connections are reused across tasks."""
+    with _clients_lock:
+        if api_key not in _clients:
+            _clients[api_key] = ElevenLabsClient(api_key)
+        return _clients[api_key]
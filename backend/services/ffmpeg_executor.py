@@ -0,0 +1,267 @@
+import asyncio
+import os
+import signal
+import threading
+import time
+from collections import deque
+from typing import Callable, Optional
+
+import ffmpeg
+from dotenv import load_dotenv
+
+from services.progress import parse_ffmpeg_progress
+
+load_dotenv()
+
+_READ_SIZE = 1024 * 1024  # bytes read from ffmpeg's stdout per iteration
+
+
+class FFmpegError(ffmpeg.Error):
+    """ffmpeg exited non-zero; ``stderr`` holds its captured output."""
+
+    def __init__(self, label: str, stdout: bytes, stderr: bytes, returncode: int):
+        super().__init__(label, stdout, stderr)
+        self.label = label
+        self.returncode = returncode
+
+    def __str__(self):
+        detail = (self.stderr or b'').decode(errors='replace').strip()[-2000:]
+        return f"ffmpeg {self.label} exited with code {self.returncode}: {detail}"
+
+
+class FFmpegTimeoutError(FFmpegError):
+    """ffmpeg ran past its duration-proportional timeout and was killed."""
+
+    def __init__(self, label: str, stderr: bytes, timeout: float):
+        super().__init__(label, b'', stderr, -signal.SIGKILL)
+        self.timeout = timeout
+
+    def __str__(self):
+        return f"ffmpeg {self.label} timed out after {self.timeout:g} seconds"
+
+
+class FFmpegExecutor:
+    """Runs ffmpeg commands as asyncio subprocesses with a shared concurrency limit.
+
+    Commands run on an event loop owned by a background thread, so the
+    synchronous pipeline code calls ``run`` and simply waits while async code
+    can await ``run_async``. At most ``max_concurrency`` ffmpeg processes run
+    at once in this process, each is killed once it exceeds a timeout
+    proportional to the media duration, stderr is always captured for error
+    messages, and every invocation's queueing and run time is recorded.
+    """
+
+    def __init__(self, max_concurrency: Optional[int] = None, timeout_factor: Optional[float] = None,
+                 min_timeout: Optional[float] = None, unknown_duration_timeout: Optional[float] = None,
+                 history_size: int = 200):
+        self.max_concurrency = max_concurrency or int(
+            os.getenv('FFMPEG_MAX_CONCURRENCY', str(os.cpu_count() or 1))
+        )
+        # Wall-clock seconds allowed per second of media, and the floor for short media
+        self.timeout_factor = timeout_factor or float(os.getenv('FFMPEG_TIMEOUT_FACTOR', '3.0'))
+        self.min_timeout = min_timeout or float(os.getenv('FFMPEG_MIN_TIMEOUT', '60'))
+        # Media that could not be probed may be arbitrarily long, so it only gets a hang guard
+        self.unknown_duration_timeout = unknown_duration_timeout or float(
+            os.getenv('FFMPEG_UNKNOWN_DURATION_TIMEOUT', '3600')
+        )
+        self.history = deque(maxlen=history_size)
+        self._loop = None
+        self._loop_pid = None
+        self._semaphore = None
+        self._processes = set()
+        self._lock = threading.Lock()
+
+    def timeout_for(self, duration: Optional[float]) -> float:
+        if not duration or duration <= 0:
+            return max(self.min_timeout, self.unknown_duration_timeout)
+        return max(self.min_timeout, duration * self.timeout_factor)
+
+    def run(self, command, duration: Optional[float] = None, label: str = 'ffmpeg',
+            input: Optional[bytes] = None, capture_stdout: bool = False,
+            on_progress: Optional[Callable[[float], None]] = None,
+            on_stdout: Optional[Callable[[bytes], None]] = None) -> Optional[bytes]:
+        """Run ``command`` and block until it finishes; see ``run_async``."""
+        future = asyncio.run_coroutine_threadsafe(
+            self._run(command, duration, label, input, capture_stdout, on_progress, on_stdout),
+            self._get_loop()
+        )
+        return future.result()
+
+    async def run_async(self, command, duration: Optional[float] = None, label: str = 'ffmpeg',
+                        input: Optional[bytes] = None, capture_stdout: bool = False,
+                        on_progress: Optional[Callable[[float], None]] = None,
+                        on_stdout: Optional[Callable[[bytes], None]] = None) -> Optional[bytes]:
+        """Run an ffmpeg-python stream or argument list.
+
+        ``duration`` is the media length in seconds used for the timeout and
+        progress. ``input`` is written to stdin. Stdout is either returned
+        (``capture_stdout``), streamed to ``on_stdout`` in chunks, or parsed as
+        ``-progress`` output for ``on_progress(fraction)``. Callbacks run on
+        the executor's loop thread.
+        """
+        # Always run on the executor's loop so every caller shares one semaphore
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(
+            self._run(command, duration, label, input, capture_stdout, on_progress, on_stdout),
+            self._get_loop()
+        ))
+
+    async def _run(self, command, duration, label, input, capture_stdout, on_progress, on_stdout):
+        args = command.compile(overwrite_output=True) if hasattr(command, 'compile') else list(command)
+        if on_progress:
+            args = args[:1] + ['-progress', 'pipe:1', '-nostats'] + args[1:]
+        timeout = self.timeout_for(duration)
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        queued_at = time.time()
+        async with self._semaphore:
+            started_at = time.time()
+            process = await asyncio.create_subprocess_exec(
+                *args,
+                stdin=asyncio.subprocess.PIPE if input is not None else asyncio.subprocess.DEVNULL,
+                stdout=asyncio.subprocess.PIPE if (capture_stdout or on_progress or on_stdout)
+                else asyncio.subprocess.DEVNULL,
+                stderr=asyncio.subprocess.PIPE
+            )
+            with self._lock:
+                self._processes.add(process.pid)
+            stderr_task = asyncio.ensure_future(process.stderr.read())
+            timed_out = False
+            try:
+                stdout = await asyncio.wait_for(
+                    self._communicate(process, input, capture_stdout, duration, on_progress, on_stdout),
+                    timeout
+                )
+            except asyncio.TimeoutError:
+                timed_out = True
+                raise FFmpegTimeoutError(label, await self._kill(process, stderr_task), timeout)
+            except BaseException:
+                await self._kill(process, stderr_task)
+                raise
+            finally:
+                with self._lock:
+                    self._processes.discard(process.pid)
+                self._record(label, queued_at, started_at, duration, timeout, process.returncode, timed_out)
+
+            stderr = await stderr_task
+            if process.returncode != 0:
+                raise FFmpegError(label, stdout or b'', stderr, process.returncode)
+            return stdout if capture_stdout else None
+
+    async def _communicate(self, process, input, capture_stdout, duration, on_progress, on_stdout):
+        async def feed():
+            try:
+                process.stdin.write(input)
+                await process.stdin.drain()
+                process.stdin.close()
+            except (BrokenPipeError, ConnectionResetError):
+                # ffmpeg exited early; its return code and stderr explain why
+                pass
+
+        feeder = asyncio.ensure_future(feed()) if input is not None else None
+        stdout = None
+        if on_progress:
+            async for raw_line in process.stdout:
+                fraction = parse_ffmpeg_progress(raw_line.decode(errors='replace'), duration)
+                if fraction is not None:
+                    on_progress(fraction)
+        elif on_stdout:
+            while True:
+                chunk = await process.stdout.read(_READ_SIZE)
+                if not chunk:
+                    break
+                on_stdout(chunk)
+        elif capture_stdout:
+            stdout = await process.stdout.read()
+        if feeder is not None:
+            await feeder
+        await process.wait()
+        return stdout
+
+    @staticmethod
+    async def _kill(process, stderr_task) -> bytes:
+        if process.returncode is None:
+            process.kill()
+            await process.wait()
+        try:
+            return await stderr_task
+        except Exception:
+            return b''
+
+    def _record(self, label, queued_at, started_at, duration, timeout, returncode, timed_out):
+        finished_at = time.time()
+        entry = {
+            'label': label,
+            'wait_seconds': round(started_at - queued_at, 3),
+            'run_seconds': round(finished_at - started_at, 3),
+            'media_duration': duration,
+            'timeout': timeout,
+            'returncode': returncode,
+            'timed_out': timed_out
+        }
+        self.history.append(entry)
+
+    def stats(self) -> dict:
+        """Summarize recorded invocations per label."""
+        summary = {}
+        for entry in list(self.history):
+            label = summary.setdefault(entry['label'], {'count': 0, 'run_seconds': 0.0, 'max_run_seconds': 0.0,
+                                                        'wait_seconds': 0.0, 'failures': 0})
+            label['count'] += 1
+            label['run_seconds'] += entry['run_seconds']
+            label['max_run_seconds'] = max(label['max_run_seconds'], entry['run_seconds'])
+            label['wait_seconds'] += entry['wait_seconds']
+            label['failures'] += int(entry['returncode'] != 0)
+        return summary
+
+    def cancel_all(self):
+        """Kill every running ffmpeg process (safe to call from a signal handler).
+
+        Never takes ``_lock``: the handler runs on the main thread, which may
+        already hold it, so the pid set is snapshotted without blocking and
+        the copy retried if the loop thread changes it mid-iteration.
+        """
+        while True:
+            try:
+                pids = tuple(self._processes)
+                break
+            except RuntimeError:
+                continue
+        for pid in pids:
+            try:
+                os.kill(pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+
+    def _get_loop(self):
+        # A forked worker inherits the object but not the loop thread, so start one per process
+        with self._lock:
+            if self._loop is None or self._loop_pid != os.getpid():
+                self._loop = asyncio.new_event_loop()
+                self._loop_pid = os.getpid()
+                self._semaphore = None
+                self._processes = set()
+                threading.Thread(target=self._loop.run_forever, daemon=True).start()
+            return self._loop
+
+
+ffmpeg_executor = FFmpegExecutor()
+
+
+def install_revoke_handler():
+    """Kill running ffmpeg processes when this worker process is terminated.
+
+    ``revoke(terminate=True)`` delivers SIGTERM to the worker process running
+    the task; without this its ffmpeg children would keep running orphaned.
+    """
+    previous = signal.getsignal(signal.SIGTERM)
+
+    def handle_sigterm(signum, frame):
+        ffmpeg_executor.cancel_all()
+        if callable(previous):
+            previous(signum, frame)
+        else:
+            signal.signal(signum, previous or signal.SIG_DFL)
+            os.kill(os.getpid(), signum)
+
+    signal.signal(signal.SIGTERM, handle_sigterm)
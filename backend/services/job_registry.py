@@ -0,0 +1,257 @@
+import atexit
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Optional
+
+from dotenv import load_dotenv
+from sqlalchemy import bindparam
+
+from models import ProcessingStatus, Translation, Video
+from services.progress import STAGES
+
+load_dotenv()
+
+# API status names for the stored ProcessingStatus values
+API_STATUSES = {
+    ProcessingStatus.QUEUED.value: 'queued',
+    ProcessingStatus.PROCESSING.value: 'processing',
+    ProcessingStatus.COMPLETED.value: 'completed',
+    ProcessingStatus.FAILED.value: 'error',
+}
+
+
+def result_error(result) -> Optional[str]:
+    """Return a final task result's error message, or None if the job succeeded.
+
+    ``process_video_task`` wraps the pipeline's own result, so a failed
+    pipeline arrives as ``{'status': 'success', 'result': {'status': 'error', ...}}``.
+    """
+    if not isinstance(result, dict):
+        return str(result)
+    if result.get('status') != 'success':
+        return result.get('error') or 'Unknown error'
+    inner = result.get('result')
+    if not isinstance(inner, dict):
+        return 'Missing job result'
+    if inner.get('status') != 'success':
+        return inner.get('error') or 'Unknown error'
+    return None
+
+
+class JobRegistry:
+    """Persists jobs in the ``translations`` table, keyed by Celery task id.
+
+    Progress reported from workers is buffered per task and written every
+    ``flush_interval`` seconds as one batched UPDATE, so a job's many progress
+    updates cost a handful of commits rather than one each. Job creation and
+    final results are written immediately. Without ``DATABASE_URL`` the
+    registry is disabled and every method is a no-op.
+    """
+
+    def __init__(self, session_factory=None, flush_interval: Optional[float] = None):
+        self.enabled = session_factory is not None or bool(os.getenv('DATABASE_URL'))
+        self._session_factory = session_factory
+        self.flush_interval = flush_interval if flush_interval is not None else float(
+            os.getenv('JOB_PROGRESS_FLUSH_INTERVAL', '5')
+        )
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._flusher = None
+        self._flusher_pid = None
+
+    def _session(self):
+        if self._session_factory is None:
+            # database.py builds its engine at import, so only import it when configured
+            from database import SessionLocal
+            self._session_factory = SessionLocal
+        return self._session_factory()
+
+    def create_job(self, task_id: str, file_info: dict, source_language: Optional[str],
+                   target_language: str, preserve_voice: bool, owner_id: Optional[int] = None):
+        """Insert the job's Video and Translation rows before it is queued."""
+        if not self.enabled:
+            return
+        session = self._session()
+        try:
+            video = Video(
+                title=file_info['filename'],
+                original_filename=file_info['filename'],
+                stored_filename=os.path.basename(file_info['file_path']),
+                file_size=file_info['size'],
+                duration=file_info.get('duration'),
+                format=os.path.splitext(file_info['filename'])[1].lstrip('.').lower(),
+                owner_id=owner_id
+            )
+            session.add(video)
+            session.flush()
+            session.add(Translation(
+                task_id=task_id,
+                video_id=video.id,
+                source_language=source_language,
+                target_language=target_language,
+                status=ProcessingStatus.QUEUED.value,
+                progress=0.0,
+                preserve_voice=preserve_voice
+            ))
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+
+    def record_progress(self, task_id: str, meta: dict):
+        """Buffer a progress update; only the latest one per task is written."""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._pending[task_id] = {
+                'b_task_id': task_id,
+                'status': ProcessingStatus.PROCESSING.value,
+                'progress': float(meta.get('percent', 0)),
+                'current_step': (meta.get('current_step') or {}).get('name'),
+                'updated_at': datetime.utcnow()
+            }
+            self._ensure_flusher()
+
+    def record_result(self, task_id: str, result):
+        """Write a job's final state straight away, superseding buffered progress."""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._pending.pop(task_id, None)
+
+        values = {'updated_at': datetime.utcnow(), 'completed_at': datetime.utcnow()}
+        error = result_error(result)
+        if error is None:
+            values.update(
+                status=ProcessingStatus.COMPLETED.value,
+                progress=100.0,
+                current_step=None,
+                translated_video_path=result['result'].get('video_path')
+            )
+        else:
+            values.update(status=ProcessingStatus.FAILED.value, error_message=error)
+
+        session = self._session()
+        try:
+            session.query(Translation).filter(Translation.task_id == task_id).update(
+                values, synchronize_session=False
+            )
+            session.commit()
+        except Exception as e:
+            session.rollback()
+            print(f"Failed to record result for {task_id}: {str(e)}")
+        finally:
+            session.close()
+
+    def flush(self):
+        """Write all buffered progress in a single batched UPDATE."""
+        with self._lock:
+            rows = list(self._pending.values())
+            self._pending.clear()
+        if not rows:
+            return
+
+        table = Translation.__table__
+        statement = (
+            table.update()
+            .where(table.c.task_id == bindparam('b_task_id'))
+            # A late flush must never move a finished job back to processing
+            .where(table.c.status != ProcessingStatus.COMPLETED.value)
+            .where(table.c.status != ProcessingStatus.FAILED.value)
+            .values(
+                status=bindparam('status'),
+                progress=bindparam('progress'),
+                current_step=bindparam('current_step'),
+                updated_at=bindparam('updated_at')
+            )
+        )
+        session = self._session()
+        try:
+            session.execute(statement, rows)
+            session.commit()
+        except Exception as e:
+            session.rollback()
+            print(f"Failed to flush progress for {len(rows)} jobs: {str(e)}")
+        finally:
+            session.close()
+
+    def get_job(self, task_id: str) -> Optional[dict]:
+        if not self.enabled:
+            return None
+        session = self._session()
+        try:
+            translation = session.query(Translation).filter(Translation.task_id == task_id).first()
+            return self._to_dict(translation) if translation else None
+        finally:
+            session.close()
+
+    def list_jobs(self, status: Optional[str] = None, limit: int = 50, offset: int = 0) -> list:
+        """Return jobs newest-first, optionally filtered by API status name."""
+        if not self.enabled:
+            return []
+        session = self._session()
+        try:
+            query = session.query(Translation)
+            if status:
+                stored = [value for value, name in API_STATUSES.items() if name == status]
+                query = query.filter(Translation.status.in_(stored))
+            query = query.order_by(Translation.created_at.desc()).offset(offset).limit(limit)
+            return [self._to_dict(translation) for translation in query]
+        finally:
+            session.close()
+
+    def _ensure_flusher(self):
+        # Started lazily so each forked worker process gets its own thread
+        if self._flusher is not None and self._flusher_pid == os.getpid():
+            return
+        self._flusher_pid = os.getpid()
+        self._flusher = threading.Thread(target=self._flush_loop, daemon=True)
+        self._flusher.start()
+        atexit.register(self.flush)
+
+    def _flush_loop(self):
+        while True:
+            time.sleep(self.flush_interval)
+            self.flush()
+
+    @staticmethod
+    def _to_dict(translation: Translation) -> dict:
+        return {
+            'task_id': translation.task_id,
+            'video_id': translation.video_id,
+            'status': API_STATUSES.get(translation.status, translation.status),
+            'progress': translation.progress,
+            'current_step': translation.current_step,
+            'source_language': translation.source_language,
+            'target_language': translation.target_language,
+            'preserve_voice': translation.preserve_voice,
+            'error': translation.error_message,
+            'video_path': translation.translated_video_path,
+            'created_at': translation.created_at.isoformat() if translation.created_at else None,
+            'updated_at': translation.updated_at.isoformat() if translation.updated_at else None,
+            'completed_at': translation.completed_at.isoformat() if translation.completed_at else None
+        }
+
+
+def job_status_payload(job: dict) -> dict:
+    """Build an ``/api/status`` body from a registry row for unfinished or failed jobs."""
+    payload = {"task_id": job['task_id'], "status": job['status']}
+    if job['status'] == 'processing':
+        step = job['current_step']
+        payload.update(
+            progress={'percent': job['progress'], 'current': STAGES[step][0] if step in STAGES else None},
+            percent=job['progress'],
+            current_step={'step_number': STAGES[step][1], 'name': step} if step in STAGES else None
+        )
+    elif job['status'] == 'queued':
+        payload['progress'] = {"step": "waiting", "percentage": 0}
+    elif job['status'] == 'error':
+        payload['error'] = job['error']
+    return payload
+
+
+job_registry = JobRegistry()
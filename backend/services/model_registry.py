@@ -0,0 +1,246 @@
+import gc
+import os
+import threading
+from collections import OrderedDict
+from typing import Callable, Optional
+
+import google.generativeai as genai
+import whisper
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+def _estimate_model_bytes(model) -> int:
+    """Estimate the memory held by a model's parameters and buffers."""
+    try:
+        total = sum(p.numel() * p.element_size() for p in model.parameters())
+        total += sum(b.numel() * b.element_size() for b in model.buffers())
+        return total
+    except Exception:
+        return 0
+
+
+def default_max_models() -> int:
+    """LRU capacity when ``MODEL_CACHE_MAX_MODELS`` is unset, sized from the enabled local backends.
+
+    Pinned Whisper models do not count, so this is one slot per local
+    backend a job loads (translation, TTS, source separation) plus one for
+    a per-job Whisper size or language pair outside the defaults.
+    """
+    local_backends = [
+        os.getenv('TRANSLATION_BACKEND', 'gemini').lower() == 'local',
+        os.getenv('TTS_BACKEND', 'elevenlabs').lower() == 'local',
+        os.getenv('SEPARATE_BACKGROUND_AUDIO', 'false').lower() == 'true',
+    ]
+    return max(2, sum(local_backends) + 1)
+
+
+class ModelRegistry:
+    """Process-level cache of loaded models, shared read-only across tasks.
+
+    Models are loaded on first use (or eagerly via ``warm_up``) and kept until
+    the registry exceeds ``max_models`` entries or ``max_bytes`` of parameters,
+    at which point the least recently used models are evicted. Pinned models
+    (the configured Whisper sizes) are never evicted and do not count
+    towards ``max_models``, so local translation, TTS and separation models
+    cannot push Whisper out between jobs.
+    """
+
+    def __init__(self, max_models: Optional[int] = None, max_bytes: Optional[int] = None):
+        self.max_models = max_models if max_models is not None else int(
+            os.getenv('MODEL_CACHE_MAX_MODELS') or default_max_models()
+        )
+        self.max_bytes = max_bytes if max_bytes is not None else int(os.getenv('MODEL_CACHE_MAX_BYTES', '0'))
+        self._models = OrderedDict()
+        self._sizes = {}
+        self._pinned = set()
+        self._lock = threading.RLock()
+
+    def get(self, key: tuple, loader: Callable, pinned: bool = False):
+        """Return the cached model for ``key``, loading it with ``loader`` if needed.
+
+        A loader should attach companion objects such as a tokenizer to the
+        model it returns, so they are cached and evicted together.
+        """
+        with self._lock:
+            if pinned:
+                self._pinned.add(key)
+            if key in self._models:
+                self._models.move_to_end(key)
+                return self._models[key]
+
+            print(f"Loading model {key} into worker cache...")
+            model = loader()
+            self._models[key] = model
+            self._sizes[key] = _estimate_model_bytes(model)
+            self._evict(keep=key)
+            return model
+
+    def evict(self, key: tuple) -> bool:
+        """Drop a single model from the cache."""
+        with self._lock:
+            if key not in self._models:
+                return False
+            del self._models[key]
+            self._sizes.pop(key, None)
+            self._pinned.discard(key)
+        gc.collect()
+        print(f"Evicted model {key} from worker cache")
+        return True
+
+    def clear(self):
+        """Drop every cached model."""
+        with self._lock:
+            self._models.clear()
+            self._sizes.clear()
+            self._pinned.clear()
+        gc.collect()
+
+    def stats(self) -> dict:
+        """Describe what is currently loaded, most recently used last."""
+        with self._lock:
+            return {
+                'models': [
+                    {'key': list(key), 'bytes': self._sizes.get(key, 0), 'pinned': key in self._pinned}
+                    for key in self._models
+                ],
+                'total_bytes': sum(self._sizes.values()),
+                'max_models': self.max_models,
+                'max_bytes': self.max_bytes
+            }
+
+    def _evict(self, keep: tuple):
+        evicted = False
+        while True:
+            unpinned = [key for key in self._models if key not in self._pinned]
+            over_count = self.max_models > 0 and len(unpinned) > self.max_models
+            over_bytes = self.max_bytes > 0 and sum(self._sizes.values()) > self.max_bytes
+            if not (over_count or over_bytes) or not unpinned:
+                break
+            oldest = unpinned[0]
+            if oldest == keep:
+                break
+            del self._models[oldest]
+            self._sizes.pop(oldest, None)
+            evicted = True
+            print(f"Evicted model {oldest} from worker cache")
+        if evicted:
+            gc.collect()
+
+
+registry = ModelRegistry()
+_gemini_models = {}
+_gemini_lock = threading.Lock()
+
+
+def configured_whisper_sizes() -> list:
+    """Whisper model sizes this worker should serve, default size first."""
+    sizes = [s.strip() for s in os.getenv('WHISPER_MODEL_SIZES', 'base').split(',')]
+    return [s for s in sizes if s] or ['base']
+
+
+def whisper_quantization() -> str:
+    """``int8`` for dynamically quantized CPU inference, ``none`` for float32."""
+    return os.getenv('WHISPER_QUANTIZE', 'none').lower()
+
+
+def _load_whisper(size: str, quantization: str):
+    model = whisper.load_model(size, device='cpu' if quantization == 'int8' else None)
+    if quantization == 'int8':
+        import torch
+
+        # Whisper's Linear subclass only adds dtype casting, which int8 kernels
+        # do themselves; quantize_dynamic only swaps exact nn.Linear modules
+        for module in model.modules():
+            if isinstance(module, torch.nn.Linear):
+                module.__class__ = torch.nn.Linear
+        model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    return model
+
+
+def get_whisper_model(size: Optional[str] = None, quantization: Optional[str] = None):
+    """Return a shared Whisper model, loading it once per worker process.
+
+    With ``WHISPER_QUANTIZE=int8`` the model's linear layers (nearly all of
+    its compute) are dynamically quantized to int8 for CPU inference.
+    """
+    size = size or configured_whisper_sizes()[0]
+    quantization = quantization or whisper_quantization()
+    # The configured sizes serve every job, so they stay loaded; other sizes share the LRU
+    pinned = size in configured_whisper_sizes() and quantization == whisper_quantization()
+    return registry.get(('whisper', size, quantization), lambda: _load_whisper(size, quantization), pinned=pinned)
+
+
+def select_whisper_size(duration: Optional[float] = None, requested: Optional[str] = None) -> str:
+    """Pick the Whisper size for a job: the requested one, else by media duration.
+
+    ``WHISPER_SIZE_BY_DURATION`` is a list of ``max_seconds:size`` rules, e.g.
+    ``300:small,1800:base`` transcribes clips up to five minutes with
+    ``small``, up to half an hour with ``base``, and anything longer (or of
+    unknown length) with the default size, so long videos stay affordable.
+    """
+    if requested:
+        return requested
+    default = configured_whisper_sizes()[0]
+    if not duration or duration <= 0:
+        return default
+    for rule in os.getenv('WHISPER_SIZE_BY_DURATION', '').split(','):
+        if ':' not in rule:
+            continue
+        max_seconds, size = rule.split(':', 1)
+        if duration <= float(max_seconds):
+            return size.strip()
+    return default
+
+
+def torch_thread_budget() -> int:
+    """Threads each worker process may use for model inference.
+
+    ``TORCH_NUM_THREADS`` wins when set; otherwise the host's cores are split
+    evenly across the worker's processes (``WORKER_CONCURRENCY``, recorded by
+    the Celery worker before it forks), so sibling processes do not each
+    start one thread per core and oversubscribe the CPU.
+    """
+    if os.getenv('TORCH_NUM_THREADS'):
+        return max(1, int(os.getenv('TORCH_NUM_THREADS')))
+    concurrency = int(os.getenv('WORKER_CONCURRENCY') or '1')
+    return max(1, (os.cpu_count() or 1) // max(1, concurrency))
+
+
+def configure_threads() -> int:
+    """Apply ``torch_thread_budget`` to this process; returns the thread count."""
+    import torch
+
+    threads = torch_thread_budget()
+    torch.set_num_threads(threads)
+    return threads
+
+
+def get_gemini_model(name: str = 'gemini-pro'):
+    """Return a shared Gemini model handle, configuring the client only once."""
+    # Gemini handles are lightweight API clients, so they live outside the
+    # LRU and never push a Whisper model out of the cache.
+    with _gemini_lock:
+        if name not in _gemini_models:
+            if not _gemini_models:
+                endpoint = os.getenv('GEMINI_API_ENDPOINT')
+                if endpoint:
+                    # Alternate endpoint, e.g. the benchmark's local stand-in server
+                    genai.configure(api_key=os.getenv('GEMINI_API_KEY'), transport='rest',
+                                    client_options={'api_endpoint': endpoint})
+                else:
+                    genai.configure(api_key=os.getenv('GEMINI_API_KEY'))
+            _gemini_models[name] = genai.GenerativeModel(name)
+        return _gemini_models[name]
+
+
+def warm_up():
+    """Preload the configured models, e.g. from Celery's ``worker_process_init``."""
+    if os.getenv('MODEL_WARMUP', 'true').lower() not in ('1', 'true', 'yes'):
+        # Workers that only serve network-bound stages never need the models
+        return
+    for size in configured_whisper_sizes():
+        get_whisper_model(size)
+    get_gemini_model()
+    print(f"Model cache warmed: {registry.stats()}")
@@ -0,0 +1,96 @@
+import os
+import threading
+import time
+from typing import Callable, Optional
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Pipeline stages in order: (name, label, step number shown by the frontend, start %, end %)
+STAGES = {
+    'audio_extraction': ('Extracting audio...', 1, 0, 10),
+    'transcription': ('Transcribing audio...', 2, 10, 45),
+    'translation': ('Translating text...', 3, 45, 60),
+    'voice_cloning': ('Cloning voice...', 4, 60, 65),
+    'speech_generation': ('Generating speech...', 4, 65, 85),
+    'background_separation': ('Separating background audio...', 5, 85, 90),
+    'audio_merge': ('Merging audio with video...', 5, 90, 100),
+}
+
+
+class ProgressReporter:
+    """Turns stage and intra-stage progress into throttled status updates.
+
+    Stage changes are always published; progress within a stage is published
+    at most once every ``min_interval`` seconds, and only when the overall
+    percentage has moved, so the result backend is not flooded.
+    """
+
+    def __init__(self, callback: Optional[Callable[[dict], None]] = None,
+                 min_interval: Optional[float] = None):
+        self.callback = callback
+        self.min_interval = min_interval if min_interval is not None else float(
+            os.getenv('PROGRESS_MIN_INTERVAL', '2.0')
+        )
+        self.stage_name = None
+        self._last_sent = 0.0
+        self._last_percent = None
+        self._lock = threading.Lock()
+
+    def stage(self, name: str, detail: Optional[str] = None):
+        """Enter a pipeline stage and publish it immediately."""
+        with self._lock:
+            self.stage_name = name
+            self._publish(0.0, detail, force=True)
+
+    def update(self, fraction: float, detail: Optional[str] = None):
+        """Report progress within the current stage as a fraction from 0 to 1."""
+        with self._lock:
+            self._publish(max(0.0, min(1.0, fraction)), detail, force=False)
+
+    def tracker(self, unit: str) -> Callable[[int, int], None]:
+        """Return an ``on_progress(done, total)`` callback counting ``unit`` (windows, chunks, ...)."""
+        def on_progress(done: int, total: int):
+            self.update(done / total if total else 1.0, f"{done}/{total} {unit}")
+        return on_progress
+
+    def _publish(self, fraction: float, detail: Optional[str], force: bool):
+        if self.callback is None or self.stage_name is None:
+            return
+        label, step_number, start, end = STAGES[self.stage_name]
+        percent = int(start + (end - start) * fraction)
+        now = time.time()
+        if not force and (percent == self._last_percent or now - self._last_sent < self.min_interval):
+            return
+
+        meta = {
+            'current': label,
+            'percent': percent,
+            'current_step': {
+                'step_number': step_number,
+                'name': self.stage_name,
+                'progress': round(fraction, 3)
+            }
+        }
+        if detail:
+            meta['detail'] = detail
+        try:
+            self.callback(meta)
+        except Exception as e:
+            # Progress is best effort and must never fail the job
+            print(f"Failed to publish progress: {str(e)}")
+        self._last_sent = now
+        self._last_percent = percent
+
+
+def parse_ffmpeg_progress(line: str, duration: float) -> Optional[float]:
+    """Parse one ``-progress`` line from ffmpeg into a completed fraction."""
+    key, _, value = line.strip().partition('=')
+    if key not in ('out_time_us', 'out_time_ms') or not duration:
+        return None
+    try:
+        # Both keys are reported in microseconds by ffmpeg
+        return min(1.0, int(value) / 1_000_000 / duration)
+    except ValueError:
+        return None
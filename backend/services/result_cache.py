@@ -0,0 +1,203 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+import uuid
+from typing import Optional
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Sidecar marking when an entry was last used
+USED_SUFFIX = '.used'
+
+
+def hash_file(file_path: str, chunk_size: int = 8 * 1024 * 1024) -> str:
+    """Compute the sha256 of a file without loading it into memory."""
+    hasher = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+class ResultCache:
+    """Disk cache of pipeline stage outputs keyed by source content hash.
+
+    Each entry is addressed by the upload's sha256 plus the stage name and
+    the parameters that affect its output, so re-running a job on the same
+    video skips every stage whose inputs have not changed. Entries are
+    evicted least-recently-used once the cache exceeds ``max_bytes``.
+
+    File entries are hard links to pipeline outputs that are also being
+    served, so recency is recorded on a ``.used`` sidecar next to each entry
+    rather than by touching the shared inode (whose mtime is the download's
+    ETag). Each process keeps a running size total, seeded by one scan of
+    the cache and grown on every store; the cache is only rescanned (which
+    also picks up other processes' entries) once that total passes the cap.
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None, max_bytes: Optional[int] = None,
+                 enabled: Optional[bool] = None):
+        self.cache_dir = cache_dir or os.getenv('RESULT_CACHE_DIR', 'cache')
+        self.max_bytes = max_bytes if max_bytes is not None else int(
+            os.getenv('RESULT_CACHE_MAX_BYTES', str(5 * 1024 ** 3))
+        )
+        if enabled is None:
+            enabled = os.getenv('RESULT_CACHE_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._total_bytes = None
+        if self.enabled:
+            os.makedirs(self.cache_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(content_hash: str, stage: str, params: Optional[dict] = None) -> str:
+        """Build the cache key for one stage of one source file."""
+        payload = json.dumps({'hash': content_hash, 'stage': stage, 'params': params or {}}, sort_keys=True)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def fetch_json(self, content_hash: Optional[str], stage: str, params: Optional[dict] = None):
+        """Return a cached JSON stage result, or ``None`` on a miss."""
+        path = self._lookup(content_hash, stage, params, '.json')
+        if path is None:
+            return None
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except Exception as e:
+            print(f"Ignoring unreadable cache entry {path}: {str(e)}")
+            return None
+
+    def store_json(self, content_hash: Optional[str], stage: str, params: Optional[dict], value):
+        """Cache a JSON-serializable stage result."""
+        if not self.enabled or not content_hash:
+            return
+        path = self._entry_path(self.make_key(content_hash, stage, params), '.json')
+        tmp_path = self._tmp_path(path)
+        try:
+            with open(tmp_path, 'w') as f:
+                json.dump(value, f)
+            os.replace(tmp_path, path)
+            self._touch(path)
+            self._evict(added=os.path.getsize(path))
+        except Exception as e:
+            print(f"Failed to cache {stage} result: {str(e)}")
+            self._remove(tmp_path)
+
+    def fetch_file(self, content_hash: Optional[str], stage: str, params: Optional[dict],
+                   dest_path: str) -> Optional[str]:
+        """Materialize a cached file stage result at ``dest_path``, or return ``None``."""
+        suffix = os.path.splitext(dest_path)[1]
+        path = self._lookup(content_hash, stage, params, suffix)
+        if path is None:
+            return None
+        try:
+            self._remove(dest_path)
+            self._link_or_copy(path, dest_path)
+            return dest_path
+        except Exception as e:
+            print(f"Failed to restore cached {stage} file: {str(e)}")
+            return None
+
+    def store_file(self, content_hash: Optional[str], stage: str, params: Optional[dict], file_path: str):
+        """Cache a file stage result; the pipeline keeps ownership of ``file_path``."""
+        if not self.enabled or not content_hash or not os.path.exists(file_path):
+            return
+        suffix = os.path.splitext(file_path)[1]
+        path = self._entry_path(self.make_key(content_hash, stage, params), suffix)
+        tmp_path = self._tmp_path(path)
+        try:
+            self._link_or_copy(file_path, tmp_path)
+            os.replace(tmp_path, path)
+            self._touch(path)
+            self._evict(added=os.path.getsize(path))
+        except Exception as e:
+            print(f"Failed to cache {stage} file: {str(e)}")
+            self._remove(tmp_path)
+
+    def _lookup(self, content_hash: Optional[str], stage: str, params: Optional[dict], suffix: str):
+        if not self.enabled or not content_hash:
+            return None
+        path = self._entry_path(self.make_key(content_hash, stage, params), suffix)
+        if not os.path.exists(path):
+            return None
+        self._touch(path)
+        print(f"Cache hit for {stage}")
+        return path
+
+    def _entry_path(self, key: str, suffix: str) -> str:
+        directory = os.path.join(self.cache_dir, key[:2])
+        os.makedirs(directory, exist_ok=True)
+        return os.path.join(directory, key + suffix)
+
+    @staticmethod
+    def _tmp_path(path: str) -> str:
+        return f"{path}.{uuid.uuid4().hex}.tmp"
+
+    @staticmethod
+    def _link_or_copy(src: str, dest: str):
+        # Hard links make cache hits free when cache and uploads share a filesystem
+        try:
+            os.link(src, dest)
+        except OSError:
+            shutil.copyfile(src, dest)
+
+    @staticmethod
+    def _touch(path: str):
+        """Mark an entry as used now, via its sidecar so the entry's own inode is untouched."""
+        try:
+            with open(path + USED_SUFFIX, 'a'):
+                pass
+            os.utime(path + USED_SUFFIX)
+        except OSError:
+            pass
+
+    def _scan(self) -> list:
+        """List ``(last_used, size, path)`` for every entry in the cache."""
+        entries = []
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if name.endswith(('.tmp', USED_SUFFIX)):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                try:
+                    last_used = os.stat(path + USED_SUFFIX).st_mtime
+                except OSError:
+                    last_used = stat.st_mtime
+                entries.append((last_used, stat.st_size, path))
+        return entries
+
+    def _evict(self, added: int = 0):
+        if self.max_bytes <= 0:
+            return
+        with self._lock:
+            if self._total_bytes is not None:
+                self._total_bytes += added
+                if self._total_bytes <= self.max_bytes:
+                    return
+
+            entries = self._scan()
+            total = sum(size for _, size, _ in entries)
+            if total > self.max_bytes:
+                for _, size, path in sorted(entries):
+                    self._remove(path)
+                    self._remove(path + USED_SUFFIX)
+                    total -= size
+                    if total <= self.max_bytes:
+                        break
+            self._total_bytes = total
+
+    @staticmethod
+    def _remove(path: str):
+        if path and os.path.exists(path):
+            try:
+                os.remove(path)
+            except OSError as e:
+                print(f"Failed to remove {path}: {str(e)}")
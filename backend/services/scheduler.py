@@ -0,0 +1,222 @@
+import json
+import os
+import time
+from typing import Callable, Optional
+
+import redis
+from dotenv import load_dotenv
+
+from services.audio_io import probe_duration
+
+load_dotenv()
+
+REDIS_URL = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
+
+# Lane name -> Celery queue its jobs are dispatched to ("celery" is the default queue)
+LANES = {
+    'fast': 'fast',
+    'standard': 'celery',
+}
+
+
+# Media length assumed for cost estimates when probing fails
+UNKNOWN_DURATION_SECONDS = 120.0
+
+
+class JobScheduler:
+    """Admits translation jobs into per-lane Celery queues with per-owner fair share.
+
+    Each job's processing time is estimated from its probed media duration,
+    and with ``FAST_LANE_MAX_SECONDS`` set, jobs at most that long go to the
+    fast lane so short clips never wait behind long videos; the lane is off
+    by default, since it needs a worker consuming the ``fast`` queue. Within a lane an owner may
+    have at most ``FAIR_SHARE_MAX_ACTIVE`` jobs dispatched at once; further
+    jobs are held in the owner's Redis list and released one by one as
+    their earlier jobs finish, so one user's batch cannot fill the queue.
+
+    An owner's dispatched jobs are kept in a sorted set scored by a
+    deadline (``SCHEDULER_SLOT_TTL`` seconds, or twice the job's estimated
+    cost if longer). A job whose worker died without reporting back (hard
+    time limit, OOM kill) holds its slot only until then: ``reconcile``
+    reclaims expired slots and dispatches the owner's held jobs.
+    """
+
+    def __init__(self, dispatch: Callable[[dict], None], redis_url: str = REDIS_URL):
+        self.dispatch = dispatch
+        self.redis_url = redis_url
+        # 0 disables the fast lane: every job goes to the default queue
+        self.fast_lane_max_seconds = float(os.getenv('FAST_LANE_MAX_SECONDS', '0'))
+        self.max_active_per_owner = int(os.getenv('FAIR_SHARE_MAX_ACTIVE', '2'))
+        # Processing seconds per second of media, and fixed overhead for voice cloning
+        self.cost_per_second = float(os.getenv('JOB_COST_PER_MEDIA_SECOND', '1.5'))
+        self.voice_clone_cost = float(os.getenv('JOB_VOICE_CLONE_COST', '30'))
+        # Longest a dispatched job may hold its slot without finishing; covers Celery's task_time_limit
+        self.slot_ttl = float(os.getenv('SCHEDULER_SLOT_TTL', '3900'))
+        self.lane_workers = {
+            'fast': int(os.getenv('FAST_LANE_WORKERS', '1')),
+            'standard': int(os.getenv('STANDARD_LANE_WORKERS', '1')),
+        }
+        self._redis = None
+
+    @property
+    def redis(self):
+        if self._redis is None:
+            self._redis = redis.Redis.from_url(self.redis_url, decode_responses=True)
+        return self._redis
+
+    def estimate(self, file_path: str, preserve_voice: bool) -> dict:
+        """Return the job's media duration, estimated cost in seconds, and lane."""
+        duration = probe_duration(file_path)
+        # Unprobeable media is treated as long rather than trusted with the fast lane
+        lane = 'fast' if 0 < duration <= self.fast_lane_max_seconds else 'standard'
+        cost = (duration if duration > 0 else UNKNOWN_DURATION_SECONDS) * self.cost_per_second
+        if preserve_voice:
+            cost += self.voice_clone_cost
+        return {'duration': duration, 'cost': cost, 'lane': lane}
+
+    def submit(self, job: dict) -> dict:
+        """Dispatch ``job`` now or hold it behind the owner's running jobs.
+
+        ``job`` must carry ``task_id``, ``owner``, ``lane`` and ``cost`` plus
+        whatever the dispatch callable needs. Returns the job's lane and
+        estimated wait.
+        """
+        lane, owner = job['lane'], job['owner']
+        self.reconcile_owner(lane, owner)
+        estimated_wait = self.lane_stats(lane)['estimated_wait_seconds']
+
+        held = not self._claim(lane, owner, job)
+        if not held:
+            self._dispatch(job)
+        return {'lane': lane, 'held': held, 'estimated_wait_seconds': estimated_wait}
+
+    def _claim(self, lane: str, owner: str, job: Optional[dict] = None) -> Optional[dict]:
+        """Atomically give a job one of the owner's free slots.
+
+        With ``job``, it either takes a slot or joins the end of the owner's
+        held list, and is returned only if it got a slot. Without, the
+        owner's oldest held job takes a free slot and is returned, or None if
+        there is no free slot or held job. The slot count is WATCHed, so
+        concurrent submits and releases cannot admit past the cap.
+        """
+        active_key = f"sched:{lane}:active:{owner}"
+        held_key = f"sched:{lane}:held:{owner}"
+        with self.redis.pipeline() as pipe:
+            while True:
+                try:
+                    pipe.watch(active_key, held_key)
+                    free = pipe.zcard(active_key) < self.max_active_per_owner
+                    claimed = job
+                    if job is None:
+                        next_job = pipe.lindex(held_key, 0) if free else None
+                        if next_job is None:
+                            pipe.unwatch()
+                            return None
+                        claimed = json.loads(next_job)
+                    pipe.multi()
+                    pipe.sadd(f"sched:{lane}:owners", owner)
+                    if job is None:
+                        pipe.lpop(held_key)
+                    if free:
+                        pipe.zadd(active_key, {claimed['task_id']: self._deadline(claimed)})
+                    else:
+                        pipe.rpush(held_key, json.dumps(job))
+                    pipe.execute()
+                    return claimed if free else None
+                except redis.WatchError:
+                    continue
+
+    def release(self, task_id: str):
+        """Free a finished job's slot and dispatch the owner's next held job, if any."""
+        key = f"sched:job:{task_id}"
+        pipe = self.redis.pipeline()
+        pipe.hgetall(key)
+        pipe.delete(key)
+        info, deleted = pipe.execute()
+        if not deleted:
+            # Already released (e.g. by both the final task and the failure handler, or reclaimed)
+            return
+
+        lane, owner = info['lane'], info['owner']
+        self.redis.zrem(f"sched:{lane}:active:{owner}", task_id)
+        self.redis.hdel(f"sched:{lane}:cost", task_id)
+        self._fill(lane, owner)
+
+    def reconcile(self) -> int:
+        """Reclaim slots held past their deadline in every lane; return how many were reclaimed."""
+        return sum(
+            self.reconcile_owner(lane, owner)
+            for lane in LANES for owner in self.redis.smembers(f"sched:{lane}:owners")
+        )
+
+    def reconcile_owner(self, lane: str, owner: str) -> int:
+        active_key = f"sched:{lane}:active:{owner}"
+        expired = self.redis.zrangebyscore(active_key, '-inf', time.time())
+        for task_id in expired:
+            print(f"Reclaiming scheduler slot of {task_id}: no result before its deadline")
+            self.redis.zrem(active_key, task_id)
+            self.redis.hdel(f"sched:{lane}:cost", task_id)
+            self.redis.delete(f"sched:job:{task_id}")
+        self._fill(lane, owner)
+        self._forget_if_idle(lane, owner)
+        return len(expired)
+
+    def _forget_if_idle(self, lane: str, owner: str):
+        """Stop tracking an owner with no slots or held jobs, unless a submit claims one meanwhile."""
+        active_key = f"sched:{lane}:active:{owner}"
+        held_key = f"sched:{lane}:held:{owner}"
+        with self.redis.pipeline() as pipe:
+            try:
+                pipe.watch(active_key, held_key)
+                if pipe.zcard(active_key) or pipe.llen(held_key):
+                    pipe.unwatch()
+                    return
+                pipe.multi()
+                pipe.srem(f"sched:{lane}:owners", owner)
+                pipe.execute()
+            except redis.WatchError:
+                # The owner just got a job, so it stays tracked
+                pass
+
+    def _fill(self, lane: str, owner: str):
+        """Dispatch the owner's held jobs while they have free slots."""
+        while True:
+            job = self._claim(lane, owner)
+            if job is None:
+                break
+            self._dispatch(job)
+
+    def _deadline(self, job: dict) -> float:
+        return time.time() + max(self.slot_ttl, 2 * float(job.get('cost', 0)))
+
+    def _dispatch(self, job: dict):
+        lane = job['lane']
+        ttl = int(self._deadline(job) - time.time()) + 3600
+        pipe = self.redis.pipeline()
+        pipe.hset(f"sched:job:{job['task_id']}", mapping={'lane': lane, 'owner': job['owner']})
+        # The record outlives the slot deadline only so a late release still finds it
+        pipe.expire(f"sched:job:{job['task_id']}", ttl)
+        # Only dispatched jobs count towards the lane's outstanding work
+        pipe.hset(f"sched:{lane}:cost", job['task_id'], job['cost'])
+        pipe.execute()
+        self.dispatch(job)
+
+    def lane_stats(self, lane: str) -> dict:
+        """Return a lane's queue depth and the estimated wait for a newly admitted job."""
+        queued = self.redis.llen(LANES[lane])
+        owners = self.redis.smembers(f"sched:{lane}:owners")
+        now = time.time()
+        active_owners = sum(1 for owner in owners if self.redis.zcount(f"sched:{lane}:active:{owner}", now, '+inf'))
+        held = sum(self.redis.llen(f"sched:{lane}:held:{owner}") for owner in owners)
+        outstanding = sum(float(cost) for cost in self.redis.hvals(f"sched:{lane}:cost"))
+        return {
+            'queue': LANES[lane],
+            'queued': queued,
+            'held': held,
+            'active_owners': active_owners,
+            'workers': self.lane_workers[lane],
+            'estimated_wait_seconds': round(outstanding / max(self.lane_workers[lane], 1), 1)
+        }
+
+    def stats(self) -> dict:
+        return {lane: self.lane_stats(lane) for lane in LANES}
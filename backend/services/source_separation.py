@@ -0,0 +1,155 @@
+import os
+import threading
+import wave
+from typing import Callable, Optional
+
+import numpy as np
+from dotenv import load_dotenv
+
+from services.model_registry import registry
+
+load_dotenv()
+
+# Model sources that make up the accompaniment; everything except "vocals"
+VOCAL_SOURCES = ('vocals',)
+
+
+class SourceSeparator:
+    """Splits a track into vocals and accompaniment with a torchaudio source separation model.
+
+    The default model is torchaudio's Hybrid Demucs bundle
+    (``SEPARATION_MODEL=HDEMUCS_HIGH_MUSDB_PLUS``), which runs on CPU at
+    44.1 kHz stereo. The input WAV is read and separated in chunks of
+    ``SEPARATION_CHUNK_SECONDS`` that overlap by ``SEPARATION_OVERLAP_SECONDS``
+    and are crossfaded, so memory stays bounded by the chunk size however
+    long the video is and chunk edges do not click. Larger chunks give the
+    model more context and fewer passes at the cost of memory;
+    ``SEPARATION_THREADS`` sets the torch threads used while separating.
+    """
+
+    def __init__(self, model_name: Optional[str] = None, chunk_seconds: Optional[float] = None,
+                 overlap_seconds: Optional[float] = None, threads: Optional[int] = None):
+        self.model_name = model_name or os.getenv('SEPARATION_MODEL', 'HDEMUCS_HIGH_MUSDB_PLUS')
+        self.chunk_seconds = chunk_seconds or float(os.getenv('SEPARATION_CHUNK_SECONDS', '10'))
+        self.overlap_seconds = overlap_seconds if overlap_seconds is not None else float(
+            os.getenv('SEPARATION_OVERLAP_SECONDS', '1')
+        )
+        # 0 keeps the worker's own torch thread budget
+        self.threads = threads if threads is not None else int(os.getenv('SEPARATION_THREADS') or '0')
+        self._lock = threading.Lock()
+
+    def load(self):
+        def loader():
+            import torchaudio
+            bundle = getattr(torchaudio.pipelines, self.model_name)
+            model = bundle.get_model()
+            model.eval()
+            model.separation_sample_rate = bundle.sample_rate
+            return model
+
+        return registry.get(('separation', self.model_name), loader)
+
+    @property
+    def sample_rate(self) -> int:
+        return self.load().separation_sample_rate
+
+    def separate(self, input_path: str, output_path: str,
+                 on_progress: Optional[Callable[[float], None]] = None) -> str:
+        """Write the accompaniment of a 16-bit stereo WAV at ``sample_rate`` to ``output_path``."""
+        import torch
+
+        model = self.load()
+        previous_threads = torch.get_num_threads()
+        if self.threads:
+            torch.set_num_threads(self.threads)
+        try:
+            with wave.open(input_path, 'rb') as src, wave.open(output_path, 'wb') as dst:
+                if src.getsampwidth() != 2:
+                    raise Exception(f"Expected 16-bit PCM audio, got {src.getsampwidth() * 8}-bit")
+                if src.getframerate() != model.separation_sample_rate:
+                    raise Exception(f"Expected {model.separation_sample_rate} Hz audio, got {src.getframerate()} Hz")
+                channels = src.getnchannels()
+                dst.setnchannels(channels)
+                dst.setsampwidth(2)
+                dst.setframerate(src.getframerate())
+                self._separate_stream(model, src, dst, channels, on_progress)
+            return output_path
+        except Exception:
+            if os.path.exists(output_path):
+                os.remove(output_path)
+            raise
+        finally:
+            torch.set_num_threads(previous_threads)
+
+    def _separate_stream(self, model, src, dst, channels: int, on_progress):
+        sample_rate = src.getframerate()
+        total = src.getnframes()
+        chunk = int(self.chunk_seconds * sample_rate)
+        overlap = min(int(self.overlap_seconds * sample_rate), chunk // 2)
+        fade_in = np.linspace(0.0, 1.0, overlap, endpoint=False, dtype=np.float32)
+
+        pending = np.zeros((channels, 0), dtype=np.float32)
+        tail = None
+        while True:
+            frames = src.readframes(chunk - pending.shape[1])
+            samples = np.frombuffer(frames, dtype=np.int16).reshape(-1, channels).T.astype(np.float32) / 32768.0
+            pending = np.concatenate([pending, samples], axis=1)
+            if pending.shape[1] == 0:
+                break
+            last = src.tell() >= total
+
+            out = self._accompaniment(model, pending)
+            if tail is not None:
+                # Linear crossfade: the previous chunk's faded-out end plus this chunk's faded-in start
+                out[:, :overlap] = out[:, :overlap] * fade_in + tail
+            if last:
+                self._write(dst, out)
+                break
+            cut = out.shape[1] - overlap
+            tail = out[:, cut:] * (1.0 - fade_in)
+            self._write(dst, out[:, :cut])
+            pending = pending[:, cut:]
+            if on_progress:
+                on_progress(src.tell() / total if total else 1.0)
+        if on_progress:
+            on_progress(1.0)
+
+    def _accompaniment(self, model, samples: np.ndarray) -> np.ndarray:
+        import torch
+
+        length = samples.shape[1]
+        # The model's convolutions need some context; pad very short tails with silence
+        minimum = model.separation_sample_rate
+        if length < minimum:
+            samples = np.pad(samples, ((0, 0), (0, minimum - length)))
+        mix = torch.from_numpy(np.ascontiguousarray(samples)).unsqueeze(0)
+        if mix.shape[1] == 1:
+            mix = mix.repeat(1, 2, 1)
+
+        reference = mix.mean(dim=1)
+        mean, std = reference.mean(), reference.std() + 1e-8
+        keep = [i for i, source in enumerate(model.sources) if source not in VOCAL_SOURCES]
+        with self._lock, torch.inference_mode():
+            sources = model((mix - mean) / std)[0]
+        accompaniment = sources[keep].sum(dim=0) * std + mean
+        if samples.shape[0] == 1:
+            accompaniment = accompaniment.mean(dim=0, keepdim=True)
+        return accompaniment[:, :length].numpy()
+
+    @staticmethod
+    def _write(dst, samples: np.ndarray):
+        pcm = (np.clip(samples, -1.0, 1.0) * 32767).astype(np.int16)
+        dst.writeframes(pcm.T.tobytes())
+
+
+_separator = None
+_separator_lock = threading.Lock()
+
+
+def get_source_separator() -> SourceSeparator:
+    """Return this process's shared separator."""
+    global _separator
+    with _separator_lock:
+        if _separator is None:
+            _separator = SourceSeparator()
+        return _separator
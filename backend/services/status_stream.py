@@ -0,0 +1,156 @@
+import asyncio
+import json
+import os
+from typing import Dict, Optional, Set
+
+import redis
+import redis.asyncio as aioredis
+from dotenv import load_dotenv
+
+from services.job_registry import job_registry, result_error
+
+load_dotenv()
+
+REDIS_URL = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
+CHANNEL_PREFIX = 'task-progress:'
+TERMINAL_STATUSES = ('completed', 'error')
+
+_publisher = None
+
+
+def progress_channel(task_id: str) -> str:
+    return f"{CHANNEL_PREFIX}{task_id}"
+
+
+def status_payload(task_id: str, state: str, info) -> dict:
+    """Build the status body served by ``/api/status`` and pushed to stream watchers."""
+    if state == 'PENDING':
+        return {
+            "task_id": task_id,
+            "status": "queued",
+            "progress": {
+                "step": "waiting",
+                "percentage": 0
+            }
+        }
+    if state == 'PROCESSING':
+        info = info or {}
+        return {
+            "task_id": task_id,
+            "status": "processing",
+            "progress": info,
+            "percent": info.get('percent', 0),
+            "current_step": info.get('current_step')
+        }
+    if state == 'SUCCESS':
+        # A failed pipeline still finishes its task, so the error is inside the result
+        error = result_error(info)
+        if error is not None:
+            return {
+                "task_id": task_id,
+                "status": "error",
+                "error": error
+            }
+        return {
+            "task_id": task_id,
+            "status": "completed",
+            "result": info
+        }
+    return {
+        "task_id": task_id,
+        "status": "error",
+        "error": str(info)
+    }
+
+
+def publish_status(task_id: str, state: str, info):
+    """Publish a task's status to its pub/sub channel (called from workers)."""
+    global _publisher
+    try:
+        if _publisher is None:
+            _publisher = redis.Redis.from_url(REDIS_URL)
+        _publisher.publish(progress_channel(task_id), json.dumps(status_payload(task_id, state, info)))
+    except Exception as e:
+        # Watchers fall back to the stored result, so a lost message must not fail the job
+        print(f"Failed to publish status for {task_id}: {str(e)}")
+
+
+def report_progress(task, meta: dict, task_id: Optional[str] = None):
+    """Store progress in the result backend and job registry and push it to stream watchers."""
+    task_id = task_id or task.request.id
+    task.update_state(task_id=task_id, state='PROCESSING', meta=meta)
+    job_registry.record_progress(task_id, meta)
+    publish_status(task_id, 'PROCESSING', meta)
+
+
+class StatusBroadcaster:
+    """Fans task status messages out to every watching client.
+
+    The web process holds a single pub/sub connection and subscribes to a
+    task's channel only while at least one client is watching it, so a job
+    costs one Redis subscription no matter how many browsers follow it.
+    """
+
+    def __init__(self, redis_url: str = REDIS_URL, queue_size: int = 16):
+        self.redis_url = redis_url
+        self.queue_size = queue_size
+        self._client = None
+        self._pubsub = None
+        self._reader = None
+        self._watchers: Dict[str, Set[asyncio.Queue]] = {}
+        self._lock = asyncio.Lock()
+
+    async def subscribe(self, task_id: str) -> asyncio.Queue:
+        """Register a watcher for ``task_id`` and return the queue its updates arrive on."""
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        async with self._lock:
+            if self._pubsub is None:
+                self._client = aioredis.from_url(self.redis_url)
+                self._pubsub = self._client.pubsub(ignore_subscribe_messages=True)
+            watchers = self._watchers.setdefault(task_id, set())
+            if not watchers:
+                await self._pubsub.subscribe(progress_channel(task_id))
+            watchers.add(queue)
+            # The pub/sub connection only exists once something is subscribed
+            if self._reader is None or self._reader.done():
+                self._reader = asyncio.create_task(self._read_loop())
+        return queue
+
+    async def unsubscribe(self, task_id: str, queue: asyncio.Queue):
+        async with self._lock:
+            watchers = self._watchers.get(task_id)
+            if watchers is None:
+                return
+            watchers.discard(queue)
+            if not watchers:
+                del self._watchers[task_id]
+                await self._pubsub.unsubscribe(progress_channel(task_id))
+
+    async def close(self):
+        if self._reader is not None:
+            self._reader.cancel()
+        if self._pubsub is not None:
+            await self._pubsub.close()
+            await self._client.close()
+
+    async def _read_loop(self):
+        while True:
+            try:
+                message = await self._pubsub.get_message(timeout=1.0)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Status stream connection error: {str(e)}")
+                await asyncio.sleep(1.0)
+                continue
+            if not message or message['type'] != 'message':
+                continue
+
+            channel = message['channel'].decode()
+            task_id = channel[len(CHANNEL_PREFIX):]
+            payload = json.loads(message['data'])
+            for queue in list(self._watchers.get(task_id, ())):
+                if queue.full():
+                    # A slow client only needs the latest state, so drop its oldest update
+                    queue.get_nowait()
+                queue.put_nowait(payload)
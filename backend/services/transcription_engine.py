@@ -0,0 +1,235 @@
+import multiprocessing
+import os
+import wave
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Callable, Optional
+
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+
+SAMPLE_RATE = 16000
+FRAME_SECONDS = 0.03
+
+# Per-process state for pool workers, set up once by _init_pool_worker
+_worker_model = None
+
+
+def load_wav(audio_path: str) -> np.ndarray:
+    """Read a 16-bit PCM mono WAV (as written by ``extract_audio``) into float32."""
+    with wave.open(audio_path, 'rb') as wav:
+        if wav.getsampwidth() != 2:
+            raise Exception(f"Expected 16-bit PCM audio, got {wav.getsampwidth() * 8}-bit")
+        frames = wav.readframes(wav.getnframes())
+        channels = wav.getnchannels()
+    audio = np.frombuffer(frames, dtype=np.int16).astype(np.float32) / 32768.0
+    if channels > 1:
+        audio = audio.reshape(-1, channels).mean(axis=1)
+    return audio
+
+
+def find_windows(audio: np.ndarray, window_seconds: float, search_seconds: float = 5.0,
+                 sample_rate: int = SAMPLE_RATE) -> list:
+    """Split audio into ~``window_seconds`` windows, cutting at the quietest nearby frame.
+
+    Returns a list of ``(start_sample, end_sample)`` tuples covering the audio.
+    """
+    total = len(audio)
+    window = int(window_seconds * sample_rate)
+    if total <= window:
+        return [(0, total)]
+
+    frame = int(FRAME_SECONDS * sample_rate)
+    n_frames = total // frame
+    energy = np.sqrt(np.mean(audio[:n_frames * frame].reshape(n_frames, frame) ** 2, axis=1))
+    search = int(search_seconds / FRAME_SECONDS)
+
+    windows = []
+    start = 0
+    while total - start > window:
+        target = (start + window) // frame
+        lo = max(target - search, start // frame + 1)
+        hi = min(target + search, n_frames - 1)
+        if hi <= lo:
+            cut = target * frame
+        else:
+            cut = (lo + int(np.argmin(energy[lo:hi]))) * frame
+        windows.append((start, cut))
+        start = cut
+    windows.append((start, total))
+    return windows
+
+
+def speech_windows(audio: np.ndarray, regions: list, window_seconds: float, merge_gap: float = 2.0,
+                   sample_rate: int = SAMPLE_RATE) -> list:
+    """Group VAD speech regions (``[start, end]`` seconds) into windows of at most ~``window_seconds``.
+
+    Regions closer than ``merge_gap`` seconds share a window, so Whisper sees
+    short pauses in context; longer silences are skipped entirely. Regions
+    longer than a window are split at their quietest frames like ``find_windows``.
+    Returns ``(start_sample, end_sample)`` tuples in track order.
+    """
+    groups = []
+    for start, end in regions:
+        if groups and start - groups[-1][1] <= merge_gap and end - groups[-1][0] <= window_seconds:
+            groups[-1][1] = end
+        else:
+            groups.append([start, end])
+
+    windows = []
+    for start, end in groups:
+        first, last = int(start * sample_rate), min(len(audio), int(end * sample_rate))
+        if last <= first:
+            continue
+        for lo, hi in find_windows(audio[first:last], window_seconds, sample_rate=sample_rate):
+            windows.append((first + lo, first + hi))
+    return windows
+
+
+def _init_pool_worker(model_size: Optional[str], threads: int):
+    global _worker_model
+    import torch
+    from services.model_registry import get_whisper_model
+
+    torch.set_num_threads(threads)
+    _worker_model = get_whisper_model(model_size)
+
+
+def _transcribe_window(index: int, samples: np.ndarray, offset: float, options: dict) -> tuple:
+    result = _worker_model.transcribe(samples, **options)
+    return index, offset, result
+
+
+class TranscriptionEngine:
+    """Transcribes long audio by fanning silence-aligned windows out to a process pool.
+
+    Each pool process holds its own Whisper model; window results are stitched
+    back in order with timestamps shifted to the window's position in the track.
+    Short audio, or a pool size of 1, uses the single in-process model call.
+    """
+
+    def __init__(self, whisper_model, model_size: Optional[str] = None, workers: Optional[int] = None,
+                 window_seconds: Optional[float] = None):
+        from services.model_registry import torch_thread_budget
+
+        # Pool processes share this worker process's share of the cores, not the whole host
+        thread_budget = torch_thread_budget()
+        self.whisper_model = whisper_model
+        self.model_size = model_size
+        self.workers = workers if workers is not None else int(
+            os.getenv('TRANSCRIBE_WORKERS', str(max(1, thread_budget // 2)))
+        )
+        self.window_seconds = window_seconds or float(os.getenv('TRANSCRIBE_WINDOW_SECONDS', '60'))
+        self.threads_per_worker = max(1, thread_budget // max(1, self.workers))
+        self._pool = None
+
+    def transcribe(self, audio, on_progress: Optional[Callable[[int, int], None]] = None,
+                   speech_regions: Optional[list] = None, **options) -> dict:
+        """Transcribe a WAV path or 16 kHz float32 array into ``{'text', 'segments', 'language'}``.
+
+        With ``speech_regions`` (from ``vad.detect_speech``) only those parts
+        of the track are sent to Whisper, which saves the compute and the
+        hallucinated text silence and music would cost.
+        ``on_progress(done, total)`` is called as windows finish.
+        """
+        if isinstance(audio, str):
+            audio = load_wav(audio)
+
+        if speech_regions is not None:
+            windows = speech_windows(audio, speech_regions, self.window_seconds,
+                                     float(os.getenv('VAD_MERGE_GAP', '2.0')))
+            if not windows:
+                if on_progress:
+                    on_progress(1, 1)
+                return {'text': '', 'segments': [], 'language': None}
+            if self.workers <= 1 or len(windows) == 1:
+                return self._transcribe_sequential(audio, windows, options, on_progress)
+        else:
+            windows = find_windows(audio, self.window_seconds)
+        if self.workers <= 1 or len(windows) == 1:
+            result = self.whisper_model.transcribe(audio, **options)
+            if on_progress:
+                on_progress(1, 1)
+            return {'text': result['text'], 'segments': result['segments'], 'language': result.get('language')}
+
+        print(f"Transcribing {len(windows)} windows across {self.workers} processes...")
+        try:
+            pool = self._get_pool()
+            futures = [
+                pool.submit(_transcribe_window, i, audio[start:end], start / SAMPLE_RATE, options)
+                for i, (start, end) in enumerate(windows)
+            ]
+        except Exception as e:
+            # Daemonic Celery prefork children cannot start their own processes
+            print(f"Transcription pool unavailable, transcribing windows in-process: {str(e)}")
+            self.shutdown()
+            self.workers = 1
+            return self._transcribe_sequential(audio, windows, options, on_progress)
+
+        results = []
+        for future in as_completed(futures):
+            results.append(future.result())
+            if on_progress:
+                on_progress(len(results), len(windows))
+        return self._stitch(results)
+
+    def shutdown(self):
+        """Stop the worker pool, if one was started."""
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_pool_worker,
+                initargs=(self.model_size, self.threads_per_worker)
+            )
+        return self._pool
+
+    def _transcribe_sequential(self, audio: np.ndarray, windows: list, options: dict,
+                               on_progress: Optional[Callable[[int, int], None]] = None) -> dict:
+        results = []
+        for i, (start, end) in enumerate(windows):
+            results.append((i, start / SAMPLE_RATE, self.whisper_model.transcribe(audio[start:end], **options)))
+            if on_progress:
+                on_progress(i + 1, len(windows))
+        return self._stitch(results)
+
+    @staticmethod
+    def _stitch(window_results: list) -> dict:
+        segments = []
+        texts = []
+        window_results = sorted(window_results, key=lambda r: r[0])
+        for _, offset, result in window_results:
+            texts.append(result['text'].strip())
+            for segment in result['segments']:
+                segment = dict(segment)
+                segment['id'] = len(segments)
+                segment['start'] = segment['start'] + offset
+                segment['end'] = segment['end'] + offset
+                segment['seek'] = segment.get('seek', 0) + int(offset * 100)
+                if segment.get('words'):
+                    segment['words'] = [
+                        dict(word, start=word['start'] + offset, end=word['end'] + offset)
+                        for word in segment['words']
+                    ]
+                segments.append(segment)
+        # Whisper detects the language per window; the first window's is taken for the track
+        language = window_results[0][2].get('language') if window_results else None
+        return {'text': ' '.join(t for t in texts if t), 'segments': segments, 'language': language}
+
+
+_engines = {}
+
+
+def get_transcription_engine(whisper_model, model_size: Optional[str] = None) -> TranscriptionEngine:
+    """Return the per-process engine for ``model_size`` so its pool is reused across tasks."""
+    engine = _engines.get(model_size)
+    if engine is None or engine.whisper_model is not whisper_model:
+        engine = TranscriptionEngine(whisper_model, model_size)
+        _engines[model_size] = engine
+    return engine
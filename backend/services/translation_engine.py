@@ -0,0 +1,264 @@
+import json
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Optional
+
+from dotenv import load_dotenv
+
+from services.model_registry import registry
+
+load_dotenv()
+
+# Rough characters-per-token ratio used to budget prompts without a tokenizer
+CHARS_PER_TOKEN = 4
+
+TRANSLATION_BACKENDS = ('gemini', 'local')
+
+# Target language names (as sent by the frontend) -> ISO 639-1 codes, as Whisper reports them
+LANGUAGE_CODES = {
+    'english': 'en',
+    'spanish': 'es',
+    'french': 'fr',
+    'german': 'de',
+    'italian': 'it',
+    'portuguese': 'pt',
+    'russian': 'ru',
+    'japanese': 'ja',
+    'korean': 'ko',
+    'chinese': 'zh',
+    'arabic': 'ar',
+}
+
+# ISO 639-1 -> NLLB-200 language codes
+NLLB_CODES = {
+    'en': 'eng_Latn',
+    'es': 'spa_Latn',
+    'fr': 'fra_Latn',
+    'de': 'deu_Latn',
+    'it': 'ita_Latn',
+    'pt': 'por_Latn',
+    'ru': 'rus_Cyrl',
+    'ja': 'jpn_Jpan',
+    'ko': 'kor_Hang',
+    'zh': 'zho_Hans',
+    'ar': 'arb_Arab',
+}
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate for prompt budgeting."""
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def batch_segments(segments: list, token_budget: int) -> list:
+    """Group consecutive segments so each group's text fits within ``token_budget``."""
+    batches = []
+    current = []
+    current_tokens = 0
+    for segment in segments:
+        # Each line also carries JSON quoting and separators in the prompt and reply
+        tokens = estimate_tokens(segment['text']) + 4
+        if current and current_tokens + tokens > token_budget:
+            batches.append(current)
+            current = []
+            current_tokens = 0
+        current.append(segment)
+        current_tokens += tokens
+    if current:
+        batches.append(current)
+    return batches
+
+
+def _attach_translations(segments: list, translations: list) -> list:
+    return [
+        {
+            'id': segment.get('id', i),
+            'start': segment['start'],
+            'end': segment['end'],
+            'text': segment['text'].strip(),
+            'translation': translation
+        }
+        for i, (segment, translation) in enumerate(zip(segments, translations))
+    ]
+
+
+def _parse_translations(response_text: str, expected: int) -> Optional[list]:
+    text = response_text.strip()
+    fenced = re.match(r'^```(?:json)?\s*(.*?)\s*```$', text, re.DOTALL)
+    if fenced:
+        text = fenced.group(1)
+    try:
+        translations = json.loads(text)
+    except ValueError:
+        return None
+    if not isinstance(translations, list) or len(translations) != expected:
+        return None
+    return [str(t).strip() for t in translations]
+
+
+class TranslationEngine:
+    """Translates Whisper segments in token-budgeted batches sent concurrently.
+
+    Each batch is sent as a JSON array of lines and must come back as an
+    array of the same length, so every translation stays attached to its
+    segment's ``start``/``end`` timestamps. Batches whose reply does not line
+    up are split in half and retried.
+    """
+
+    def __init__(self, model, token_budget: Optional[int] = None, max_concurrency: Optional[int] = None):
+        self.model = model
+        self.token_budget = token_budget or int(os.getenv('TRANSLATION_TOKEN_BUDGET', '2000'))
+        self.max_concurrency = max_concurrency or int(os.getenv('TRANSLATION_MAX_CONCURRENCY', '4'))
+
+    def translate_segments(self, segments: list, target_language: str,
+                           on_progress: Optional[Callable[[int, int], None]] = None,
+                           source_language: Optional[str] = None) -> list:
+        """Return one ``{'id', 'start', 'end', 'text', 'translation'}`` entry per segment.
+
+        ``on_progress(done, total)`` is called as batches finish. Gemini
+        detects the source language itself, so ``source_language`` is unused.
+        """
+        segments = [s for s in segments if s.get('text', '').strip()]
+        if not segments:
+            return []
+
+        batches = batch_segments(segments, self.token_budget)
+        print(f"Translating {len(segments)} segments in {len(batches)} batches...")
+        with ThreadPoolExecutor(max_workers=min(self.max_concurrency, len(batches))) as executor:
+            futures = [executor.submit(self._translate_batch, batch, target_language) for batch in batches]
+            for done, _ in enumerate(as_completed(futures), start=1):
+                if on_progress:
+                    on_progress(done, len(batches))
+            translations = [t for future in futures for t in future.result()]
+
+        return _attach_translations(segments, translations)
+
+    def _translate_batch(self, batch: list, target_language: str) -> list:
+        lines = [segment['text'].strip() for segment in batch]
+        prompt = f"""
+            Translate each line in the following JSON array to {target_language}.
+            The lines are consecutive subtitles from one video, so keep the context consistent.
+            Return ONLY a JSON array of strings with exactly {len(lines)} translated lines,
+            in the same order, with no additional text or explanations.
+            Lines: {json.dumps(lines, ensure_ascii=False)}
+            """
+        response = self.model.generate_content(prompt)
+        translations = _parse_translations(response.text, len(lines))
+        if translations is not None:
+            return translations
+
+        if len(batch) == 1:
+            # A single line that still does not parse is used as the raw reply
+            translated = response.text.strip()
+            if not translated:
+                raise Exception("Received empty translation from Gemini")
+            return [translated]
+
+        print(f"Translation batch of {len(batch)} lines did not align, splitting and retrying...")
+        middle = len(batch) // 2
+        return self._translate_batch(batch[:middle], target_language) + \
+            self._translate_batch(batch[middle:], target_language)
+
+
+class LocalTranslationEngine:
+    """Translates Whisper segments in-process with a transformers seq2seq model.
+
+    ``LOCAL_TRANSLATION_MODEL`` is either one multilingual NLLB-200 checkpoint
+    (the default), or a MarianMT name template such as
+    ``Helsinki-NLP/opus-mt-{src}-{tgt}`` with one checkpoint per language
+    pair. Models are loaded through the worker's model registry, so each is
+    loaded once per process. Segments are sorted by length and translated in
+    padded batches of ``LOCAL_TRANSLATION_BATCH_SIZE``, one segment per
+    sequence, so each translation stays on its segment's timestamps.
+    """
+
+    def __init__(self, model_name: Optional[str] = None, batch_size: Optional[int] = None,
+                 num_beams: Optional[int] = None):
+        self.model_name = model_name or os.getenv('LOCAL_TRANSLATION_MODEL', 'facebook/nllb-200-distilled-600M')
+        self.batch_size = batch_size or int(os.getenv('LOCAL_TRANSLATION_BATCH_SIZE', '16'))
+        self.num_beams = num_beams or int(os.getenv('LOCAL_TRANSLATION_BEAMS', '2'))
+        self.max_length = int(os.getenv('LOCAL_TRANSLATION_MAX_TOKENS', '256'))
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def language_code(language: str) -> str:
+        language = language.lower().strip()
+        return LANGUAGE_CODES.get(language, language)
+
+    def load(self, source: str, target: str):
+        name = self.model_name.format(src=source, tgt=target)
+
+        def loader():
+            from transformers import AutoModelForSeq2SeqLM, AutoTokenizer
+            model = AutoModelForSeq2SeqLM.from_pretrained(name)
+            model.eval()
+            model.mt_tokenizer = AutoTokenizer.from_pretrained(name)
+            return model
+
+        return registry.get(('translation', name), loader)
+
+    def translate_segments(self, segments: list, target_language: str,
+                           on_progress: Optional[Callable[[int, int], None]] = None,
+                           source_language: Optional[str] = None) -> list:
+        """Return one ``{'id', 'start', 'end', 'text', 'translation'}`` entry per segment.
+
+        ``source_language`` is the language Whisper detected (English if
+        unknown). ``on_progress(done, total)`` is called as batches finish.
+        """
+        import torch
+
+        segments = [s for s in segments if s.get('text', '').strip()]
+        if not segments:
+            return []
+
+        source = self.language_code(source_language or 'en')
+        target = self.language_code(target_language)
+        model = self.load(source, target)
+        tokenizer = model.mt_tokenizer
+        generate_options = {'num_beams': self.num_beams, 'max_new_tokens': self.max_length}
+        nllb = hasattr(tokenizer, 'src_lang')
+        if nllb:
+            # NLLB: one model for every pair, steered by language tokens
+            if source not in NLLB_CODES or target not in NLLB_CODES:
+                raise Exception(f"Local translation does not support {source} -> {target}")
+            generate_options['forced_bos_token_id'] = tokenizer.convert_tokens_to_ids(NLLB_CODES[target])
+
+        order = sorted(range(len(segments)), key=lambda i: len(segments[i]['text']))
+        batches = [order[i:i + self.batch_size] for i in range(0, len(order), self.batch_size)]
+        print(f"Translating {len(segments)} segments locally in {len(batches)} batches...")
+        translations = [None] * len(segments)
+        for done, batch in enumerate(batches, start=1):
+            # One batch at a time per process: torch already spreads each batch over the cores.
+            # The tokenizer is shared too, and its source language is set per job.
+            with self._lock, torch.inference_mode():
+                if nllb:
+                    tokenizer.src_lang = NLLB_CODES[source]
+                inputs = tokenizer([segments[i]['text'].strip() for i in batch], padding=True, truncation=True,
+                                   max_length=self.max_length, return_tensors='pt')
+                output = model.generate(**inputs, **generate_options)
+                decoded = tokenizer.batch_decode(output, skip_special_tokens=True)
+            for i, translated in zip(batch, decoded):
+                translations[i] = translated.strip()
+            if on_progress:
+                on_progress(done, len(batches))
+
+        return _attach_translations(segments, translations)
+
+
+_local_engine = None
+_local_engine_lock = threading.Lock()
+
+
+def default_translation_backend() -> str:
+    return os.getenv('TRANSLATION_BACKEND', 'gemini').lower()
+
+
+def get_local_translation_engine() -> LocalTranslationEngine:
+    """Return this process's shared local translation engine."""
+    global _local_engine
+    with _local_engine_lock:
+        if _local_engine is None:
+            _local_engine = LocalTranslationEngine()
+        return _local_engine
@@ -0,0 +1,158 @@
+import io
+import os
+import threading
+import wave
+from typing import Callable, Optional
+
+import numpy as np
+from dotenv import load_dotenv
+
+from services.elevenlabs_client import get_elevenlabs_client
+from services.model_registry import registry
+
+load_dotenv()
+
+TTS_BACKENDS = ('elevenlabs', 'local')
+
+# Target language (as sent by the frontend) -> ISO 639-3 code of its MMS-TTS checkpoint.
+# Languages in non-Latin scripts (Russian, Japanese, Korean, Chinese, Arabic) are
+# left out: their checkpoints need uroman-romanized input, so they go to ElevenLabs.
+MMS_LANGUAGES = {
+    'english': 'eng',
+    'spanish': 'spa',
+    'french': 'fra',
+    'german': 'deu',
+    'italian': 'ita',
+    'portuguese': 'por',
+}
+
+
+def local_tts_supports(lang: str) -> bool:
+    """Whether the local backend can dub into ``lang`` (a frontend name or ISO 639-3 code)."""
+    lang = lang.lower().strip()
+    return lang in MMS_LANGUAGES or lang in MMS_LANGUAGES.values()
+
+
+class ElevenLabsTTS:
+    """Remote synthesis through the ElevenLabs API; the only backend that can use cloned voices."""
+
+    name = 'elevenlabs'
+    format = 'mp3'
+    supports_voice_cloning = True
+    max_chunk_chars = 2500  # free tier limit per request
+
+    def __init__(self, api_key: str):
+        self.client = get_elevenlabs_client(api_key)
+
+    def synthesize_many(self, texts: list, lang: str, voice_id: Optional[str] = None,
+                        on_progress: Optional[Callable[[int, int], None]] = None) -> list:
+        return self.client.synthesize_many(texts, voice_id=voice_id, on_progress=on_progress)
+
+    @staticmethod
+    def clip_duration(content: bytes) -> float:
+        # ElevenLabs returns 128 kbps MP3, i.e. 16000 bytes per second of speech
+        return len(content) / 16000
+
+
+class LocalTTS:
+    """In-process CPU synthesis with a transformers VITS model (Meta's MMS-TTS checkpoints).
+
+    One model per target language is loaded through the worker's model
+    registry, so it stays resident across jobs. Texts are synthesized in
+    padded batches of ``LOCAL_TTS_BATCH_SIZE``, sorted by length so each
+    batch pads as little as possible, and returned as WAV bytes in input
+    order. Cloned voices are not supported; the model's own voice is used.
+    """
+
+    name = 'local'
+    format = 'wav'
+    supports_voice_cloning = False
+
+    def __init__(self, batch_size: Optional[int] = None, model_template: Optional[str] = None):
+        self.batch_size = batch_size or int(os.getenv('LOCAL_TTS_BATCH_SIZE', '8'))
+        self.model_template = model_template or os.getenv('LOCAL_TTS_MODEL_TEMPLATE', 'facebook/mms-tts-{code}')
+        # VITS attends over the whole input, so long chunks cost quadratic time and memory
+        self.max_chunk_chars = int(os.getenv('LOCAL_TTS_MAX_CHARS', '400'))
+        self._lock = threading.Lock()
+
+    def model_name(self, lang: str) -> str:
+        code = MMS_LANGUAGES.get(lang.lower().strip(), lang.lower().strip())
+        return self.model_template.format(code=code)
+
+    def load(self, lang: str):
+        name = self.model_name(lang)
+
+        def loader():
+            from transformers import AutoTokenizer, VitsModel
+            model = VitsModel.from_pretrained(name)
+            model.eval()
+            model.tts_tokenizer = AutoTokenizer.from_pretrained(name)
+            return model
+
+        return registry.get(('tts', name), loader)
+
+    def synthesize_many(self, texts: list, lang: str, voice_id: Optional[str] = None,
+                        on_progress: Optional[Callable[[int, int], None]] = None) -> list:
+        import torch
+
+        if not texts:
+            return []
+        model = self.load(lang)
+        tokenizer = model.tts_tokenizer
+        if getattr(tokenizer, 'is_uroman', False):
+            raise Exception(f"Local TTS for {lang} needs romanized input; use the elevenlabs backend")
+
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        results = [None] * len(texts)
+        done = 0
+        for start in range(0, len(order), self.batch_size):
+            batch = order[start:start + self.batch_size]
+            inputs = tokenizer([texts[i] for i in batch], padding=True, return_tensors='pt')
+            with self._lock, torch.inference_mode():
+                output = model(**inputs)
+            for row, i in enumerate(batch):
+                samples = output.waveform[row, :int(output.sequence_lengths[row])].numpy()
+                results[i] = self._to_wav(samples, model.config.sampling_rate)
+            done += len(batch)
+            if on_progress:
+                on_progress(done, len(texts))
+        return results
+
+    @staticmethod
+    def _to_wav(samples: np.ndarray, sample_rate: int) -> bytes:
+        buffer = io.BytesIO()
+        with wave.open(buffer, 'wb') as wav:
+            wav.setnchannels(1)
+            wav.setsampwidth(2)
+            wav.setframerate(sample_rate)
+            wav.writeframes((np.clip(samples, -1.0, 1.0) * 32767).astype(np.int16).tobytes())
+        return buffer.getvalue()
+
+    @staticmethod
+    def clip_duration(content: bytes) -> float:
+        with wave.open(io.BytesIO(content)) as wav:
+            return wav.getnframes() / wav.getframerate()
+
+
+_backends = {}
+_backends_lock = threading.Lock()
+
+
+def default_tts_backend() -> str:
+    return os.getenv('TTS_BACKEND', 'elevenlabs').lower()
+
+
+def get_tts_backend(name: Optional[str] = None, api_key: Optional[str] = None):
+    """Return this process's shared TTS backend called ``name`` (``TTS_BACKEND`` by default)."""
+    name = (name or default_tts_backend()).lower()
+    if name not in TTS_BACKENDS:
+        raise ValueError(f"Unknown TTS backend: {name}")
+    with _backends_lock:
+        if name not in _backends:
+            if name == 'elevenlabs':
+                if not api_key:
+                    raise ValueError("ELEVENLABS_API_KEY not found in environment variables")
+                _backends[name] = ElevenLabsTTS(api_key)
+            else:
+                _backends[name] = LocalTTS()
+        return _backends[name]
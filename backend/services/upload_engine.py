@@ -0,0 +1,319 @@
+import asyncio
+import fcntl
+import hashlib
+import json
+import os
+import time
+import uuid
+from typing import AsyncIterator, Optional
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+ALLOWED_EXTENSIONS = ('.mp4', '.avi', '.mov', '.mkv')
+
+
+class UploadTooLargeError(Exception):
+    """Raised when an upload exceeds the configured size cap."""
+
+
+class UploadNotFoundError(Exception):
+    """Raised when a resumable upload session does not exist."""
+
+
+class UploadOffsetError(Exception):
+    """Raised when a chunk does not start where the session left off."""
+
+    def __init__(self, expected_offset: int):
+        super().__init__(f"Chunk offset mismatch, expected offset {expected_offset}")
+        self.expected_offset = expected_offset
+
+
+class UploadBusyError(UploadOffsetError):
+    """Raised when another request is already writing to the same upload session."""
+
+    def __init__(self, expected_offset: int):
+        super().__init__(expected_offset)
+        self.args = (f"Another chunk is being written to this upload, currently at offset {expected_offset}",)
+
+
+class UploadEngine:
+    """Streams uploads to disk in fixed-size chunks without buffering whole files.
+
+    File writes and hashing run in a worker thread so the event loop stays
+    responsive, the size cap is enforced while bytes arrive, and large files
+    can be sent as resumable multi-part sessions. Each session's data file
+    is ``flock``ed while a chunk is written, completed or aborted, so
+    concurrent requests for one session (from any API process) cannot
+    interleave; sessions idle for ``UPLOAD_SESSION_TTL`` seconds are removed
+    by ``cleanup_stale_sessions``.
+    """
+
+    def __init__(self, upload_dir: str = "uploads", chunk_size: Optional[int] = None,
+                 max_size: Optional[int] = None):
+        self.upload_dir = upload_dir
+        self.partial_dir = os.path.join(upload_dir, ".partial")
+        self.chunk_size = chunk_size or int(os.getenv('UPLOAD_CHUNK_SIZE', str(8 * 1024 * 1024)))
+        self.max_size = max_size or int(os.getenv('MAX_UPLOAD_SIZE', '500000000'))
+        self.session_ttl = float(os.getenv('UPLOAD_SESSION_TTL', str(24 * 3600)))
+        self.cleanup_interval = float(os.getenv('UPLOAD_CLEANUP_INTERVAL', '3600'))
+        self._cleaner = None
+        # In-order sessions keep a running hash so completion needs no re-read
+        self._hashers = {}
+        os.makedirs(self.partial_dir, exist_ok=True)
+
+    async def save(self, upload_file) -> dict:
+        """Stream a FastAPI ``UploadFile`` to a uniquely named file in the upload dir."""
+        extension = os.path.splitext(upload_file.filename)[1].lower()
+        file_path = os.path.join(self.upload_dir, f"{uuid.uuid4()}{extension}")
+        hasher = hashlib.sha256()
+
+        try:
+            size = await self._write_stream(
+                self._iter_upload_file(upload_file), file_path, 'wb', hasher, self.max_size
+            )
+        except Exception:
+            await asyncio.to_thread(self._remove, file_path)
+            raise
+
+        return {'file_path': file_path, 'size': size, 'sha256': hasher.hexdigest()}
+
+    def create_session(self, filename: str, total_size: int) -> dict:
+        """Start a resumable upload and return its session descriptor."""
+        if total_size <= 0:
+            raise ValueError("Upload size must be positive")
+        if total_size > self.max_size:
+            raise UploadTooLargeError(f"File exceeds maximum upload size of {self.max_size} bytes")
+
+        upload_id = str(uuid.uuid4())
+        session = {
+            'upload_id': upload_id,
+            'filename': filename,
+            'extension': os.path.splitext(filename)[1].lower(),
+            'total_size': total_size,
+            'received': 0,
+            'chunk_size': self.chunk_size,
+            'created_at': time.time()
+        }
+        open(self._data_path(upload_id), 'wb').close()
+        self._save_session(session)
+        self._hashers[upload_id] = _OffsetHasher(hashlib.sha256(), 0)
+        return session
+
+    def get_session(self, upload_id: str) -> dict:
+        """Load a resumable upload session."""
+        path = self._session_path(upload_id)
+        if not os.path.exists(path):
+            raise UploadNotFoundError(f"Upload session not found: {upload_id}")
+        with open(path) as f:
+            return json.load(f)
+
+    async def append_chunk(self, upload_id: str, offset: int, stream: AsyncIterator[bytes]) -> dict:
+        """Append a streamed request body to a session at ``offset``."""
+        lock = await asyncio.to_thread(self._lock_session, upload_id)
+        try:
+            return await self._append_locked(upload_id, offset, stream)
+        finally:
+            await asyncio.to_thread(os.close, lock)
+
+    async def _append_locked(self, upload_id: str, offset: int, stream: AsyncIterator[bytes]) -> dict:
+        session = await asyncio.to_thread(self.get_session, upload_id)
+        if offset != session['received']:
+            raise UploadOffsetError(session['received'])
+
+        # A hash is only reusable if every byte so far went through this process
+        hasher = self._hashers.get(upload_id)
+        if hasher is not None and hasher.offset != offset:
+            hasher = None
+            self._hashers.pop(upload_id, None)
+
+        remaining = session['total_size'] - offset
+        data_path = self._data_path(upload_id)
+        try:
+            written = await self._write_stream(stream, data_path, 'r+b', hasher, remaining, offset)
+        except Exception:
+            # Roll back a partially written chunk so the client can retry from the same offset
+            await asyncio.to_thread(os.truncate, data_path, offset)
+            self._hashers.pop(upload_id, None)
+            raise
+
+        session['received'] = offset + written
+        if hasher is not None:
+            hasher.offset = session['received']
+        await asyncio.to_thread(self._save_session, session)
+        return session
+
+    async def complete(self, upload_id: str) -> dict:
+        """Finalize a session into a regular upload file and return its hash."""
+        lock = await asyncio.to_thread(self._lock_session, upload_id)
+        try:
+            return await self._complete_locked(upload_id)
+        finally:
+            await asyncio.to_thread(os.close, lock)
+
+    async def _complete_locked(self, upload_id: str) -> dict:
+        session = await asyncio.to_thread(self.get_session, upload_id)
+        if session['received'] != session['total_size']:
+            raise UploadOffsetError(session['received'])
+
+        hasher = self._hashers.pop(upload_id, None)
+        if hasher is not None and hasher.offset == session['total_size']:
+            digest = hasher.hexdigest()
+        else:
+            digest = await asyncio.to_thread(self._hash_file, self._data_path(upload_id))
+
+        file_path = os.path.join(self.upload_dir, f"{upload_id}{session['extension']}")
+        await asyncio.to_thread(os.replace, self._data_path(upload_id), file_path)
+        await asyncio.to_thread(self._remove, self._session_path(upload_id))
+        return {'file_path': file_path, 'size': session['total_size'], 'sha256': digest,
+                'filename': session['filename']}
+
+    def abort(self, upload_id: str):
+        """Discard a resumable upload session and its data."""
+        lock = self._lock_session(upload_id)
+        try:
+            self._hashers.pop(upload_id, None)
+            self._remove(self._data_path(upload_id))
+            self._remove(self._session_path(upload_id))
+        finally:
+            os.close(lock)
+
+    def cleanup_stale_sessions(self, max_age: Optional[float] = None) -> int:
+        """Remove sessions that have received nothing for ``max_age`` seconds (``UPLOAD_SESSION_TTL``)."""
+        max_age = max_age if max_age is not None else self.session_ttl
+        removed = 0
+        now = time.time()
+        for name in os.listdir(self.partial_dir):
+            if not name.endswith('.json'):
+                continue
+            upload_id = name[:-len('.json')]
+            try:
+                if not os.path.exists(self._data_path(upload_id)):
+                    # The data file is created first, so without it the session can never resume
+                    self._hashers.pop(upload_id, None)
+                    self._remove(self._session_path(upload_id))
+                    removed += 1
+                    continue
+                last_activity = max(self.get_session(upload_id)['created_at'],
+                                    os.path.getmtime(self._data_path(upload_id)))
+                if now - last_activity > max_age:
+                    self.abort(upload_id)
+                    removed += 1
+            except UploadBusyError:
+                # A chunk is arriving right now, so the session is not abandoned
+                continue
+            except Exception as e:
+                print(f"Failed to clean up upload session {upload_id}: {str(e)}")
+        return removed
+
+    def start(self):
+        """Run ``cleanup_stale_sessions`` periodically on the current event loop."""
+        if self._cleaner is None or self._cleaner.done():
+            self._cleaner = asyncio.get_running_loop().create_task(self._cleanup_loop())
+
+    async def stop(self):
+        if self._cleaner is not None:
+            self._cleaner.cancel()
+
+    async def _cleanup_loop(self):
+        while True:
+            try:
+                removed = await asyncio.to_thread(self.cleanup_stale_sessions)
+                if removed:
+                    print(f"Removed {removed} abandoned upload sessions")
+            except Exception as e:
+                print(f"Upload session cleanup failed: {str(e)}")
+            await asyncio.sleep(self.cleanup_interval)
+
+    def _lock_session(self, upload_id: str) -> int:
+        """Take the session's exclusive lock without waiting; returns the fd to close to release it."""
+        try:
+            fd = os.open(self._data_path(upload_id), os.O_RDWR)
+        except FileNotFoundError:
+            raise UploadNotFoundError(f"Upload session not found: {upload_id}")
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            raise UploadBusyError(self.get_session(upload_id)['received'])
+        return fd
+
+    async def _write_stream(self, stream: AsyncIterator[bytes], path: str, mode: str,
+                            hasher, limit: int, offset: int = 0) -> int:
+        f = await asyncio.to_thread(open, path, mode)
+        written = 0
+        try:
+            if offset:
+                await asyncio.to_thread(f.seek, offset)
+            async for chunk in stream:
+                if not chunk:
+                    continue
+                written += len(chunk)
+                if written > limit:
+                    raise UploadTooLargeError(f"Upload exceeds the allowed size of {limit} bytes")
+                await asyncio.to_thread(self._write_chunk, f, hasher, chunk)
+        finally:
+            await asyncio.to_thread(f.close)
+        return written
+
+    async def _iter_upload_file(self, upload_file) -> AsyncIterator[bytes]:
+        while True:
+            chunk = await upload_file.read(self.chunk_size)
+            if not chunk:
+                break
+            yield chunk
+
+    @staticmethod
+    def _write_chunk(f, hasher, chunk: bytes):
+        f.write(chunk)
+        if hasher is not None:
+            hasher.update(chunk)
+
+    def _hash_file(self, path: str) -> str:
+        hasher = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(self.chunk_size), b''):
+                hasher.update(chunk)
+        return hasher.hexdigest()
+
+    def _session_path(self, upload_id: str) -> str:
+        return os.path.join(self.partial_dir, f"{self._validate_id(upload_id)}.json")
+
+    def _data_path(self, upload_id: str) -> str:
+        return os.path.join(self.partial_dir, f"{self._validate_id(upload_id)}.part")
+
+    def _save_session(self, session: dict):
+        tmp_path = self._session_path(session['upload_id']) + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(session, f)
+        os.replace(tmp_path, self._session_path(session['upload_id']))
+
+    @staticmethod
+    def _validate_id(upload_id: str) -> str:
+        try:
+            return str(uuid.UUID(upload_id))
+        except ValueError:
+            raise UploadNotFoundError(f"Upload session not found: {upload_id}")
+
+    @staticmethod
+    def _remove(path: str):
+        if path and os.path.exists(path):
+            try:
+                os.remove(path)
+            except Exception as e:
+                print(f"Failed to remove {path}: {str(e)}")
+
+
+class _OffsetHasher:
+    """A sha256 hasher tagged with how many bytes it has consumed."""
+
+    def __init__(self, hasher, offset: int):
+        self._hasher = hasher
+        self.offset = offset
+
+    def update(self, data: bytes):
+        self._hasher.update(data)
+
+    def hexdigest(self) -> str:
+        return self._hasher.hexdigest()
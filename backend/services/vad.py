@@ -0,0 +1,101 @@
+import os
+from typing import Optional
+
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+
+SAMPLE_RATE = 16000
+FRAME_SECONDS = 0.03
+
+VAD_MODES = ('off', 'energy', 'webrtc')
+
+
+def vad_mode() -> str:
+    """The configured ``VAD_MODE``: ``off`` (default), ``energy`` or ``webrtc``."""
+    mode = os.getenv('VAD_MODE', 'off').lower()
+    if mode not in VAD_MODES:
+        raise ValueError(f"Unknown VAD mode: {mode}")
+    return mode
+
+
+def _energy_frames(audio: np.ndarray, frame: int) -> np.ndarray:
+    """Flag speech frames whose level stands out from the track's noise floor."""
+    n_frames = len(audio) // frame
+    power = np.mean(audio[:n_frames * frame].reshape(n_frames, frame) ** 2, axis=1)
+    level = 10 * np.log10(power + 1e-10)
+
+    margin = float(os.getenv('VAD_THRESHOLD_DB', '12'))
+    floor, loud = np.percentile(level, 10), np.percentile(level, 95)
+    # Speech with no pauses has a "floor" that is itself speech, so the
+    # threshold never sits closer than the margin to the loudest frames
+    threshold = min(floor + margin, loud - margin)
+    threshold = max(threshold, float(os.getenv('VAD_MIN_LEVEL_DB', '-50')))
+    return level > threshold
+
+
+def _webrtc_frames(audio: np.ndarray, frame: int, sample_rate: int) -> Optional[np.ndarray]:
+    """Flag speech frames with WebRTC's GMM classifier, or None if ``webrtcvad`` is not installed."""
+    try:
+        import webrtcvad
+    except ImportError:
+        print("webrtcvad is not installed, falling back to energy VAD")
+        return None
+
+    vad = webrtcvad.Vad(int(os.getenv('VAD_AGGRESSIVENESS', '2')))
+    n_frames = len(audio) // frame
+    pcm = (np.clip(audio[:n_frames * frame], -1.0, 1.0) * 32767).astype(np.int16).reshape(n_frames, frame)
+    return np.array([vad.is_speech(row.tobytes(), sample_rate) for row in pcm], dtype=bool)
+
+
+def detect_speech(audio: np.ndarray, sample_rate: int = SAMPLE_RATE, mode: Optional[str] = None) -> list:
+    """Return the speech regions of a mono float32 track as ``[start, end]`` pairs in seconds.
+
+    Frames of 30 ms are classified as speech or not, then smoothed: pauses
+    shorter than ``VAD_MIN_SILENCE`` seconds are bridged, blips shorter than
+    ``VAD_MIN_SPEECH`` are dropped and each region is widened by
+    ``VAD_PADDING`` so word onsets and tails are not clipped. With ``off``
+    the whole track is one region.
+    """
+    mode = mode or vad_mode()
+    duration = len(audio) / sample_rate
+    frame = int(FRAME_SECONDS * sample_rate)
+    if mode == 'off' or len(audio) < frame:
+        return [[0.0, duration]] if len(audio) else []
+
+    speech = None
+    if mode == 'webrtc':
+        speech = _webrtc_frames(audio, frame, sample_rate)
+    if speech is None:
+        speech = _energy_frames(audio, frame)
+
+    min_silence = float(os.getenv('VAD_MIN_SILENCE', '0.5'))
+    min_speech = float(os.getenv('VAD_MIN_SPEECH', '0.25'))
+    padding = float(os.getenv('VAD_PADDING', '0.2'))
+
+    # Run boundaries: indices where the speech flag flips
+    flags = np.concatenate([[False], speech, [False]]).astype(np.int8)
+    edges = np.flatnonzero(np.diff(flags))
+    regions = []
+    for start, end in zip(edges[::2], edges[1::2]):
+        start, end = start * FRAME_SECONDS, end * FRAME_SECONDS
+        if regions and start - regions[-1][1] < min_silence:
+            regions[-1][1] = end
+        else:
+            regions.append([start, end])
+
+    padded = []
+    for start, end in regions:
+        if end - start < min_speech:
+            continue
+        start, end = max(0.0, start - padding), min(duration, end + padding)
+        if padded and start <= padded[-1][1]:
+            padded[-1][1] = end
+        else:
+            padded.append([start, end])
+    return [[round(float(start), 3), round(float(end), 3)] for start, end in padded]
+
+
+def speech_seconds(regions: list) -> float:
+    return sum(end - start for start, end in regions)
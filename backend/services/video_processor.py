@@ -1,17 +1,30 @@
 import ffmpeg
-import whisper
-from gtts import gTTS
-import google.generativeai as genai
 import os
+import shutil
 import time
-from typing import Optional
+from typing import Callable, Optional
 import tempfile
 from dotenv import load_dotenv
-from subprocess import TimeoutExpired
-import torch
-import torchaudio
 import numpy as np
-import requests
+from services.model_registry import (
+    get_whisper_model, get_gemini_model, configured_whisper_sizes, select_whisper_size, whisper_quantization
+)
+from services.transcription_engine import get_transcription_engine, load_wav
+from services.artifact_store import get_artifact_store
+from services.result_cache import ResultCache, hash_file
+from services.elevenlabs_client import get_elevenlabs_client, split_into_chunks
+from services.tts_engine import default_tts_backend, get_tts_backend
+from services.translation_engine import (
+    TranslationEngine, default_translation_backend, get_local_translation_engine
+)
+from services.dubbing import Dubber, write_wav
+from services.voice_registry import voice_registry
+from services.vad import detect_speech, speech_seconds, vad_mode
+from services.source_separation import get_source_separator
+from services.audio_io import SAMPLE_RATE, probe_duration, read_audio_pcm, time_window
+from services.chunking import owned_regions, owned_segments, window_speech_start
+from services.ffmpeg_executor import ffmpeg_executor
+from services.progress import ProgressReporter
 
 def wait_for_file_access(file_path: str, max_retries: int = 5, delay: int = 2):
     """Wait for a file to become accessible."""
@@ -26,16 +39,113 @@ def wait_for_file_access(file_path: str, max_retries: int = 5, delay: int = 2):
     return False
 
 class VideoProcessor:
-    def __init__(self):
-        self.whisper_model = whisper.load_model("base")
-        # Load environment variables and configure APIs
+    def __init__(self, whisper_model_size: Optional[str] = None):
+        # Load environment variables; models come from the per-process registry
+        # so repeated tasks in the same worker share one loaded copy
         load_dotenv()
-        genai.configure(api_key=os.getenv('GEMINI_API_KEY'))
-        self.model = genai.GenerativeModel('gemini-pro')
+        self.whisper_model_size = whisper_model_size or configured_whisper_sizes()[0]
+        self.result_cache = ResultCache()
+        # Uploads and outputs may live in object storage rather than on this node's disk
+        self.artifact_store = get_artifact_store()
+        # "aligned" dubs each segment at its original timestamp, "continuous" reads the whole text
+        self.dubbing_mode = os.getenv('DUBBING_MODE', 'aligned').lower()
+        # "memory" streams PCM from ffmpeg straight into Whisper, "file" writes a WAV first
+        self.extraction_mode = os.getenv('AUDIO_EXTRACTION_MODE', 'memory').lower()
+        # "single_pass" hands continuous-mode TTS chunks straight to the merge, which encodes once
+        self.merge_mode = os.getenv('MERGE_MODE', 'single_pass').lower()
+        self.keep_original_audio = os.getenv('MERGE_KEEP_ORIGINAL_AUDIO', 'false').lower() == 'true'
+        # Mixes the source audio under the dub wherever VAD found no speech (music, ambience)
+        self.keep_background_audio = os.getenv('MERGE_KEEP_BACKGROUND_AUDIO', 'false').lower() == 'true'
+        # Gain of the source audio inside speech regions, where it still carries the original voice
+        self.background_speech_gain = float(os.getenv('MERGE_BACKGROUND_SPEECH_GAIN', '0.0'))
+        # Separates the source's vocals from its music and effects and mixes the dub over the latter
+        self.separate_background = os.getenv('SEPARATE_BACKGROUND_AUDIO', 'false').lower() == 'true'
+        # "gemini" or "local"; a job can override it with options['translation_backend']
+        self.translation_backend = default_translation_backend()
+        # "elevenlabs" or "local"; a job can override it with options['tts_backend']
+        self.tts_backend = default_tts_backend()
         self.elevenlabs_api_key = os.getenv('ELEVENLABS_API_KEY')
-        if not self.elevenlabs_api_key:
+        if not self.elevenlabs_api_key and self.tts_backend == 'elevenlabs':
             raise ValueError("ELEVENLABS_API_KEY not found in environment variables")
 
+    @property
+    def whisper_model(self):
+        # Resolved on first use so stage workers that never transcribe never load Whisper
+        return get_whisper_model(self.whisper_model_size)
+
+    @property
+    def model(self):
+        return get_gemini_model()
+
+    def whisper_size_for(self, media_path: str, options: dict, duration: Optional[float] = None) -> str:
+        """Whisper size for a job: ``options['whisper_model']``, else the duration rules, else the default."""
+        if options.get('whisper_model'):
+            return options['whisper_model']
+        if not os.getenv('WHISPER_SIZE_BY_DURATION'):
+            return self.whisper_model_size
+        if duration is None:
+            duration = probe_duration(media_path)
+        return select_whisper_size(duration) if duration > 0 else self.whisper_model_size
+
+    def translator(self, backend: Optional[str] = None):
+        """Return the segment translation engine for ``backend``, or the configured default."""
+        backend = (backend or self.translation_backend).lower()
+        if backend == 'local':
+            return get_local_translation_engine()
+        if backend != 'gemini':
+            raise ValueError(f"Unknown translation backend: {backend}")
+        return TranslationEngine(self.model)
+
+    def translation_params(self, target_language: str, backend: Optional[str] = None,
+                           transcription_params: Optional[dict] = None) -> dict:
+        """Cache parameters identifying a translation made with ``backend`` from a given transcript.
+
+        Every later stage's cache key extends this one, so ``transcription_params``
+        (model, quantization, language hint, VAD) is part of all of them.
+        """
+        local = (backend or self.translation_backend).lower() == 'local'
+        model = get_local_translation_engine().model_name if local else 'gemini-pro'
+        return {'target_language': target_language, 'model': model, 'mode': 'segments',
+                'transcription': transcription_params or {}}
+
+    def stage_params(self, media_path: str, target_language: str, preserve_voice: bool, options: dict,
+                     duration: Optional[float] = None) -> dict:
+        """Cache parameters of each stage of a job, keyed ``transcription``, ``translation``, ``speech`` and ``output``.
+
+        ``output`` is the whole-job key, shared by single-task and chunked
+        runs. ``preserve_voice`` should already be cleared for TTS backends
+        that cannot clone voices.
+        """
+        transcription_params = self.transcription_params(
+            self.whisper_size_for(media_path, options, duration=duration), options.get('source_language')
+        )
+        translation_params = self.translation_params(
+            target_language, options.get('translation_backend'), transcription_params
+        )
+        speech_params = dict(translation_params, preserve_voice=preserve_voice, dubbing=self.dubbing_mode,
+                             tts=self.tts(options.get('tts_backend')).name)
+        output_params = dict(
+            speech_params,
+            keep_original_audio=options.get('keep_original_audio', self.keep_original_audio),
+            keep_background_audio=options.get('keep_background_audio', self.keep_background_audio),
+            separate_background=options.get('separate_background', self.separate_background)
+        )
+        return {'transcription': transcription_params, 'translation': translation_params,
+                'speech': speech_params, 'output': output_params}
+
+    def fetch_cached_job(self, content_hash: Optional[str], output_params: dict, output_path: str) -> Optional[dict]:
+        """Restore a finished job's result and video at ``output_path`` from the cache, or return None."""
+        cached_job = self.result_cache.fetch_json(content_hash, 'job', output_params)
+        if not cached_job:
+            return None
+        if not self.result_cache.fetch_file(content_hash, 'output', output_params, output_path):
+            return None
+        return dict(cached_job, video_path=output_path, cached=True)
+
+    def tts(self, backend: Optional[str] = None):
+        """Return the speech synthesis backend called ``backend``, or the configured default."""
+        return get_tts_backend(backend or self.tts_backend, self.elevenlabs_api_key)
+
     def extract_audio(self, video_path: str) -> str:
         """Extract audio from video file."""
         output_path = video_path.rsplit('.', 1)[0] + '.wav'
@@ -56,15 +166,8 @@ class VideoProcessor:
                 threads='auto'  # Use all available CPU threads
             )
             
-            # Run FFmpeg with timeout
-            process = ffmpeg.run_async(stream, overwrite_output=True)
-            
-            # Wait for process with timeout
-            try:
-                process.wait(timeout=30)  # 30 seconds timeout
-            except TimeoutExpired:
-                process.kill()
-                raise Exception("Audio extraction timed out after 30 seconds")
+            # Run FFmpeg with a timeout proportional to the video's length
+            ffmpeg_executor.run(stream, duration=probe_duration(video_path), label='extract_audio')
             
             # Quick file check
             if not os.path.exists(output_path) or os.path.getsize(output_path) == 0:
@@ -105,22 +208,89 @@ class VideoProcessor:
                     pass
             raise Exception(f"Failed to extract audio: {str(e)}")
 
-    def transcribe_audio(self, audio_path: str) -> dict:
-        """Transcribe audio to text using Whisper."""
+    def extract_audio_array(self, video_path: str,
+                            on_progress: Optional[Callable[[float], None]] = None,
+                            start: float = 0.0, duration: Optional[float] = None) -> np.ndarray:
+        """Extract 16 kHz mono audio from a video into memory without a temp WAV.
+
+        ``start`` and ``duration`` (seconds) extract only that part of the video.
+        """
         try:
-            # Ensure the file exists and is accessible
-            if not os.path.exists(audio_path):
-                raise Exception(f"Audio file not found: {audio_path}")
-            
-            # Wait for the file to be accessible
-            if not wait_for_file_access(audio_path):
-                raise Exception("Failed to access the audio file for transcription")
+            return read_audio_pcm(video_path, SAMPLE_RATE, on_progress=on_progress, start=start, duration=duration)
+        except Exception as e:
+            print(f"Error during audio extraction: {str(e)}")
+            raise Exception(f"Failed to extract audio: {str(e)}")
+
+    def separate_background_audio(self, video_path: str, output_path: Optional[str] = None,
+                                  on_progress: Optional[Callable[[float], None]] = None,
+                                  start: Optional[float] = None, duration: Optional[float] = None) -> str:
+        """Write the video's accompaniment (its audio without vocals) to a WAV and return its path.
+
+        ``start`` and ``duration`` (seconds) separate only that part of the video.
+        """
+        separator = get_source_separator()
+        output_path = output_path or tempfile.mktemp(suffix='.wav')
+        mix_path = tempfile.mktemp(suffix='.wav')
+        try:
+            # The separation model works on stereo at its own sample rate
+            stream = ffmpeg.input(video_path, **time_window(start, duration)).output(
+                mix_path, acodec='pcm_s16le', ac=2, ar=separator.sample_rate, loglevel='error', threads='auto'
+            )
+            ffmpeg_executor.run(stream, duration=duration or probe_duration(video_path),
+                                label='extract_separation_audio')
+            return separator.separate(mix_path, output_path, on_progress=on_progress)
+        except Exception as e:
+            raise Exception(f"Failed to separate background audio: {str(e)}")
+        finally:
+            self._cleanup_files([mix_path])
+
+    def transcription_params(self, model_size: str, language: Optional[str] = None) -> dict:
+        """Cache parameters identifying a transcription made with this model and language hint."""
+        params = {'model': model_size}
+        if whisper_quantization() != 'none':
+            params['quantization'] = whisper_quantization()
+        if language:
+            params['language'] = language
+        if vad_mode() != 'off':
+            params['vad'] = vad_mode()
+        return params
+
+    def transcribe_audio(self, audio_path, on_progress: Optional[Callable[[int, int], None]] = None,
+                         model_size: Optional[str] = None, language: Optional[str] = None) -> dict:
+        """Transcribe audio to text using Whisper.
+
+        ``audio_path`` may also be a 16 kHz float32 array from ``extract_audio_array``.
+        ``model_size`` overrides the worker's default size, and ``language``
+        (a Whisper language code or name) skips language detection. Unless
+        ``VAD_MODE`` is ``off``, only detected speech is transcribed and the
+        regions are returned as ``speech_regions`` (``[start, end]`` seconds).
+        """
+        try:
+            if isinstance(audio_path, str):
+                # Ensure the file exists and is accessible
+                if not os.path.exists(audio_path):
+                    raise Exception(f"Audio file not found: {audio_path}")
+                
+                # Wait for the file to be accessible
+                if not wait_for_file_access(audio_path):
+                    raise Exception("Failed to access the audio file for transcription")
             
-            result = self.whisper_model.transcribe(audio_path)
-            return {
-                'text': result['text'],
-                'segments': result['segments']
-            }
+            # Long audio is split at silences and transcribed across a process pool
+            model_size = model_size or self.whisper_model_size
+            engine = get_transcription_engine(get_whisper_model(model_size), model_size)
+            options = {'fp16': False} if whisper_quantization() == 'int8' else {}
+            if language:
+                options['language'] = language
+            if vad_mode() == 'off':
+                return engine.transcribe(audio_path, on_progress=on_progress, **options)
+
+            audio = load_wav(audio_path) if isinstance(audio_path, str) else audio_path
+            regions = detect_speech(audio, SAMPLE_RATE)
+            print(f"VAD found {speech_seconds(regions):.1f}s of speech in {len(audio) / SAMPLE_RATE:.1f}s "
+                  f"({len(regions)} regions)")
+            transcription = engine.transcribe(audio, on_progress=on_progress, speech_regions=regions, **options)
+            transcription['speech_regions'] = regions
+            return transcription
         except Exception as e:
             raise Exception(f"Failed to transcribe audio: {str(e)}")
 
@@ -165,10 +335,45 @@ class VideoProcessor:
             print(error_msg)
             raise Exception(error_msg)
 
-    def generate_speech(self, text: str, lang: str, voice_id: Optional[str] = None) -> str:
-        """Generate speech using ElevenLabs with optional voice cloning."""
+    def translate_segments(self, transcription: dict, target_language: str,
+                           on_progress: Optional[Callable[[int, int], None]] = None,
+                           backend: Optional[str] = None) -> dict:
+        """Translate Whisper segments in batches, keeping each translation on its timestamps."""
+        try:
+            engine = self.translator(backend)
+            segments = engine.translate_segments(
+                transcription.get('segments') or [], target_language, on_progress=on_progress,
+                source_language=transcription.get('language')
+            )
+            if not segments and not isinstance(engine, TranslationEngine):
+                # Local models translate sentence-sized inputs, so feed the plain text in chunks
+                chunks = [{'start': 0.0, 'end': 0.0, 'text': chunk}
+                          for chunk in split_into_chunks(transcription['text'], 400)]
+                translated = engine.translate_segments(chunks, target_language,
+                                                       source_language=transcription.get('language'))
+                return {'text': ' '.join(s['translation'] for s in translated), 'segments': []}
+            if not segments:
+                # No usable segments (e.g. cached plain-text transcript), translate the whole text
+                return {'text': self.translate_text(transcription['text'], target_language), 'segments': []}
+            
+            translated_text = ' '.join(s['translation'] for s in segments if s['translation'])
+            if not translated_text:
+                raise Exception("Received empty translation from Gemini")
+            print(f"Received translation: {translated_text[:100]}...")
+            return {'text': translated_text, 'segments': segments}
+        except Exception as e:
+            error_msg = f"Failed to translate text: {str(e)}"
+            print(error_msg)
+            raise Exception(error_msg)
+
+    def generate_speech(self, text: str, lang: str, voice_id: Optional[str] = None,
+                        max_chunk_size: Optional[int] = None,
+                        on_progress: Optional[Callable[[int, int], None]] = None,
+                        backend: Optional[str] = None) -> str:
+        """Generate speech with the selected TTS backend, optionally in a cloned voice."""
         temp_audio_path = None
         wav_path = None
+        all_audio_chunks = []
         
         try:
             print(f"\nStarting speech generation for language: {lang}")
@@ -178,46 +383,16 @@ class VideoProcessor:
             temp_audio_path = tempfile.mktemp(suffix='.mp3')
             wav_path = tempfile.mktemp(suffix='.wav')
             
-            # For free tier, use the default "Adam" voice if no voice_id is provided
-            voice_id = voice_id or "pNInz6obpgDQGcFmaJgB"  # Adam voice ID
-            
-            # ElevenLabs API endpoint
-            url = f"https://api.elevenlabs.io/v1/text-to-speech/{voice_id}"
+            # Split on sentence boundaries into chunks no longer than the backend accepts
+            tts = self.tts(backend)
+            text_chunks = split_into_chunks(text, max_chunk_size or tts.max_chunk_chars)
+            print(f"Generating speech for {len(text_chunks)} chunks with {tts.name} TTS...")
             
-            headers = {
-                "Accept": "audio/mpeg",
-                "Content-Type": "application/json",
-                "xi-api-key": self.elevenlabs_api_key
-            }
+            # Chunks come back in order: concurrent requests for ElevenLabs, batches for local TTS
+            audio_contents = tts.synthesize_many(text_chunks, lang, voice_id=voice_id, on_progress=on_progress)
             
-            # Split text into chunks of 2500 characters for free tier limitation
-            max_chunk_size = 2500
-            text_chunks = [text[i:i + max_chunk_size] for i in range(0, len(text), max_chunk_size)]
-            
-            all_audio_chunks = []
-            
-            for chunk in text_chunks:
-                data = {
-                    "text": chunk,
-                    "model_id": "eleven_multilingual_v1",  # Free tier model
-                    "voice_settings": {
-                        "stability": 0.5,
-                        "similarity_boost": 0.75,
-                        "style": 0.0,
-                        "use_speaker_boost": True
-                    }
-                }
-                
-                print(f"Generating speech for chunk of length {len(chunk)}...")
-                response = requests.post(url, json=data, headers=headers)
-                
-                if response.status_code == 200:
-                    chunk_path = tempfile.mktemp(suffix='.mp3')
-                    with open(chunk_path, 'wb') as f:
-                        f.write(response.content)
-                    all_audio_chunks.append(chunk_path)
-                else:
-                    raise Exception(f"ElevenLabs API error: {response.text}")
+            speech_duration = sum(tts.clip_duration(content) for content in audio_contents)
+            all_audio_chunks = self._write_chunks(audio_contents, '.' + tts.format)
             
             # Concatenate all audio chunks if there are multiple
             if len(all_audio_chunks) > 1:
@@ -225,7 +400,7 @@ class VideoProcessor:
                 inputs = [ffmpeg.input(chunk) for chunk in all_audio_chunks]
                 concat = ffmpeg.concat(*inputs, v=0, a=1)
                 concat = ffmpeg.output(concat, temp_audio_path)
-                ffmpeg.run(concat, overwrite_output=True)
+                ffmpeg_executor.run(concat, duration=speech_duration, label='concat_speech')
             elif len(all_audio_chunks) == 1:
                 # Just move the single chunk to temp_audio_path
                 os.rename(all_audio_chunks[0], temp_audio_path)
@@ -248,7 +423,7 @@ class VideoProcessor:
                 ac=1,
                 ar='24000'
             )
-            ffmpeg.run(stream, overwrite_output=True)
+            ffmpeg_executor.run(stream, duration=speech_duration, label='convert_speech')
             
             # Clean up MP3 file
             if os.path.exists(temp_audio_path):
@@ -271,7 +446,7 @@ class VideoProcessor:
         except Exception as e:
             print(f"Error during speech generation: {str(e)}")
             # Clean up any temporary files
-            for file_path in [temp_audio_path, wav_path]:
+            for file_path in [temp_audio_path, wav_path] + all_audio_chunks:
                 if file_path and os.path.exists(file_path):
                     try:
                         os.remove(file_path)
@@ -280,6 +455,81 @@ class VideoProcessor:
                         print(f"Warning: Failed to clean up {file_path}: {str(cleanup_error)}")
             raise Exception(f"Failed to generate speech: {str(e)}")
 
+    def generate_speech_chunks(self, text: str, lang: str, voice_id: Optional[str] = None,
+                               max_chunk_size: Optional[int] = None,
+                               on_progress: Optional[Callable[[int, int], None]] = None,
+                               backend: Optional[str] = None) -> str:
+        """Synthesize speech chunks and return an ffconcat list of them, with no transcoding.
+
+        The list is read by ``merge_audio_video`` through ffmpeg's concat demuxer,
+        so the chunks are decoded and encoded exactly once, during the merge.
+        """
+        list_path = tempfile.mktemp(suffix='.ffconcat')
+        chunk_paths = []
+        try:
+            print(f"\nStarting speech generation for language: {lang}")
+            tts = self.tts(backend)
+            text_chunks = split_into_chunks(text, max_chunk_size or tts.max_chunk_chars)
+            print(f"Generating speech for {len(text_chunks)} chunks with {tts.name} TTS...")
+            chunk_paths = self._write_chunks(
+                tts.synthesize_many(text_chunks, lang, voice_id=voice_id, on_progress=on_progress),
+                '.' + tts.format
+            )
+            with open(list_path, 'w') as f:
+                f.write("ffconcat version 1.0\n")
+                for chunk_path in chunk_paths:
+                    escaped = chunk_path.replace("'", "'\\''")
+                    f.write(f"file '{escaped}'\n")
+            return list_path
+        except Exception as e:
+            self._cleanup_files([list_path] + chunk_paths)
+            raise Exception(f"Failed to generate speech: {str(e)}")
+
+    def _write_chunks(self, audio_contents: list, suffix: str = '.mp3') -> list:
+        chunk_paths = []
+        for content in audio_contents:
+            chunk_path = tempfile.mktemp(suffix=suffix)
+            with open(chunk_path, 'wb') as f:
+                f.write(content)
+            chunk_paths.append(chunk_path)
+        return chunk_paths
+
+    def generate_dubbed_speech(self, segments: list, duration: float, voice_id: Optional[str] = None,
+                               on_progress: Optional[Callable[[int, int], None]] = None,
+                               lang: str = '', backend: Optional[str] = None) -> str:
+        """Synthesize each translated segment and place it at its original timestamp."""
+        wav_path = tempfile.mktemp(suffix='.wav')
+        try:
+            tts = self.tts(backend)
+            dubber = Dubber(lambda texts: tts.synthesize_many(texts, lang, voice_id=voice_id, on_progress=on_progress))
+            dubber.render(segments, duration, wav_path)
+            return wav_path
+        except Exception as e:
+            self._cleanup_files([wav_path])
+            raise Exception(f"Failed to generate speech: {str(e)}")
+
+    def synthesize_translation(self, translation: dict, lang: str, duration: float,
+                               voice_id: Optional[str] = None,
+                               on_progress: Optional[Callable[[int, int], None]] = None,
+                               chunk_list: bool = False, backend: Optional[str] = None) -> str:
+        """Produce the speech track for a translation using the configured dubbing mode.
+
+        With ``chunk_list`` continuous-mode speech is returned as an ffconcat
+        list of TTS chunks for a single-pass merge instead of a WAV. ``backend``
+        picks the TTS backend for this call.
+        """
+        if self.dubbing_mode == 'aligned' and translation.get('segments'):
+            print(f"\nDubbing {len(translation['segments'])} segments for language: {lang}")
+            return self.generate_dubbed_speech(
+                translation['segments'], duration, voice_id=voice_id, on_progress=on_progress,
+                lang=lang, backend=backend
+            )
+        if chunk_list:
+            return self.generate_speech_chunks(translation['text'], lang, voice_id=voice_id,
+                                               on_progress=on_progress, backend=backend)
+        return self.generate_speech(translation['text'], lang, voice_id=voice_id,
+                                    on_progress=on_progress, backend=backend)
+
     def clone_voice(self, audio_file_path: str, name: str, description: Optional[str] = None) -> str:
         """Clone a voice using ElevenLabs Voice Lab."""
         try:
@@ -292,12 +542,8 @@ class VideoProcessor:
             if file_size > 10 * 1024 * 1024:  # 10MB in bytes
                 raise Exception("Audio file size exceeds free tier limit of 10MB")
             
-            url = "https://api.elevenlabs.io/v1/voices/add"
-            
-            headers = {
-                "Accept": "application/json",
-                "xi-api-key": self.elevenlabs_api_key
-            }
+            client = get_elevenlabs_client(self.elevenlabs_api_key)
+            headers = {"Accept": "application/json"}
 
             with open(audio_file_path, 'rb') as f:
                 files = {
@@ -306,7 +552,9 @@ class VideoProcessor:
                     'description': (None, description or f"Cloned voice for {name}")
                 }
                 
-                response = requests.post(url, headers=headers, files=files)
+                response = client.session.post(
+                    f"{client.base_url}/v1/voices/add", headers=headers, files=files
+                )
                 
                 if response.status_code == 200:
                     voice_data = response.json()
@@ -323,30 +571,98 @@ class VideoProcessor:
             print("Falling back to default voice...")
             return None
 
-    def merge_audio_video(self, video_path: str, audio_path: str) -> str:
-        """Merge translated audio with original video."""
+    def reuse_or_clone_voice(self, samples: np.ndarray, audio_path: str, name: str) -> Optional[str]:
+        """Return a cloned voice for the speaker, reusing a stored clone whose fingerprint matches.
+
+        ``audio_path`` is the WAV uploaded for a new clone; it is written from
+        ``samples`` only when a clone is actually needed and it does not exist yet.
+        """
+        client = get_elevenlabs_client(self.elevenlabs_api_key)
+
+        def clone():
+            if not os.path.exists(audio_path):
+                write_wav(audio_path, samples, SAMPLE_RATE)
+            return self.clone_voice(audio_path, name, "Cloned voice for video translation")
+
+        return voice_registry.get_or_clone(samples, SAMPLE_RATE, clone, client.delete_voice)
+
+    def merge_audio_video(self, video_path: str, audio_path: str, keep_original_audio: bool = False,
+                          on_progress: Optional[Callable[[float], None]] = None,
+                          speech_regions: Optional[list] = None, background_path: Optional[str] = None) -> str:
+        """Merge translated audio with original video in a single ffmpeg pass.
+
+        The video stream is copied and only the speech is encoded (to AAC),
+        straight from the TTS chunks when ``audio_path`` is an ffconcat list.
+        The MP4 is written with ``+faststart`` so it can play while downloading,
+        and ``keep_original_audio`` adds the source audio as a second track.
+        With ``speech_regions`` the source audio is mixed under the dub, at
+        ``MERGE_BACKGROUND_SPEECH_GAIN`` inside the regions so the original
+        voice does not compete with the translation. A separated
+        ``background_path`` has no voice left, so it is mixed in at full level
+        instead.
+        """
         output_path = video_path.rsplit('.', 1)[0] + '_translated.mp4'
         
         try:
             input_video = ffmpeg.input(video_path)
-            input_audio = ffmpeg.input(audio_path)
+            input_audio = ffmpeg.input(audio_path, **self._input_options(audio_path))
+            
+            speech = input_audio['a:0']
+            if background_path:
+                speech = self._mix_under(speech, ffmpeg.input(background_path)['a:0'])
+            elif speech_regions:
+                speech = self._mix_background(speech, input_video['a:0'], speech_regions)
+            streams = [input_video['v:0'], speech]
+            track_options = {'metadata:s:a:0': 'title=Translated', 'disposition:a:0': 'default'}
+            if keep_original_audio:
+                # "?" keeps the merge working for videos without an audio track
+                streams.append(input_video['a:0?'])
+                track_options.update({'metadata:s:a:1': 'title=Original', 'disposition:a:1': '0'})
             
             stream = ffmpeg.output(
-                input_video,
-                input_audio,
+                *streams,
                 output_path,
                 vcodec='copy',
-                acodec='aac'
+                acodec='aac',
+                movflags='+faststart',
+                **track_options
+            )
+            ffmpeg_executor.run(
+                stream,
+                duration=probe_duration(video_path),
+                label='merge_audio_video',
+                on_progress=on_progress
             )
-            ffmpeg.run(stream, overwrite_output=True)
             return output_path
         except ffmpeg.Error as e:
             raise Exception(f"Failed to merge audio and video: {str(e)}")
 
-    def process_video(self, video_path: str, target_language: str, preserve_voice: bool = False) -> dict:
-        """Process video through the complete translation pipeline."""
+    def process_video(self, video_path: str, target_language: str, preserve_voice: bool = False,
+                      content_hash: Optional[str] = None,
+                      progress_callback: Optional[Callable[[dict], None]] = None,
+                      options: Optional[dict] = None) -> dict:
+        """Process video through the complete translation pipeline.
+
+        Stage outputs are cached by ``content_hash`` (the upload's sha256), so
+        repeating a job on the same video only re-runs stages whose inputs changed.
+        ``progress_callback`` receives throttled ``{'current', 'percent', 'current_step'}``
+        updates from within each stage. ``options`` holds per-job settings such as
+        ``keep_original_audio``, ``keep_background_audio``, ``separate_background``,
+        ``whisper_model``, ``source_language``, ``translation_backend`` and ``tts_backend``.
+        """
+        options = options or {}
+        keep_original_audio = options.get('keep_original_audio', self.keep_original_audio)
+        keep_background_audio = options.get('keep_background_audio', self.keep_background_audio)
+        separate_background = options.get('separate_background', self.separate_background)
+        tts = self.tts(options.get('tts_backend'))
+        if preserve_voice and not tts.supports_voice_cloning:
+            print(f"{tts.name} TTS cannot use cloned voices, synthesizing without voice preservation")
+            preserve_voice = False
+        progress = ProgressReporter(progress_callback)
         audio_path = None
+        audio_samples = None
         temp_audio_path = None
+        background_path = None
         cloned_voice_id = None
         start_time = time.time()
         step_timing = {}
@@ -356,6 +672,7 @@ class VideoProcessor:
             'translation': {'status': 'not_started'},
             'voice_cloning': {'status': 'not_started'} if preserve_voice else None,
             'speech_generation': {'status': 'not_started'},
+            'background_separation': {'status': 'not_started'} if separate_background else None,
             'audio_merge': {'status': 'not_started'}
         }
         
@@ -365,27 +682,80 @@ class VideoProcessor:
             print(f"Target language: {target_language}")
             print(f"Preserve voice: {preserve_voice}")
             
-            # Step 1: Extract Audio
-            step_start = time.time()
-            print("Step 1: Extracting audio from video...")
-            audio_path = self.extract_audio(video_path)
-            step_timing['audio_extraction'] = time.time() - step_start
-            
-            # Get audio details
-            audio_duration = self._get_audio_duration(audio_path)
-            audio_size = os.path.getsize(audio_path)
-            results['audio_extraction'] = {
-                'status': 'success',
-                'file_path': audio_path,
-                'size': audio_size,
-                'duration': audio_duration
-            }
-            print(f"Audio extraction completed in {step_timing['audio_extraction']:.2f} seconds")
+            video_path = self.artifact_store.localize(video_path)
+            if self.result_cache.enabled and not content_hash:
+                content_hash = hash_file(video_path)
+            source_language = options.get('source_language')
+            translation_backend = options.get('translation_backend')
+            params = self.stage_params(video_path, target_language, preserve_voice, options)
+            transcription_params = params['transcription']
+            whisper_size = transcription_params['model']
+            translation_params = params['translation']
+            speech_params = params['speech']
+            output_params = params['output']
+            
+            # Whole-job cache hit: the translated video already exists
+            cached_job = self.fetch_cached_job(
+                content_hash, output_params, video_path.rsplit('.', 1)[0] + '_translated.mp4'
+            )
+            if cached_job:
+                print("Returning cached translated video")
+                self._publish_output(video_path, cached_job['video_path'])
+                return dict(cached_job, processing_time=time.time() - start_time)
+            
+            transcription = self.result_cache.fetch_json(content_hash, 'transcription', transcription_params)
+            translation = self.result_cache.fetch_json(content_hash, 'translation', translation_params)
+            temp_audio_path = self.result_cache.fetch_file(
+                content_hash, 'speech', speech_params, tempfile.mktemp(suffix='.wav')
+            )
+            
+            # Step 1: Extract Audio (skipped when every stage that needs it is cached)
+            if transcription is None or (preserve_voice and temp_audio_path is None):
+                step_start = time.time()
+                print("Step 1: Extracting audio from video...")
+                progress.stage('audio_extraction')
+                if self.extraction_mode == 'memory':
+                    audio_samples = self.extract_audio_array(video_path, on_progress=progress.update)
+                    audio_duration = len(audio_samples) / SAMPLE_RATE
+                    audio_size = audio_samples.nbytes
+                else:
+                    audio_path = self.result_cache.fetch_file(
+                        content_hash, 'audio', {}, video_path.rsplit('.', 1)[0] + '.wav'
+                    )
+                    if audio_path is None:
+                        audio_path = self.extract_audio(video_path)
+                        self.result_cache.store_file(content_hash, 'audio', {}, audio_path)
+                    audio_duration = self._get_audio_duration(audio_path)
+                    audio_size = os.path.getsize(audio_path)
+                step_timing['audio_extraction'] = time.time() - step_start
+                
+                results['audio_extraction'] = {
+                    'status': 'success',
+                    'file_path': audio_path,
+                    'in_memory': audio_samples is not None,
+                    'size': audio_size,
+                    'duration': audio_duration
+                }
+                print(f"Audio extraction completed in {step_timing['audio_extraction']:.2f} seconds")
+            else:
+                audio_duration = transcription.get('duration', 0.0)
+                results['audio_extraction'] = {'status': 'cached', 'duration': audio_duration}
             
             # Step 2: Transcribe
             step_start = time.time()
-            print("Step 2: Transcribing audio...")
-            transcription = self.transcribe_audio(audio_path)
+            if transcription is None:
+                print("Step 2: Transcribing audio...")
+                progress.stage('transcription')
+                transcription = self.transcribe_audio(
+                    audio_samples if audio_samples is not None else audio_path,
+                    on_progress=progress.tracker('windows'),
+                    model_size=whisper_size,
+                    language=source_language
+                )
+                transcription['duration'] = audio_duration
+                self.result_cache.store_json(content_hash, 'transcription', transcription_params, transcription)
+            else:
+                print("Step 2: Using cached transcription")
             step_timing['transcription'] = time.time() - step_start
             results['transcription'] = {
                 'status': 'success',
@@ -397,30 +767,40 @@ class VideoProcessor:
             
             # Step 3: Translate
             step_start = time.time()
-            print("Step 3: Translating text...")
-            translated_text = self.translate_text(
-                transcription['text'],
-                target_language
-            )
+            if translation is None:
+                print("Step 3: Translating text...")
+                progress.stage('translation')
+                translation = self.translate_segments(
+                    transcription, target_language, on_progress=progress.tracker('batches'),
+                    backend=translation_backend
+                )
+                self.result_cache.store_json(content_hash, 'translation', translation_params, translation)
+            else:
+                print("Step 3: Using cached translation")
+            translated_text = translation['text']
             step_timing['translation'] = time.time() - step_start
             results['translation'] = {
                 'status': 'success',
                 'original_text': transcription['text'][:100],
                 'translated_text': translated_text[:100],
                 'original_length': len(transcription['text']),
-                'translated_length': len(translated_text)
+                'translated_length': len(translated_text),
+                'segments': len(translation['segments'])
             }
             print(f"Translation completed in {step_timing['translation']:.2f} seconds")
             
-            # Optional Step: Voice Cloning
-            if preserve_voice:
+            # Optional Step: Voice Cloning (only needed when speech must be generated)
+            if preserve_voice and temp_audio_path is None:
                 step_start = time.time()
                 print("Optional Step: Cloning voice...")
+                progress.stage('voice_cloning')
                 try:
-                    cloned_voice_id = self.clone_voice(
-                        audio_path,
-                        f"voice_{os.path.basename(video_path)}",
-                        "Cloned voice for video translation"
+                    samples = audio_samples if audio_samples is not None else load_wav(audio_path)
+                    if audio_path is None:
+                        # A WAV is written for upload only if no stored voice matches
+                        audio_path = video_path.rsplit('.', 1)[0] + '.wav'
+                    cloned_voice_id = self.reuse_or_clone_voice(
+                        samples, audio_path, f"voice_{os.path.basename(video_path)}"
                     )
                     step_timing['voice_cloning'] = time.time() - step_start
                     results['voice_cloning'] = {
@@ -434,20 +814,33 @@ class VideoProcessor:
                         'status': 'error',
                         'error': str(e)
                     }
+            elif preserve_voice:
+                results['voice_cloning'] = {'status': 'cached'}
             
             # Step 4: Generate Speech
             step_start = time.time()
-            print("Step 4: Generating speech...")
-            temp_audio_path = self.generate_speech(
-                translated_text,
-                target_language.lower(),
-                voice_id=cloned_voice_id if preserve_voice else None
-            )
+            if temp_audio_path is None:
+                print("Step 4: Generating speech...")
+                progress.stage('speech_generation')
+                temp_audio_path = self.synthesize_translation(
+                    translation,
+                    target_language.lower(),
+                    audio_duration,
+                    voice_id=cloned_voice_id if preserve_voice else None,
+                    on_progress=progress.tracker('chunks'),
+                    chunk_list=self.merge_mode == 'single_pass',
+                    backend=tts.name
+                )
+                if not temp_audio_path.endswith('.ffconcat'):
+                    # Chunk lists are not cached; the merged output below covers them
+                    self.result_cache.store_file(content_hash, 'speech', speech_params, temp_audio_path)
+            else:
+                print("Step 4: Using cached speech")
             step_timing['speech_generation'] = time.time() - step_start
             
             # Get generated audio details
             speech_duration = self._get_audio_duration(temp_audio_path)
-            speech_size = os.path.getsize(temp_audio_path)
+            speech_size = sum(os.path.getsize(path) for path in self._speech_files(temp_audio_path))
             results['speech_generation'] = {
                 'status': 'success',
                 'file_path': temp_audio_path,
@@ -457,10 +850,44 @@ class VideoProcessor:
             }
             print(f"Speech generation completed in {step_timing['speech_generation']:.2f} seconds")
             
+            # Optional Step: Background Separation (music and effects to mix under the dub)
+            if separate_background:
+                step_start = time.time()
+                print("Optional Step: Separating background audio...")
+                progress.stage('background_separation')
+                separation_params = {'model': get_source_separator().model_name}
+                try:
+                    background_path = self.result_cache.fetch_file(
+                        content_hash, 'background', separation_params, tempfile.mktemp(suffix='.wav')
+                    )
+                    if background_path is None:
+                        background_path = self.separate_background_audio(video_path, on_progress=progress.update)
+                        self.result_cache.store_file(content_hash, 'background', separation_params, background_path)
+                    step_timing['background_separation'] = time.time() - step_start
+                    results['background_separation'] = {
+                        'status': 'success',
+                        'file_path': background_path,
+                        'size': os.path.getsize(background_path)
+                    }
+                    print(f"Background separation completed in {step_timing['background_separation']:.2f} seconds")
+                except Exception as e:
+                    # The dub is still usable without its background
+                    print(f"Background separation failed: {str(e)}")
+                    results['background_separation'] = {
+                        'status': 'error',
+                        'error': str(e)
+                    }
+            
             # Step 5: Merge Audio
             step_start = time.time()
             print("Step 5: Merging audio with video...")
-            final_video_path = self.merge_audio_video(video_path, temp_audio_path)
+            progress.stage('audio_merge')
+            final_video_path = self.merge_audio_video(
+                video_path, temp_audio_path, keep_original_audio=keep_original_audio,
+                on_progress=progress.update,
+                speech_regions=transcription.get('speech_regions') if keep_background_audio else None,
+                background_path=background_path
+            )
             step_timing['audio_merge'] = time.time() - step_start
             
             # Get final video details
@@ -476,13 +903,14 @@ class VideoProcessor:
             print(f"Total processing time: {total_time:.2f} seconds")
             
             # Cleanup temporary files
-            self._cleanup_files([audio_path, temp_audio_path])
+            self._cleanup_files([audio_path, temp_audio_path, background_path])
             
-            return {
+            job_result = {
                 'status': 'success',
                 'video_path': final_video_path,
                 'transcription': transcription,
                 'translation': translated_text,
+                'translated_segments': translation['segments'],
                 'processing_time': total_time,
                 'step_timing': step_timing,
                 'results': results,
@@ -490,17 +918,143 @@ class VideoProcessor:
                 'file_size': final_size,
                 'voice_id': cloned_voice_id if preserve_voice else None
             }
+            self.result_cache.store_file(content_hash, 'output', output_params, final_video_path)
+            self.result_cache.store_json(content_hash, 'job', output_params, job_result)
+            self._publish_output(video_path, final_video_path)
+            return job_result
             
         except Exception as e:
             print(f"Error occurred: {str(e)}")
-            self._cleanup_files([audio_path, temp_audio_path])
+            self._cleanup_files([audio_path, temp_audio_path, background_path])
             return {
                 'status': 'error',
                 'error': str(e)
             }
     
+    def process_window(self, media_path: str, window: dict, target_language: str, speech_path: str,
+                       voice_id: Optional[str] = None, options: Optional[dict] = None,
+                       whisper_size: Optional[str] = None, background_path: Optional[str] = None,
+                       progress: Optional[ProgressReporter] = None) -> dict:
+        """Run transcription, translation and speech synthesis on one window of a long video.
+
+        ``window`` comes from ``services.chunking.plan_windows``: its audio is
+        read from ``read_start`` to ``read_end`` and only the segments it owns
+        are translated and dubbed, so memory depends on the window length
+        rather than the video's. The dubbed speech is written to
+        ``speech_path`` and starts at the returned ``speech_start``: the
+        window's ``start``, or earlier when an owned segment begins in the
+        leading overlap. With ``background_path`` the window's accompaniment
+        is separated there too. Returns the
+        window's transcript, translated segments and speech regions in track
+        time plus the paths written (``speech_path`` is None for a window
+        without speech).
+        """
+        options = options or {}
+        progress = progress or ProgressReporter()
+        tts = self.tts(options.get('tts_backend'))
+        label = f"window {window['index'] + 1}/{window['count']}"
+
+        progress.stage('audio_extraction', label)
+        samples = self.extract_audio_array(
+            media_path, start=window['read_start'], duration=window['read_end'] - window['read_start']
+        )
+        progress.stage('transcription', label)
+        transcription = self.transcribe_audio(
+            samples, on_progress=progress.tracker('windows'), model_size=whisper_size,
+            language=options.get('source_language')
+        )
+        del samples
+
+        segments = owned_segments(transcription['segments'], window)
+        result = {
+            'index': window['index'],
+            'start': window['start'],
+            'end': window['end'],
+            'language': transcription.get('language'),
+            'text': ' '.join(s['text'].strip() for s in segments if s['text'].strip()),
+            'segments': segments,
+            'speech_regions': owned_regions(transcription.get('speech_regions'), window),
+            'translation': '',
+            'translated_segments': [],
+            'speech_path': None,
+            'background_path': None
+        }
+
+        if segments:
+            progress.stage('translation', label)
+            translation = self.translate_segments(
+                {'text': result['text'], 'segments': segments, 'language': result['language']},
+                target_language, on_progress=progress.tracker('batches'), backend=options.get('translation_backend')
+            )
+            result['translation'] = translation['text']
+            result['translated_segments'] = translation['segments']
+
+            progress.stage('speech_generation', label)
+            # The window's speech track starts at its first segment or its own start, not at the start of the video
+            speech_start = window_speech_start(translation['segments'], window)
+            relative = [dict(s, start=s['start'] - speech_start, end=s['end'] - speech_start)
+                        for s in translation['segments']]
+            temp_path = self.synthesize_translation(
+                dict(translation, segments=relative), target_language.lower(), window['end'] - speech_start,
+                voice_id=voice_id, on_progress=progress.tracker('chunks'), backend=tts.name
+            )
+            shutil.move(temp_path, speech_path)
+            result['speech_path'] = speech_path
+            result['speech_start'] = speech_start
+
+        if background_path:
+            progress.stage('background_separation', label)
+            try:
+                self.separate_background_audio(
+                    media_path, background_path, on_progress=progress.update,
+                    start=window['start'], duration=window['end'] - window['start']
+                )
+                result['background_path'] = background_path
+            except Exception as e:
+                # The dub is still usable without its background
+                print(f"Background separation failed for {label}: {str(e)}")
+        return result
+
+    def _publish_output(self, video_path: str, final_video_path: str):
+        """Store the output for download from any node; with a remote store, drop the local copies."""
+        self.artifact_store.publish(final_video_path)
+        if self.artifact_store.remote:
+            self._cleanup_files([video_path, final_video_path])
+
+    def _mix_background(self, speech, original, speech_regions: list):
+        """Mix ``original`` under ``speech``, turned down to the speech gain inside ``speech_regions``."""
+        in_speech = '+'.join(f"between(t,{start},{end})" for start, end in speech_regions)
+        background = original.filter('volume', volume=self.background_speech_gain, enable=in_speech)
+        return self._mix_under(speech, background)
+
+    @staticmethod
+    def _mix_under(speech, background):
+        """Mix a background stream under the speech, both converted to a common stereo format."""
+        speech = speech.filter('aformat', sample_rates=44100, channel_layouts='stereo')
+        background = background.filter('aformat', sample_rates=44100, channel_layouts='stereo')
+        # normalize=0 keeps both inputs at full level instead of halving each
+        return ffmpeg.filter([speech, background], 'amix', inputs=2, duration='longest', normalize=0)
+
+    @staticmethod
+    def _input_options(audio_path: str) -> dict:
+        # ffconcat lists of TTS chunks are read through the concat demuxer
+        return {'f': 'concat', 'safe': 0} if audio_path.endswith('.ffconcat') else {}
+
+    @staticmethod
+    def _speech_files(audio_path: Optional[str]) -> list:
+        """Return the files making up a speech track: the chunks of an ffconcat list plus the list."""
+        if not audio_path or not audio_path.endswith('.ffconcat') or not os.path.exists(audio_path):
+            return [audio_path]
+        with open(audio_path) as f:
+            chunks = [
+                line[len("file '"):-1].replace("'\\''", "'")
+                for line in f.read().splitlines() if line.startswith("file '")
+            ]
+        return chunks + [audio_path]
+
     def _cleanup_files(self, file_paths: list):
         """Clean up temporary files safely."""
+        file_paths = [path for file_path in file_paths for path in self._speech_files(file_path)]
         for file_path in file_paths:
             if file_path and os.path.exists(file_path):
                 try:
@@ -625,7 +1179,7 @@ class VideoProcessor:
     def _get_audio_duration(self, audio_path: str) -> float:
         """Get the duration of an audio file in seconds."""
         try:
-            probe = ffmpeg.probe(audio_path)
+            probe = ffmpeg.probe(audio_path, **self._input_options(audio_path))
             audio_info = next(s for s in probe['streams'] if s['codec_type'] == 'audio')
             return float(probe['format']['duration'])
         except Exception as e:
@@ -0,0 +1,177 @@
+import json
+import os
+from datetime import datetime, timedelta
+from typing import Callable, Optional
+
+import numpy as np
+import redis
+from dotenv import load_dotenv
+
+from models import Voice
+
+load_dotenv()
+
+REDIS_URL = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
+
+_N_MELS = 40
+_N_MFCC = 20
+
+
+def _mel_filterbank(sample_rate: int, n_fft: int, n_mels: int) -> np.ndarray:
+    def hz_to_mel(hz):
+        return 2595.0 * np.log10(1.0 + hz / 700.0)
+
+    def mel_to_hz(mel):
+        return 700.0 * (10 ** (mel / 2595.0) - 1.0)
+
+    edges = mel_to_hz(np.linspace(hz_to_mel(0.0), hz_to_mel(sample_rate / 2), n_mels + 2))
+    bins = np.floor((n_fft + 1) * edges / sample_rate).astype(int)
+    filters = np.zeros((n_mels, n_fft // 2 + 1), dtype=np.float32)
+    for m in range(1, n_mels + 1):
+        left, center, right = bins[m - 1], bins[m], bins[m + 1]
+        for k in range(left, center):
+            filters[m - 1, k] = (k - left) / max(center - left, 1)
+        for k in range(center, right):
+            filters[m - 1, k] = (right - k) / max(right - center, 1)
+    return filters
+
+
+def speaker_fingerprint(samples: np.ndarray, sample_rate: int = 16000, max_seconds: float = 120.0) -> np.ndarray:
+    """Summarize a speaker's voice as the mean and spread of MFCCs over voiced frames.
+
+    This is a cheap timbre fingerprint rather than a neural speaker
+    embedding: the same speaker recorded under similar conditions scores a
+    cosine similarity close to 1, which is what reuse of cloned voices needs.
+    """
+    samples = samples[:int(max_seconds * sample_rate)]
+    frame, hop = int(0.025 * sample_rate), int(0.010 * sample_rate)
+    n_fft = 1 << (frame - 1).bit_length()
+    if len(samples) < frame:
+        raise ValueError("Audio is too short to fingerprint")
+
+    n_frames = 1 + (len(samples) - frame) // hop
+    frames = np.lib.stride_tricks.as_strided(
+        samples, shape=(n_frames, frame), strides=(samples.strides[0] * hop, samples.strides[0])
+    ) * np.hamming(frame).astype(np.float32)
+    power = np.abs(np.fft.rfft(frames, n=n_fft)) ** 2
+
+    # Keep the louder half of the frames so silence and background do not dominate
+    energy = power.sum(axis=1)
+    voiced = power[energy >= np.median(energy)]
+
+    log_mel = np.log(voiced @ _mel_filterbank(sample_rate, n_fft, _N_MELS).T + 1e-10)
+    dct = np.cos(np.pi / _N_MELS * (np.arange(_N_MELS) + 0.5)[None, :] * np.arange(_N_MFCC)[:, None])
+    # The 0th coefficient is overall loudness, which says nothing about the speaker
+    mfcc = (log_mel @ dct.T)[:, 1:]
+
+    vector = np.concatenate([mfcc.mean(axis=0), mfcc.std(axis=0)])
+    return vector / (np.linalg.norm(vector) + 1e-10)
+
+
+class VoiceRegistry:
+    """Reuses cloned voices across jobs by matching speaker fingerprints.
+
+    Each cloned voice is stored in the ``voices`` table with the fingerprint
+    of the audio it was cloned from. A new job whose fingerprint is within
+    ``VOICE_MATCH_THRESHOLD`` cosine similarity of a stored one reuses that
+    voice instead of uploading audio and cloning again. When the table holds
+    ``VOICE_CACHE_MAX_VOICES`` voices, the least recently used is deleted
+    from the provider and the table before a new one is cloned; voices used
+    within ``VOICE_EVICT_MIN_IDLE_SECONDS`` are never evicted, since a running
+    job may still be synthesizing with them. The cap is strict: if every
+    stored voice is still in use, nothing is cloned and the job falls back to
+    the default voice. Without ``DATABASE_URL`` every call clones, as before.
+
+    Lookup, eviction and cloning run under one Redis lock shared by all
+    workers. Fingerprints match by similarity rather than equality, so two
+    jobs for the same speaker cannot be told apart by key; serializing them
+    lets the second find the first's clone instead of cloning again.
+    """
+
+    def __init__(self, session_factory=None, max_voices: Optional[int] = None,
+                 match_threshold: Optional[float] = None):
+        self.enabled = session_factory is not None or bool(os.getenv('DATABASE_URL'))
+        self._session_factory = session_factory
+        self.max_voices = max_voices or int(os.getenv('VOICE_CACHE_MAX_VOICES', '20'))
+        self.match_threshold = match_threshold or float(os.getenv('VOICE_MATCH_THRESHOLD', '0.97'))
+        self.min_idle = timedelta(seconds=float(os.getenv('VOICE_EVICT_MIN_IDLE_SECONDS', '3600')))
+        # Longest a clone may hold the lock; covers uploading the sample and cloning
+        self.lock_timeout = float(os.getenv('VOICE_CLONE_LOCK_TIMEOUT', '300'))
+        self._redis = None
+
+    def _lock(self):
+        if self._redis is None:
+            self._redis = redis.Redis.from_url(REDIS_URL)
+        return self._redis.lock('voice_registry:lock', timeout=self.lock_timeout,
+                                blocking_timeout=self.lock_timeout)
+
+    def _session(self):
+        if self._session_factory is None:
+            # database.py builds its engine at import, so only import it when configured
+            from database import SessionLocal
+            self._session_factory = SessionLocal
+        return self._session_factory()
+
+    def get_or_clone(self, samples: np.ndarray, sample_rate: int, clone: Callable[[], Optional[str]],
+                     delete: Callable[[str], None]) -> Optional[str]:
+        """Return a stored voice matching ``samples``, or clone, store and return a new one.
+
+        ``clone()`` creates a voice with the provider and returns its id (or
+        None on failure); ``delete(voice_id)`` removes an evicted one.
+        """
+        if not self.enabled:
+            return clone()
+
+        fingerprint = speaker_fingerprint(samples, sample_rate)
+        with self._lock():
+            return self._get_or_clone(fingerprint, clone, delete)
+
+    def _get_or_clone(self, fingerprint: np.ndarray, clone: Callable[[], Optional[str]],
+                      delete: Callable[[str], None]) -> Optional[str]:
+        session = self._session()
+        try:
+            voices = session.query(Voice).all()
+            best, best_score = None, -1.0
+            for voice in voices:
+                score = float(np.dot(fingerprint, np.asarray(json.loads(voice.fingerprint))))
+                if score > best_score:
+                    best, best_score = voice, score
+
+            if best is not None and best_score >= self.match_threshold:
+                print(f"Reusing cloned voice {best.voice_id} (similarity {best_score:.3f})")
+                best.use_count += 1
+                best.last_used_at = datetime.utcnow()
+                session.commit()
+                return best.voice_id
+
+            idle = [v for v in voices if v.last_used_at < datetime.utcnow() - self.min_idle]
+            stored = len(voices)
+            for voice in sorted(idle, key=lambda v: v.last_used_at)[:max(0, len(voices) - self.max_voices + 1)]:
+                print(f"Evicting cloned voice {voice.voice_id} (last used {voice.last_used_at})")
+                try:
+                    delete(voice.voice_id)
+                except Exception as e:
+                    # Keep the row so eviction is retried rather than leaking the provider voice
+                    print(f"Failed to delete voice {voice.voice_id}: {str(e)}")
+                    continue
+                session.delete(voice)
+                stored -= 1
+            session.commit()
+
+            if stored >= self.max_voices:
+                print(f"All {stored} cloned voices are in use, synthesizing with the default voice")
+                return None
+
+            voice_id = clone()
+            if voice_id:
+                session.add(Voice(voice_id=voice_id, fingerprint=json.dumps(fingerprint.round(6).tolist())))
+                session.commit()
+            return voice_id
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+
+
+voice_registry = VoiceRegistry()
@@ -0,0 +1,113 @@
+import os
+
+import pytest
+
+pytest.importorskip('boto3')
+
+from botocore.exceptions import ClientError  # noqa: E402
+
+from services.artifact_store import ArtifactNotFoundError, LocalArtifactStore, S3ArtifactStore  # noqa: E402
+
+
+class FakeS3:
+    """Just enough of the boto3 S3 client for the artifact store, backed by a dict."""
+
+    def __init__(self):
+        self.objects = {}
+        self.configs = []
+
+    @staticmethod
+    def _missing(operation):
+        return ClientError({'Error': {'Code': '404', 'Message': 'Not Found'}}, operation)
+
+    def upload_file(self, path, bucket, key, Config=None):
+        self.configs.append(Config)
+        with open(path, 'rb') as f:
+            self.objects[(bucket, key)] = f.read()
+
+    def download_file(self, bucket, key, path, Config=None):
+        if (bucket, key) not in self.objects:
+            raise self._missing('HeadObject')
+        with open(path, 'wb') as f:
+            f.write(self.objects[(bucket, key)])
+
+    def delete_object(self, Bucket, Key):
+        self.objects.pop((Bucket, Key), None)
+
+    def head_object(self, Bucket, Key):
+        if (Bucket, Key) not in self.objects:
+            raise self._missing('HeadObject')
+        return {}
+
+    def generate_presigned_url(self, operation, Params, ExpiresIn):
+        return f"https://s3.test/{Params['Bucket']}/{Params['Key']}?expires={ExpiresIn}" \
+               f"&disposition={Params.get('ResponseContentDisposition')}"
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setenv('ARTIFACT_MULTIPART_CHUNK_SIZE', str(8 * 1024 * 1024))
+    return S3ArtifactStore(bucket='media', root=str(tmp_path / 'uploads'), prefix='jobs/', client=FakeS3())
+
+
+def _write(path, data=b'artifact'):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(data)
+    return str(path)
+
+
+def test_keys_are_relative_to_the_upload_root(store, tmp_path):
+    assert store.key(str(tmp_path / 'uploads' / 'abc' / 'audio.wav')) == 'jobs/abc/audio.wav'
+    assert store.key('/elsewhere/speech.wav') == 'jobs/speech.wav'
+
+
+def test_published_artifacts_can_be_localized_on_another_node(store, tmp_path):
+    path = _write(tmp_path / 'uploads' / 'video.mp4')
+    store.publish(path)
+    assert store.client.configs[0].multipart_chunksize == 8 * 1024 * 1024
+    os.remove(path)
+
+    assert store.exists(path)
+    assert store.localize(path) == path
+    with open(path, 'rb') as f:
+        assert f.read() == b'artifact'
+    assert [name for name in os.listdir(tmp_path / 'uploads') if name.endswith('.part')] == []
+
+
+def test_missing_artifacts_raise_and_leave_no_temp_files(store, tmp_path):
+    path = str(tmp_path / 'uploads' / 'missing.wav')
+
+    assert not store.exists(path)
+    with pytest.raises(ArtifactNotFoundError):
+        store.localize(path)
+    assert os.listdir(tmp_path / 'uploads') == []
+
+
+def test_discard_removes_the_object(store, tmp_path):
+    path = _write(tmp_path / 'uploads' / 'speech.wav')
+    store.publish(path)
+    store.discard(path)
+    assert not store.exists(path)
+
+
+def test_download_url_is_presigned_with_the_filename(store, tmp_path):
+    url = store.download_url(str(tmp_path / 'uploads' / 'out.mp4'), filename='my video.mp4')
+    assert url.startswith('https://s3.test/media/jobs/out.mp4?expires=3600')
+    assert "filename*=utf-8''my%20video.mp4" in url
+
+
+def test_bucket_is_required(monkeypatch):
+    monkeypatch.delenv('ARTIFACT_S3_BUCKET', raising=False)
+    with pytest.raises(ValueError):
+        S3ArtifactStore(client=FakeS3())
+
+
+def test_local_store_serves_files_in_place(tmp_path):
+    store = LocalArtifactStore(str(tmp_path))
+    path = _write(tmp_path / 'video.mp4')
+
+    assert store.localize(path) == path
+    assert store.download_url(path) is None
+    with pytest.raises(ArtifactNotFoundError):
+        store.localize(str(tmp_path / 'missing.mp4'))
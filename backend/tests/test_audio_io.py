@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+
+from services import audio_io
+from services.audio_io import probe_duration, read_audio_pcm, time_window
+
+
+def _feed(monkeypatch, chunks):
+    """Make ffmpeg 'emit' ``chunks`` of s16le stdout, recording the command it was given."""
+    calls = []
+
+    def run(stream, duration=None, label=None, on_stdout=None, **kwargs):
+        calls.append({'args': stream.get_args(), 'duration': duration})
+        for chunk in chunks:
+            on_stdout(chunk)
+
+    monkeypatch.setattr(audio_io.ffmpeg_executor, 'run', run)
+    return calls
+
+
+def test_time_window_options():
+    assert time_window() == {}
+    assert time_window(12.5, 30) == {'ss': '12.500', 't': '30.000'}
+    assert time_window(0, 10) == {'t': '10.000'}
+
+
+def test_unprobeable_media_has_zero_duration(tmp_path):
+    assert probe_duration(str(tmp_path / 'missing.mp4')) == 0.0
+
+
+def test_samples_split_across_chunks_are_reassembled(monkeypatch):
+    pcm = np.array([16384, -16384, 8192, 0], dtype=np.int16).tobytes()
+    # Odd chunk sizes split samples between reads
+    _feed(monkeypatch, [pcm[:3], pcm[3:6], pcm[6:]])
+
+    samples = read_audio_pcm('video.mp4', duration=1.0)
+
+    assert samples.dtype == np.float32
+    assert samples.tolist() == [0.5, -0.5, 0.25, 0.0]
+
+
+def test_buffer_grows_past_the_probed_duration(monkeypatch):
+    pcm = np.full(40, 16384, dtype=np.int16).tobytes()
+    _feed(monkeypatch, [pcm[:40], pcm[40:]])
+
+    samples = read_audio_pcm('video.mp4', sample_rate=10, duration=0.5)
+
+    assert len(samples) == 40
+    assert samples == pytest.approx(0.5)
+
+
+def test_reads_only_the_requested_window(monkeypatch):
+    calls = _feed(monkeypatch, [np.zeros(4, dtype=np.int16).tobytes()])
+    progress = []
+
+    read_audio_pcm('video.mp4', start=60.0, duration=30.0, on_progress=progress.append)
+
+    assert calls[0]['duration'] == 30.0
+    assert calls[0]['args'][:4] == ['-ss', '60.000', '-t', '30.000']
+    assert 0 < progress[-1] <= 1.0
+
+
+def test_empty_output_is_an_error(monkeypatch):
+    _feed(monkeypatch, [])
+    with pytest.raises(Exception, match='no samples'):
+        read_audio_pcm('video.mp4', duration=1.0)
@@ -0,0 +1,51 @@
+import json
+
+import pytest
+import requests
+
+from benchmarks.bench_pipeline import _summarize
+from benchmarks.stub_servers import ElevenLabsStubHandler, GeminiStubHandler, start_server
+
+
+@pytest.fixture
+def gemini():
+    server = start_server(GeminiStubHandler)
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+
+
+@pytest.fixture
+def elevenlabs():
+    server = start_server(ElevenLabsStubHandler)
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+
+
+def test_summarize_percentiles():
+    summary = _summarize([float(v) for v in range(20, 0, -1)])
+    assert summary == {'mean': 10.5, 'p50': 11.0, 'p95': 20.0, 'max': 20.0}
+
+
+def test_gemini_stub_translates_batched_lines():
+    prompt = 'Translate each line in the following JSON array to French.\nLines: ["hello", "world"]'
+    assert json.loads(GeminiStubHandler._translate(prompt)) == ['[French] hello', '[French] world']
+
+
+def test_gemini_stub_translates_plain_text():
+    prompt = "Translate the following text to German.\nText to translate: 'good morning'"
+    assert GeminiStubHandler._translate(prompt) == '[German] good morning'
+
+
+def test_gemini_stub_answers_generate_content(gemini):
+    body = {'contents': [{'parts': [{'text': 'Translate to Spanish.\nLines: ["hi"]'}]}]}
+    response = requests.post(f"{gemini}/v1beta/models/gemini-pro:generateContent", json=body, timeout=5)
+
+    text = response.json()['candidates'][0]['content']['parts'][0]['text']
+    assert json.loads(text) == ['[Spanish] hi']
+    assert requests.post(f"{gemini}/v1beta/models", json={}, timeout=5).status_code == 404
+
+
+def test_elevenlabs_stub_voice_endpoints(elevenlabs):
+    assert requests.post(f"{elevenlabs}/v1/voices/add", timeout=5).json() == {'voice_id': 'stub-voice'}
+    assert requests.delete(f"{elevenlabs}/v1/voices/stub-voice", timeout=5).status_code == 200
+    assert requests.post(f"{elevenlabs}/v1/unknown", timeout=5).status_code == 404
@@ -0,0 +1,118 @@
+import wave
+
+import numpy as np
+import pytest
+
+from services.chunking import (
+    owned_regions, owned_segments, plan_windows, stitch_transcripts, stitch_wavs, window_speech_start
+)
+
+
+def test_plan_windows_covers_track_with_overlap():
+    windows = plan_windows(1500, window_seconds=600, overlap_seconds=15)
+    assert [(w['start'], w['end']) for w in windows] == [(0, 600), (600, 1200), (1200, 1500)]
+    assert [(w['read_start'], w['read_end']) for w in windows] == [(0.0, 615), (585, 1215), (1185, 1500)]
+    assert all(w['count'] == 3 for w in windows)
+
+
+def test_plan_windows_short_and_empty_media():
+    assert len(plan_windows(30, window_seconds=600, overlap_seconds=15)) == 1
+    assert plan_windows(0, window_seconds=600, overlap_seconds=15)[0]['end'] == 0
+
+
+def _segment(start, end, text='hi'):
+    return {'start': start, 'end': end, 'text': text,
+            'words': [{'word': text, 'start': start, 'end': end}]}
+
+
+def test_boundary_segment_is_kept_by_exactly_one_window():
+    first, second = plan_windows(1200, window_seconds=600, overlap_seconds=15)
+    # 595-605 s in track time: midpoint 600 belongs to the second window
+    from_first = owned_segments([_segment(595 - first['read_start'], 605 - first['read_start'])], first)
+    from_second = owned_segments([_segment(595 - second['read_start'], 605 - second['read_start'])], second)
+    assert from_first == []
+    assert len(from_second) == 1
+    assert from_second[0]['start'] == pytest.approx(595)
+    assert from_second[0]['words'][0]['end'] == pytest.approx(605)
+
+
+def test_edge_windows_own_everything_past_the_nominal_edges():
+    only, = plan_windows(100, window_seconds=600, overlap_seconds=15)
+    assert len(owned_segments([_segment(-1, 0.5), _segment(99, 102)], only)) == 2
+
+
+def test_owned_regions_are_shifted_and_clipped():
+    first, second = plan_windows(1200, window_seconds=600, overlap_seconds=15)
+    assert owned_regions(None, first) is None
+    assert owned_regions([[590, 610]], first) == [[590, 600]]
+    assert owned_regions([[5, 25]], second) == [[600, 610]]
+
+
+def test_stitch_transcripts_orders_windows_and_merges_regions():
+    results = [
+        {'index': 1, 'segments': [_segment(610, 612, 'b')], 'translated_segments': [_segment(610, 612, 'B')],
+         'text': 'b', 'translation': 'B', 'language': 'en', 'speech_regions': [[600, 612]]},
+        {'index': 0, 'segments': [_segment(1, 2, 'a')], 'translated_segments': [_segment(1, 2, 'A')],
+         'text': 'a', 'translation': 'A', 'language': 'en', 'speech_regions': [[0.5, 600]]},
+    ]
+    transcription, translation = stitch_transcripts(results)
+    assert transcription['text'] == 'a b'
+    assert [s['id'] for s in transcription['segments']] == [0, 1]
+    assert transcription['speech_regions'] == [[0.5, 612]]
+    assert transcription['language'] == 'en'
+    assert translation['text'] == 'A B'
+
+
+def _write_wav(path, samples, rate=1000):
+    with wave.open(str(path), 'wb') as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(rate)
+        wav.writeframes((np.asarray(samples) * 32767).astype(np.int16).tobytes())
+    return str(path)
+
+
+def _read_wav(path):
+    with wave.open(str(path), 'rb') as wav:
+        return np.frombuffer(wav.readframes(wav.getnframes()), dtype=np.int16) / 32767, wav.getframerate()
+
+
+def test_stitch_wavs_places_parts_and_pads(tmp_path):
+    a = _write_wav(tmp_path / 'a.wav', np.full(500, 0.25))
+    b = _write_wav(tmp_path / 'b.wav', np.full(500, 0.5))
+    out, rate = _read_wav(stitch_wavs([(0, a), (2, b)], str(tmp_path / 'out.wav'), total_duration=3))
+    assert rate == 1000
+    assert len(out) == 3000
+    assert out[:500] == pytest.approx(0.25, abs=1e-3)
+    assert out[500:2000] == pytest.approx(0, abs=1e-3)
+    assert out[2000:2500] == pytest.approx(0.5, abs=1e-3)
+    assert out[2500:] == pytest.approx(0, abs=1e-3)
+
+
+def test_stitch_wavs_mixes_overrunning_parts(tmp_path):
+    a = _write_wav(tmp_path / 'a.wav', np.full(1500, 0.25))
+    b = _write_wav(tmp_path / 'b.wav', np.full(500, 0.25))
+    out, _ = _read_wav(stitch_wavs([(0, a), (1, b)], str(tmp_path / 'out.wav')))
+    assert len(out) == 1500
+    assert out[1000:1500] == pytest.approx(0.5, abs=1e-3)
+
+
+def test_stitch_wavs_without_parts_writes_silence(tmp_path):
+    out, rate = _read_wav(stitch_wavs([], str(tmp_path / 'out.wav'), total_duration=0.5, sample_rate=8000))
+    assert rate == 8000
+    assert len(out) == 4000
+    assert not out.any()
+
+
+def test_stitch_wavs_rejects_mismatched_rates(tmp_path):
+    a = _write_wav(tmp_path / 'a.wav', np.zeros(100), rate=1000)
+    b = _write_wav(tmp_path / 'b.wav', np.zeros(100), rate=2000)
+    with pytest.raises(Exception, match='Cannot stitch'):
+        stitch_wavs([(0, a), (1, b)], str(tmp_path / 'out.wav'))
+
+
+def test_window_speech_start_moves_back_for_boundary_segments():
+    first, second = plan_windows(1200, window_seconds=600, overlap_seconds=15)
+    assert window_speech_start([{'start': 610}, {'start': 620}], second) == 600
+    assert window_speech_start([{'start': 598}, {'start': 620}], second) == 598
+    assert window_speech_start([], first) == 0
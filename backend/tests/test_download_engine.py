@@ -0,0 +1,86 @@
+import os
+
+import pytest
+
+from services.download_engine import DownloadEngine, RangeNotSatisfiableError, is_output, parse_range
+
+
+@pytest.mark.parametrize('header, expected', [
+    (None, None),
+    ('', None),
+    ('bytes=0-99', (0, 99)),
+    ('bytes=100-', (100, 999)),
+    ('bytes=-100', (900, 999)),
+    ('bytes=-5000', (0, 999)),
+    ('bytes=900-5000', (900, 999)),
+    # Malformed, multi-range and inverted ranges fall back to the whole file
+    ('bytes=-', None),
+    ('items=0-99', None),
+    ('bytes=0-99,200-299', None),
+    ('bytes=500-100', None),
+])
+def test_parse_range(header, expected):
+    assert parse_range(header, 1000) == expected
+
+
+@pytest.mark.parametrize('header', ['bytes=1000-', 'bytes=2000-3000', 'bytes=-0'])
+def test_parse_range_unsatisfiable(header):
+    with pytest.raises(RangeNotSatisfiableError) as error:
+        parse_range(header, 1000)
+    assert error.value.size == 1000
+
+
+def test_is_output():
+    assert is_output('uploads/abc_translated.mp4')
+    assert is_output('uploads/abc_translated.MKV')
+    assert not is_output('uploads/abc.mp4')
+    assert not is_output('uploads/abc_translated.wav')
+    assert not is_output('uploads/abc.speech.wav')
+
+
+@pytest.fixture
+def engine(tmp_path):
+    return DownloadEngine(str(tmp_path), ttl=0, max_completed=0, accel_prefix='')
+
+
+@pytest.fixture
+def output(tmp_path):
+    path = tmp_path / 'video_translated.mp4'
+    path.write_bytes(b'x' * 1000)
+    return str(path)
+
+
+def test_response_serves_range_with_etag(engine, output):
+    response = engine.response(output, range_header='bytes=10-19')
+    assert response.status_code == 206
+    assert response.headers['content-range'] == 'bytes 10-19/1000'
+    assert response.headers['content-length'] == '10'
+    assert response.headers['etag'] == DownloadEngine.etag(os.stat(output))
+
+
+def test_response_not_modified_for_matching_etag(engine, output):
+    etag = DownloadEngine.etag(os.stat(output))
+    assert engine.response(output, if_none_match=f'"other", {etag}').status_code == 304
+    assert engine.response(output, if_none_match='"other"').status_code == 200
+
+
+def test_stale_if_range_sends_whole_file(engine, output):
+    etag = DownloadEngine.etag(os.stat(output))
+    current = engine.response(output, range_header='bytes=0-9', if_range=etag)
+    assert current.status_code == 206
+    stale = engine.response(output, range_header='bytes=0-9', if_range='"stale"')
+    assert stale.status_code == 200
+    assert stale.headers['content-length'] == '1000'
+
+
+def test_etag_changes_when_file_is_rewritten(output):
+    before = DownloadEngine.etag(os.stat(output))
+    os.utime(output, ns=(0, os.stat(output).st_mtime_ns + 1))
+    assert DownloadEngine.etag(os.stat(output)) != before
+
+
+def test_response_rejects_non_outputs(engine, tmp_path):
+    upload = tmp_path / 'video.mp4'
+    upload.write_bytes(b'x')
+    with pytest.raises(ValueError):
+        engine.response(str(upload))
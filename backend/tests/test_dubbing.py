@@ -0,0 +1,100 @@
+import wave
+
+import numpy as np
+import pytest
+
+from services import dubbing
+from services.dubbing import Dubber
+
+
+@pytest.fixture
+def dubber(monkeypatch):
+    # Clips are passed through as raw float32, so no ffmpeg is involved
+    monkeypatch.setattr(dubbing, 'decode_audio_bytes', lambda data, rate: np.frombuffer(data, dtype=np.float32))
+    monkeypatch.setattr(dubbing, 'time_stretch', lambda samples, rate, sample_rate: samples[:int(len(samples) / rate)])
+    return Dubber(lambda texts: [np.full(100, 0.5, dtype=np.float32).tobytes() for _ in texts], sample_rate=100)
+
+
+def _read(path):
+    with wave.open(str(path), 'rb') as wav:
+        return np.frombuffer(wav.readframes(wav.getnframes()), dtype=np.int16) / 32767
+
+
+def test_render_places_segments_at_their_start(dubber, tmp_path):
+    stats = dubber.render([{'start': 1.0, 'end': 2.0, 'translation': 'hola'}], 4.0, str(tmp_path / 'out.wav'))
+    samples = _read(tmp_path / 'out.wav')
+    assert stats['segments'] == 1
+    assert samples[:100] == pytest.approx(0, abs=1e-3)
+    assert samples[100:200] == pytest.approx(0.5, abs=1e-3)
+
+
+@pytest.mark.parametrize('start', [-0.5, -2.0])
+def test_render_trims_segments_starting_before_the_track(dubber, tmp_path, start):
+    dubber.render([{'start': start, 'end': start + 1.0, 'translation': 'hola'}], 2.0, str(tmp_path / 'out.wav'))
+    samples = _read(tmp_path / 'out.wav')
+    assert len(samples) == 201
+    assert samples[:max(0, int((start + 1.0) * 100))] == pytest.approx(0.5, abs=1e-3)
+
+
+def test_render_skips_untranslated_segments(dubber, tmp_path):
+    with pytest.raises(Exception, match='No translated segments'):
+        dubber.render([{'start': 0, 'end': 1, 'translation': '  '}], 1.0, str(tmp_path / 'out.wav'))
+
+
+def _dubber_with_clips(monkeypatch, seconds, max_stretch=1.5):
+    monkeypatch.setattr(dubbing, 'decode_audio_bytes', lambda data, rate: np.frombuffer(data, dtype=np.float32))
+    stretches = []
+
+    def time_stretch(samples, rate, sample_rate):
+        stretches.append(round(rate, 3))
+        return samples[:int(len(samples) / rate)]
+
+    monkeypatch.setattr(dubbing, 'time_stretch', time_stretch)
+    clips = [np.full(int(s * 100), 0.5, dtype=np.float32).tobytes() for s in seconds]
+    dubber = Dubber(lambda texts: clips[:len(texts)], sample_rate=100, max_stretch=max_stretch)
+    return dubber, stretches
+
+
+def test_clip_fitting_before_the_next_segment_is_not_stretched(monkeypatch, tmp_path):
+    dubber, stretches = _dubber_with_clips(monkeypatch, [1.5, 1.0])
+    segments = [{'start': 0.0, 'end': 1.0, 'translation': 'a'}, {'start': 2.0, 'end': 3.0, 'translation': 'b'}]
+
+    stats = dubber.render(segments, 3.0, str(tmp_path / 'out.wav'))
+
+    assert stretches == []
+    assert stats['stretched'] == 0
+
+
+def test_long_clip_is_sped_up_to_its_slot(monkeypatch, tmp_path):
+    dubber, stretches = _dubber_with_clips(monkeypatch, [2.4, 1.0])
+    segments = [{'start': 0.0, 'end': 1.0, 'translation': 'a'}, {'start': 2.0, 'end': 3.0, 'translation': 'b'}]
+
+    stats = dubber.render(segments, 3.0, str(tmp_path / 'out.wav'))
+
+    assert stretches == [1.2]
+    assert stats == {'segments': 2, 'stretched': 1, 'overruns': 0, 'duration': pytest.approx(3.01)}
+
+
+def test_speed_up_is_capped_and_the_rest_overruns(monkeypatch, tmp_path):
+    dubber, stretches = _dubber_with_clips(monkeypatch, [4.0, 1.0], max_stretch=1.5)
+    segments = [{'start': 0.0, 'end': 1.0, 'translation': 'a'}, {'start': 2.0, 'end': 3.0, 'translation': 'b'}]
+
+    stats = dubber.render(segments, 3.0, str(tmp_path / 'out.wav'))
+
+    assert stretches == [1.5]
+    assert stats['overruns'] == 1
+    # The overrunning tail is mixed under the next clip
+    assert _read(tmp_path / 'out.wav')[200:266] == pytest.approx(1.0, abs=1e-3)
+
+
+def test_timeline_grows_for_speech_past_the_video_end(monkeypatch, tmp_path):
+    dubber, _ = _dubber_with_clips(monkeypatch, [3.0], max_stretch=1.0)
+
+    stats = dubber.render([{'start': 1.0, 'end': 2.0, 'translation': 'a'}], 2.0, str(tmp_path / 'out.wav'))
+
+    assert stats['duration'] == pytest.approx(4.0)
+
+
+def test_time_stretch_is_skipped_for_negligible_rates():
+    samples = np.ones(10, dtype=np.float32)
+    assert dubbing.time_stretch(samples, 1.005, 100) is samples
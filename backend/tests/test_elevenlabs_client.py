@@ -0,0 +1,76 @@
+from types import SimpleNamespace
+
+import pytest
+
+from services import elevenlabs_client
+from services.elevenlabs_client import ElevenLabsClient, split_into_chunks
+
+
+def response(status_code, headers=None):
+    return SimpleNamespace(status_code=status_code, headers=headers or {}, text='', content=b'')
+
+
+@pytest.fixture
+def client():
+    return ElevenLabsClient('key', base_url='https://tts.test', max_concurrency=2, max_retries=3, max_retry_after=60)
+
+
+def test_retry_after_is_honoured(client):
+    assert client._retry_delay(response(429, {'Retry-After': '7'}), 0) == 7.0
+
+
+def test_retry_after_is_capped(client):
+    assert client._retry_delay(response(429, {'Retry-After': '86400'}), 0) == 60.0
+    assert client._retry_delay(response(429, {'Retry-After': '-5'}), 0) == 0.0
+
+
+def test_unparseable_retry_after_falls_back_to_backoff(client):
+    delay = client._retry_delay(response(503, {'Retry-After': 'Wed, 21 Oct 2026 07:28:00 GMT'}), 2)
+
+    assert 4.0 <= delay <= 5.0
+
+
+def test_backoff_is_bounded(client):
+    assert client._retry_delay(response(503), 10) == 30.0
+
+
+def test_request_retries_rate_limits_then_returns(client, monkeypatch):
+    replies = [response(429, {'Retry-After': '1'}), response(502), response(200)]
+    sleeps = []
+    monkeypatch.setattr(client.session, 'request', lambda method, url, **kwargs: replies.pop(0))
+    monkeypatch.setattr(elevenlabs_client.time, 'sleep', sleeps.append)
+
+    assert client.request('GET', '/v1/voices').status_code == 200
+    assert len(sleeps) == 2
+    assert sleeps[0] == 1.0
+
+
+def test_request_gives_up_after_max_retries(client, monkeypatch):
+    calls = []
+
+    def reply(method, url, **kwargs):
+        calls.append(url)
+        return response(429, {'Retry-After': '0'})
+
+    monkeypatch.setattr(client.session, 'request', reply)
+    monkeypatch.setattr(elevenlabs_client.time, 'sleep', lambda seconds: None)
+
+    assert client.request('GET', '/v1/voices').status_code == 429
+    assert calls == ['https://tts.test/v1/voices'] * 4
+
+
+def test_chunks_break_on_sentence_boundaries():
+    chunks = split_into_chunks("One two. Three four! Five six?", max_chars=20)
+
+    assert chunks == ["One two. Three four!", "Five six?"]
+
+
+def test_long_sentences_break_on_whitespace_then_mid_word():
+    chunks = split_into_chunks("alpha beta gamma " + "x" * 12, max_chars=10)
+
+    assert all(len(chunk) <= 10 for chunk in chunks)
+    assert chunks == ["alpha beta", "gamma", "x" * 10, "xx"]
+
+
+def test_cjk_sentences_join_without_spaces():
+    assert split_into_chunks("你好。世界。", max_chars=10) == ["你好。世界。"]
@@ -0,0 +1,53 @@
+import sys
+
+import pytest
+
+from services.ffmpeg_executor import FFmpegError, FFmpegExecutor, FFmpegTimeoutError
+
+
+@pytest.fixture
+def executor():
+    return FFmpegExecutor(max_concurrency=2, timeout_factor=3.0, min_timeout=60, unknown_duration_timeout=3600)
+
+
+def test_timeout_scales_with_duration(executor):
+    assert executor.timeout_for(600) == 1800
+
+
+def test_short_media_gets_the_floor(executor):
+    assert executor.timeout_for(5) == 60
+
+
+@pytest.mark.parametrize('duration', [None, 0, -1])
+def test_unknown_duration_gets_the_generous_timeout(executor, duration):
+    assert executor.timeout_for(duration) == 3600
+
+
+def test_unknown_duration_timeout_is_never_below_the_floor():
+    executor = FFmpegExecutor(min_timeout=600, unknown_duration_timeout=300)
+    assert executor.timeout_for(None) == 600
+
+
+def test_captures_stdout_and_records_history(executor):
+    stdout = executor.run([sys.executable, '-c', 'print("ok")'], duration=1, label='probe', capture_stdout=True)
+
+    assert stdout.strip() == b'ok'
+    assert executor.stats()['probe']['count'] == 1
+    assert executor.history[-1]['timeout'] == 60
+
+
+def test_nonzero_exit_raises_with_stderr(executor):
+    with pytest.raises(FFmpegError) as error:
+        executor.run([sys.executable, '-c', 'import sys; sys.stderr.write("bad input"); sys.exit(3)'], label='mux')
+
+    assert error.value.returncode == 3
+    assert 'bad input' in str(error.value)
+
+
+def test_overrunning_process_is_killed():
+    executor = FFmpegExecutor(min_timeout=0.2, timeout_factor=0.1)
+
+    with pytest.raises(FFmpegTimeoutError):
+        executor.run([sys.executable, '-c', 'import time; time.sleep(30)'], duration=1, label='encode')
+
+    assert executor.history[-1]['timed_out']
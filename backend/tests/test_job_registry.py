@@ -0,0 +1,96 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from models import Base
+from services.job_registry import JobRegistry, job_status_payload, result_error
+
+
+@pytest.fixture
+def registry(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'jobs.db'}")
+    Base.metadata.create_all(engine)
+    registry = JobRegistry(sessionmaker(bind=engine), flush_interval=3600)
+    # Progress is flushed explicitly rather than by the background thread
+    registry._ensure_flusher = lambda: None
+    return registry
+
+
+def _create(registry, task_id):
+    registry.create_job(task_id, {'filename': 'talk.mp4', 'file_path': f"uploads/{task_id}.mp4", 'size': 10},
+                        'en', 'french', True)
+
+
+@pytest.mark.parametrize('result, error', [
+    ({'status': 'success', 'result': {'status': 'success'}}, None),
+    ({'status': 'success', 'result': {'status': 'error', 'error': 'TTS failed'}}, 'TTS failed'),
+    ({'status': 'success', 'result': {'status': 'error'}}, 'Unknown error'),
+    ({'status': 'success'}, 'Missing job result'),
+    ({'status': 'error', 'error': 'Worker lost'}, 'Worker lost'),
+    (ValueError('boom'), 'boom'),
+])
+def test_result_error(result, error):
+    assert result_error(result) == error
+
+
+def test_new_jobs_are_queued(registry):
+    _create(registry, 't1')
+    job = registry.get_job('t1')
+    assert job['status'] == 'queued'
+    assert job_status_payload(job) == {'task_id': 't1', 'status': 'queued',
+                                       'progress': {'step': 'waiting', 'percentage': 0}}
+
+
+def test_progress_is_buffered_until_flushed(registry):
+    _create(registry, 't1')
+    registry.record_progress('t1', {'percent': 10, 'current_step': {'name': 'transcription'}})
+    registry.record_progress('t1', {'percent': 30, 'current_step': {'name': 'transcription'}})
+    assert registry.get_job('t1')['status'] == 'queued'
+
+    registry.flush()
+    job = registry.get_job('t1')
+    assert (job['status'], job['progress'], job['current_step']) == ('processing', 30.0, 'transcription')
+    payload = job_status_payload(job)
+    assert payload['percent'] == 30.0
+    assert payload['current_step'] == {'step_number': 2, 'name': 'transcription'}
+
+
+def test_late_progress_cannot_reopen_a_finished_job(registry):
+    _create(registry, 't1')
+    registry.record_result('t1', {'status': 'success', 'result': {'status': 'success', 'video_path': 'out.mp4'}})
+    registry._pending['t1'] = {'b_task_id': 't1', 'status': 'processing', 'progress': 50.0,
+                               'current_step': 'translation', 'updated_at': None}
+    registry.flush()
+
+    job = registry.get_job('t1')
+    assert (job['status'], job['progress'], job['video_path']) == ('completed', 100.0, 'out.mp4')
+
+
+def test_pipeline_errors_are_recorded_as_failures(registry):
+    _create(registry, 't1')
+    registry.record_progress('t1', {'percent': 50})
+    registry.record_result('t1', {'status': 'success', 'result': {'status': 'error', 'error': 'TTS failed'}})
+    registry.flush()
+
+    job = registry.get_job('t1')
+    assert job['status'] == 'error'
+    assert job_status_payload(job) == {'task_id': 't1', 'status': 'error', 'error': 'TTS failed'}
+
+
+def test_list_jobs_filters_by_status(registry):
+    for task_id in ('t1', 't2', 't3'):
+        _create(registry, task_id)
+    registry.record_result('t2', {'status': 'error', 'error': 'boom'})
+
+    assert [job['task_id'] for job in registry.list_jobs('error')] == ['t2']
+    assert sorted(job['task_id'] for job in registry.list_jobs('queued')) == ['t1', 't3']
+    assert len(registry.list_jobs(limit=2)) == 2
+
+
+def test_registry_without_a_database_is_a_no_op(monkeypatch):
+    monkeypatch.delenv('DATABASE_URL', raising=False)
+    registry = JobRegistry()
+    assert not registry.enabled
+    registry.record_progress('t1', {'percent': 10})
+    assert registry.get_job('t1') is None
+    assert registry.list_jobs() == []
@@ -0,0 +1,97 @@
+import pytest
+
+pytest.importorskip('whisper')
+pytest.importorskip('google.generativeai')
+
+from services.model_registry import (  # noqa: E402
+    ModelRegistry, configured_whisper_sizes, default_max_models, select_whisper_size, torch_thread_budget
+)
+
+
+def _loader(name, calls):
+    def load():
+        calls.append(name)
+        return name
+    return load
+
+
+def test_models_load_once_per_key():
+    registry = ModelRegistry(max_models=2)
+    calls = []
+    assert registry.get(('whisper', 'base'), _loader('base', calls)) == 'base'
+    assert registry.get(('whisper', 'base'), _loader('base', calls)) == 'base'
+    assert calls == ['base']
+
+
+def test_least_recently_used_model_is_evicted():
+    registry = ModelRegistry(max_models=2)
+    calls = []
+    registry.get(('a',), _loader('a', calls))
+    registry.get(('b',), _loader('b', calls))
+    registry.get(('a',), _loader('a', calls))
+    registry.get(('c',), _loader('c', calls))
+
+    assert [tuple(model['key']) for model in registry.stats()['models']] == [('a',), ('c',)]
+    registry.get(('b',), _loader('b', calls))
+    assert calls == ['a', 'b', 'c', 'b']
+
+
+def test_pinned_models_are_kept_and_not_counted():
+    registry = ModelRegistry(max_models=1)
+    calls = []
+    registry.get(('whisper', 'base'), _loader('base', calls), pinned=True)
+    registry.get(('translation',), _loader('translation', calls))
+    registry.get(('tts',), _loader('tts', calls))
+
+    keys = [tuple(model['key']) for model in registry.stats()['models']]
+    assert keys == [('whisper', 'base'), ('tts',)]
+
+
+def test_evict_and_clear():
+    registry = ModelRegistry(max_models=2)
+    registry.get(('a',), lambda: 'a')
+    assert registry.evict(('a',))
+    assert not registry.evict(('a',))
+    registry.get(('b',), lambda: 'b', pinned=True)
+    registry.clear()
+    assert registry.stats()['models'] == []
+
+
+def test_default_capacity_follows_local_backends(monkeypatch):
+    for name in ('TRANSLATION_BACKEND', 'TTS_BACKEND', 'SEPARATE_BACKGROUND_AUDIO'):
+        monkeypatch.delenv(name, raising=False)
+    assert default_max_models() == 2
+    monkeypatch.setenv('TRANSLATION_BACKEND', 'local')
+    monkeypatch.setenv('TTS_BACKEND', 'local')
+    monkeypatch.setenv('SEPARATE_BACKGROUND_AUDIO', 'true')
+    assert default_max_models() == 4
+
+
+def test_configured_sizes_default_to_base(monkeypatch):
+    monkeypatch.setenv('WHISPER_MODEL_SIZES', ' small , ,base')
+    assert configured_whisper_sizes() == ['small', 'base']
+    monkeypatch.setenv('WHISPER_MODEL_SIZES', ' , ')
+    assert configured_whisper_sizes() == ['base']
+
+
+def test_whisper_size_follows_duration_rules(monkeypatch):
+    monkeypatch.setenv('WHISPER_MODEL_SIZES', 'tiny')
+    monkeypatch.setenv('WHISPER_SIZE_BY_DURATION', '300:small, 1800:base,bogus')
+
+    assert select_whisper_size(120) == 'small'
+    assert select_whisper_size(300) == 'small'
+    assert select_whisper_size(900) == 'base'
+    assert select_whisper_size(7200) == 'tiny'
+    assert select_whisper_size(None) == 'tiny'
+    assert select_whisper_size(120, requested='medium') == 'medium'
+
+
+def test_thread_budget_splits_cores_across_worker_processes(monkeypatch):
+    monkeypatch.delenv('TORCH_NUM_THREADS', raising=False)
+    monkeypatch.setattr('os.cpu_count', lambda: 8)
+    monkeypatch.setenv('WORKER_CONCURRENCY', '3')
+    assert torch_thread_budget() == 2
+    monkeypatch.setenv('WORKER_CONCURRENCY', '16')
+    assert torch_thread_budget() == 1
+    monkeypatch.setenv('TORCH_NUM_THREADS', '6')
+    assert torch_thread_budget() == 6
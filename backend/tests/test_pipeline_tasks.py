@@ -0,0 +1,78 @@
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip('whisper')
+pytest.importorskip('google.generativeai')
+
+import pipeline_tasks  # noqa: E402
+from celery_app import app  # noqa: E402
+
+STAGES = ['extract_audio_stage', 'transcribe_stage', 'translate_stage', 'tts_stage', 'merge_stage']
+
+
+@pytest.fixture
+def workflows(monkeypatch):
+    """Capture the chains start_pipeline builds instead of sending them to the broker."""
+    started = []
+
+    def chain(*signatures):
+        workflow = SimpleNamespace(signatures=list(signatures))
+        workflow.apply_async = lambda **kwargs: started.append(workflow)
+        return workflow
+
+    monkeypatch.setattr(pipeline_tasks, 'chain', chain)
+    return started
+
+
+def test_every_stage_task_is_routed_to_a_resource_queue():
+    routes = app.conf.task_routes
+    stage_tasks = [name for name in app.tasks if name.startswith('pipeline_tasks.') and name.endswith('_stage')]
+    assert stage_tasks
+    assert all(routes[name]['queue'] in ('ffmpeg', 'cpu', 'io') for name in stage_tasks)
+
+
+def test_pipeline_chains_stages_and_finishes_under_the_job_id(workflows):
+    job_id = pipeline_tasks.start_pipeline('uploads/video.mp4', 'french', job_id='job-1')
+
+    assert job_id == 'job-1'
+    signatures = workflows[0].signatures
+    assert [s.task.split('.')[-1] for s in signatures] == STAGES
+    assert signatures[0].args[0]['video_path'] == 'uploads/video.mp4'
+    assert signatures[-1].options['task_id'] == 'job-1'
+
+
+def test_background_separation_runs_before_merge(workflows):
+    pipeline_tasks.start_pipeline('uploads/video.mp4', 'french', options={'separate_background': True})
+
+    names = [s.task.split('.')[-1] for s in workflows[0].signatures]
+    assert names[-2:] == ['separate_stage', 'merge_stage']
+
+
+def test_local_backends_move_their_stage_to_the_cpu_queue(workflows):
+    pipeline_tasks.start_pipeline('uploads/video.mp4', 'french', options={'translation_backend': 'local'})
+
+    translate, tts = workflows[0].signatures[2:4]
+    assert translate.options['queue'] == 'cpu'
+    assert 'queue' not in tts.options
+
+
+def test_failed_stage_is_retried_with_growing_delay():
+    retries = []
+
+    def retry(exc, countdown):
+        retries.append(countdown)
+        return RuntimeError(str(exc))
+
+    task = SimpleNamespace(request=SimpleNamespace(retries=1), retry=retry)
+    job = {'job_id': 'job-1', 'step_timing': {}}
+
+    def fail():
+        raise ValueError('boom')
+
+    with pytest.raises(RuntimeError):
+        pipeline_tasks._run_stage(task, job, 'transcription', fail)
+    assert retries == [pipeline_tasks.STAGE_RETRY_DELAY * 2]
+
+    pipeline_tasks._run_stage(task, job, 'transcription', lambda: None)
+    assert 'transcription' in job['step_timing']
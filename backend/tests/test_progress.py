@@ -0,0 +1,83 @@
+import pytest
+
+from services import progress as progress_module
+from services.progress import ProgressReporter, parse_ffmpeg_progress
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(progress_module.time, 'time', lambda: now[0])
+    return now
+
+
+def test_stage_percent_maps_into_the_stage_range(clock):
+    sent = []
+    reporter = ProgressReporter(sent.append, min_interval=0)
+    reporter.stage('transcription')
+    reporter.update(0.5, 'half')
+
+    assert [meta['percent'] for meta in sent] == [10, 27]
+    assert sent[1]['current_step'] == {'step_number': 2, 'name': 'transcription', 'progress': 0.5}
+    assert sent[1]['detail'] == 'half'
+
+
+def test_updates_are_throttled_but_stage_changes_are_not(clock):
+    sent = []
+    reporter = ProgressReporter(sent.append, min_interval=2.0)
+    reporter.stage('translation')
+    clock[0] += 1
+    reporter.update(0.5)
+    reporter.stage('speech_generation')
+    clock[0] += 3
+    reporter.update(0.5)
+    reporter.update(0.5)
+
+    assert [meta['percent'] for meta in sent] == [45, 65, 75]
+
+
+def test_unchanged_percent_is_not_resent(clock):
+    sent = []
+    reporter = ProgressReporter(sent.append, min_interval=0)
+    reporter.stage('audio_merge')
+    reporter.update(0.01)
+
+    assert len(sent) == 1
+
+
+def test_fractions_are_clamped_and_trackers_count_units(clock):
+    sent = []
+    reporter = ProgressReporter(sent.append, min_interval=0)
+    reporter.stage('speech_generation')
+    reporter.update(7)
+    assert sent[-1]['percent'] == 85
+
+    reporter.stage('translation')
+    reporter.tracker('batches')(1, 4)
+    assert sent[-1]['detail'] == '1/4 batches'
+    assert sent[-1]['percent'] == 48
+
+
+def test_failing_callback_does_not_raise(clock):
+    def fail(meta):
+        raise RuntimeError('backend down')
+
+    reporter = ProgressReporter(fail, min_interval=0)
+    reporter.stage('transcription')
+    reporter.update(0.5)
+
+
+@pytest.mark.parametrize('line, fraction', [
+    ('out_time_us=5000000\n', 0.5),
+    ('out_time_ms=5000000', 0.5),
+    ('out_time_us=20000000', 1.0),
+    ('out_time_us=N/A', None),
+    ('frame=120', None),
+    ('progress=end', None),
+])
+def test_parse_ffmpeg_progress(line, fraction):
+    assert parse_ffmpeg_progress(line, 10.0) == fraction
+
+
+def test_parse_ffmpeg_progress_needs_a_duration():
+    assert parse_ffmpeg_progress('out_time_us=5000000', 0) is None
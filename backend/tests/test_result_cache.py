@@ -0,0 +1,85 @@
+import os
+import time
+
+import pytest
+
+from services.result_cache import USED_SUFFIX, ResultCache, hash_file
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return ResultCache(str(tmp_path / 'cache'), max_bytes=0, enabled=True)
+
+
+def test_make_key_is_stable_and_order_independent():
+    first = ResultCache.make_key('abc', 'translation', {'model': 'm', 'target_language': 'fr'})
+    second = ResultCache.make_key('abc', 'translation', {'target_language': 'fr', 'model': 'm'})
+    assert first == second
+    assert len(first) == 64
+
+
+@pytest.mark.parametrize('other', [
+    ('abd', 'translation', {'model': 'm', 'target_language': 'fr'}),
+    ('abc', 'speech', {'model': 'm', 'target_language': 'fr'}),
+    ('abc', 'translation', {'model': 'm', 'target_language': 'de'}),
+    ('abc', 'translation', {'model': 'm', 'target_language': 'fr', 'transcription': {'model': 'small'}}),
+])
+def test_make_key_changes_with_any_input(other):
+    assert ResultCache.make_key(*other) != ResultCache.make_key(
+        'abc', 'translation', {'model': 'm', 'target_language': 'fr'}
+    )
+
+
+def test_no_params_matches_empty_params():
+    assert ResultCache.make_key('abc', 'audio') == ResultCache.make_key('abc', 'audio', {})
+
+
+def test_json_round_trip_and_miss(cache):
+    cache.store_json('abc', 'transcription', {'model': 'base'}, {'text': 'hello'})
+    assert cache.fetch_json('abc', 'transcription', {'model': 'base'}) == {'text': 'hello'}
+    assert cache.fetch_json('abc', 'transcription', {'model': 'small'}) is None
+    assert cache.fetch_json(None, 'transcription', {'model': 'base'}) is None
+
+
+def test_disabled_cache_never_hits(tmp_path):
+    cache = ResultCache(str(tmp_path / 'cache'), enabled=False)
+    cache.store_json('abc', 'transcription', {}, {'text': 'hello'})
+    assert cache.fetch_json('abc', 'transcription', {}) is None
+
+
+def test_hit_does_not_touch_the_shared_output(cache, tmp_path):
+    output = tmp_path / 'video_translated.mp4'
+    output.write_bytes(b'video')
+    os.utime(output, (1000, 1000))
+    cache.store_file('abc', 'output', {}, str(output))
+
+    restored = cache.fetch_file('abc', 'output', {}, str(tmp_path / 'again_translated.mp4'))
+    assert restored is not None
+    assert os.stat(output).st_mtime == 1000
+
+
+def _set_last_used(cache, stage, when):
+    path = cache._entry_path(ResultCache.make_key('abc', stage, {}), '.json') + USED_SUFFIX
+    os.utime(path, (when, when))
+
+
+def test_eviction_removes_least_recently_used(tmp_path):
+    cache = ResultCache(str(tmp_path / 'cache'), max_bytes=250, enabled=True)
+    now = time.time()
+    for index in range(2):
+        cache.store_json('abc', f"stage{index}", {}, 'x' * 100)
+        _set_last_used(cache, f"stage{index}", now - 200 + index * 100)
+    # Reading stage0 makes stage1 the least recently used
+    assert cache.fetch_json('abc', 'stage0', {}) is not None
+    _set_last_used(cache, 'stage0', now)
+    cache.store_json('abc', 'stage2', {}, 'x' * 100)
+
+    assert cache.fetch_json('abc', 'stage0', {}) is not None
+    assert cache.fetch_json('abc', 'stage1', {}) is None
+    assert cache.fetch_json('abc', 'stage2', {}) is not None
+
+
+def test_hash_file(tmp_path):
+    path = tmp_path / 'data.bin'
+    path.write_bytes(b'abc')
+    assert hash_file(str(path), chunk_size=1) == 'ba7816bf8f01cfea414140de5dae2223b00361a396177a9cb410ff61f20015ad'
@@ -0,0 +1,132 @@
+import time
+
+import pytest
+
+fakeredis = pytest.importorskip('fakeredis')
+
+from services.scheduler import JobScheduler  # noqa: E402
+
+
+@pytest.fixture
+def scheduler(monkeypatch):
+    monkeypatch.setenv('FAIR_SHARE_MAX_ACTIVE', '2')
+    monkeypatch.setenv('SCHEDULER_SLOT_TTL', '3900')
+    dispatched = []
+    scheduler = JobScheduler(dispatched.append)
+    scheduler.server = fakeredis.FakeServer()
+    scheduler._redis = fakeredis.FakeRedis(server=scheduler.server, decode_responses=True)
+    scheduler.dispatched = dispatched
+    return scheduler
+
+
+def _job(task_id, owner='anon:1', lane='standard', cost=60):
+    return {'task_id': task_id, 'owner': owner, 'lane': lane, 'cost': cost}
+
+
+def _ids(scheduler):
+    return [job['task_id'] for job in scheduler.dispatched]
+
+
+def test_owner_is_capped_and_held_jobs_follow_releases(scheduler):
+    admissions = [scheduler.submit(_job(f"t{i}")) for i in range(4)]
+    assert [a['held'] for a in admissions] == [False, False, True, True]
+    assert _ids(scheduler) == ['t0', 't1']
+
+    scheduler.release('t0')
+    assert _ids(scheduler) == ['t0', 't1', 't2']
+    scheduler.release('t1')
+    scheduler.release('t2')
+    assert _ids(scheduler) == ['t0', 't1', 't2', 't3']
+
+
+def test_owners_and_lanes_are_independent(scheduler):
+    for i in range(3):
+        scheduler.submit(_job(f"a{i}", owner='anon:a'))
+    scheduler.submit(_job('b0', owner='anon:b'))
+    scheduler.submit(_job('f0', owner='anon:a', lane='fast'))
+    assert _ids(scheduler) == ['a0', 'a1', 'b0', 'f0']
+    stats = scheduler.stats()
+    assert stats['standard']['held'] == 1
+    assert stats['standard']['active_owners'] == 2
+    assert stats['fast']['active_owners'] == 1
+
+
+def test_release_is_idempotent(scheduler):
+    for i in range(3):
+        scheduler.submit(_job(f"t{i}"))
+    scheduler.release('t0')
+    scheduler.release('t0')
+    assert _ids(scheduler) == ['t0', 't1', 't2']
+    assert scheduler.redis.zcard('sched:standard:active:anon:1') == 2
+
+
+def test_estimated_wait_counts_dispatched_work_only(scheduler):
+    scheduler.submit(_job('t0', cost=100))
+    scheduler.submit(_job('t1', cost=50))
+    scheduler.submit(_job('t2', cost=1000))
+    assert scheduler.lane_stats('standard')['estimated_wait_seconds'] == 150
+    scheduler.release('t0')
+    assert scheduler.lane_stats('standard')['estimated_wait_seconds'] == 1050
+
+
+def test_reconcile_reclaims_slots_of_dead_jobs(scheduler):
+    for i in range(3):
+        scheduler.submit(_job(f"t{i}"))
+    # t0's worker was killed: its slot passes the deadline without a release
+    scheduler.redis.zadd('sched:standard:active:anon:1', {'t0': time.time() - 1})
+    assert scheduler.reconcile() == 1
+    assert _ids(scheduler) == ['t0', 't1', 't2']
+    assert not scheduler.redis.exists('sched:job:t0')
+
+    for task_id in ('t1', 't2'):
+        scheduler.release(task_id)
+    scheduler.reconcile()
+    assert scheduler.redis.keys('sched:*') == []
+
+
+def test_slot_deadline_covers_long_jobs(scheduler):
+    scheduler.submit(_job('t0', cost=5000))
+    deadline = scheduler.redis.zscore('sched:standard:active:anon:1', 't0')
+    assert deadline >= time.time() + 9999
+    assert scheduler.redis.ttl('sched:job:t0') > 10000
+
+
+def test_fast_lane_is_opt_in(monkeypatch):
+    monkeypatch.setattr('services.scheduler.probe_duration', lambda path: 30.0)
+    monkeypatch.delenv('FAST_LANE_MAX_SECONDS', raising=False)
+    assert JobScheduler(lambda job: None).estimate('clip.mp4', False)['lane'] == 'standard'
+    monkeypatch.setenv('FAST_LANE_MAX_SECONDS', '120')
+    estimate = JobScheduler(lambda job: None).estimate('clip.mp4', True)
+    assert estimate['lane'] == 'fast'
+    assert estimate['cost'] == pytest.approx(30 * 1.5 + 30)
+
+
+def test_unprobeable_media_is_standard_with_a_nonzero_cost(monkeypatch):
+    monkeypatch.setattr('services.scheduler.probe_duration', lambda path: 0.0)
+    monkeypatch.setenv('FAST_LANE_MAX_SECONDS', '120')
+    estimate = JobScheduler(lambda job: None).estimate('clip.mp4', False)
+    assert estimate['lane'] == 'standard'
+    assert estimate['cost'] > 0
+
+
+def test_concurrent_submits_cannot_pass_the_cap(scheduler):
+    other = JobScheduler(scheduler.dispatched.append)
+    other._redis = fakeredis.FakeRedis(server=scheduler.server, decode_responses=True)
+    scheduler.submit(_job('t0'))
+
+    deadline = scheduler._deadline
+    raced = []
+
+    def racing_deadline(job):
+        # Another API process claims the last slot between this one's read and its write
+        if not raced:
+            raced.append(other.submit(_job('t1')))
+        return deadline(job)
+
+    scheduler._deadline = racing_deadline
+    admission = scheduler.submit(_job('t2'))
+
+    assert raced[0]['held'] is False
+    assert admission['held'] is True
+    assert _ids(scheduler) == ['t0', 't1']
+    assert scheduler.redis.zcard('sched:standard:active:anon:1') == 2
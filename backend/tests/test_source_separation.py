@@ -0,0 +1,77 @@
+import wave
+
+import numpy as np
+import pytest
+
+pytest.importorskip('whisper')
+pytest.importorskip('google.generativeai')
+
+from services.source_separation import SourceSeparator  # noqa: E402
+
+
+def _write_wav(path, samples: np.ndarray, sample_rate: int):
+    with wave.open(str(path), 'wb') as wav:
+        wav.setnchannels(samples.shape[0])
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes((samples * 32767).astype(np.int16).T.tobytes())
+
+
+def _stream(separator, source, sample_rate, tmp_path):
+    """Run the chunked stream with an identity 'model', returning the output and progress."""
+    _write_wav(tmp_path / 'in.wav', source, sample_rate)
+    progress = []
+    with wave.open(str(tmp_path / 'in.wav'), 'rb') as src, wave.open(str(tmp_path / 'out.wav'), 'wb') as dst:
+        dst.setnchannels(source.shape[0])
+        dst.setsampwidth(2)
+        dst.setframerate(sample_rate)
+        separator._separate_stream(None, src, dst, source.shape[0], progress.append)
+    with wave.open(str(tmp_path / 'out.wav'), 'rb') as out:
+        frames = np.frombuffer(out.readframes(out.getnframes()), dtype=np.int16)
+    return frames.reshape(-1, source.shape[0]).T / 32767, progress
+
+
+@pytest.fixture
+def separator(monkeypatch):
+    separator = SourceSeparator(model_name='TEST', chunk_seconds=1.0, overlap_seconds=0.25)
+    chunks = []
+
+    def accompaniment(model, samples):
+        chunks.append(samples.shape[1])
+        return samples.copy()
+
+    monkeypatch.setattr(separator, '_accompaniment', accompaniment)
+    separator.chunks = chunks
+    return separator
+
+
+@pytest.mark.parametrize('channels', [1, 2])
+def test_crossfaded_chunks_reassemble_the_track(separator, tmp_path, channels):
+    rng = np.random.default_rng(0)
+    source = rng.uniform(-0.5, 0.5, (channels, 3500)).astype(np.float32)
+
+    output, progress = _stream(separator, source, 1000, tmp_path)
+
+    assert output.shape == source.shape
+    assert output == pytest.approx(source, abs=2e-4)
+    assert max(separator.chunks) == 1000
+    assert progress == sorted(progress) and progress[-1] == 1.0
+
+
+def test_track_shorter_than_a_chunk_is_one_pass(separator, tmp_path):
+    source = np.full((2, 400), 0.25, dtype=np.float32)
+
+    output, _ = _stream(separator, source, 1000, tmp_path)
+
+    assert separator.chunks == [400]
+    assert output == pytest.approx(source, abs=2e-4)
+
+
+def test_overlap_is_capped_at_half_a_chunk(monkeypatch, tmp_path):
+    separator = SourceSeparator(model_name='TEST', chunk_seconds=1.0, overlap_seconds=5.0)
+    monkeypatch.setattr(separator, '_accompaniment', lambda model, samples: samples.copy())
+    source = np.full((1, 2600), 0.25, dtype=np.float32)
+
+    output, _ = _stream(separator, source, 1000, tmp_path)
+
+    assert output == pytest.approx(source, abs=2e-4)
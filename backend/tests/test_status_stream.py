@@ -0,0 +1,112 @@
+import asyncio
+import json
+
+import pytest
+
+fakeredis = pytest.importorskip('fakeredis')
+
+from services import status_stream  # noqa: E402
+from services.status_stream import StatusBroadcaster, progress_channel, publish_status, status_payload  # noqa: E402
+
+
+@pytest.fixture
+def server(monkeypatch):
+    server = fakeredis.FakeServer()
+    monkeypatch.setattr(status_stream, '_publisher', fakeredis.FakeRedis(server=server))
+    monkeypatch.setattr(status_stream.aioredis, 'from_url', lambda url: fakeredis.FakeAsyncRedis(server=server))
+    return server
+
+
+def test_pending_task_is_queued():
+    payload = status_payload('t1', 'PENDING', None)
+
+    assert payload['status'] == 'queued'
+    assert payload['progress']['percentage'] == 0
+
+
+def test_processing_task_reports_progress():
+    payload = status_payload('t1', 'PROCESSING', {'percent': 40, 'current_step': {'name': 'translation'}})
+
+    assert payload['status'] == 'processing'
+    assert payload['percent'] == 40
+    assert payload['current_step'] == {'name': 'translation'}
+
+
+def test_successful_pipeline_is_completed():
+    result = {'status': 'success', 'result': {'status': 'success', 'output_path': 'out.mp4'}}
+
+    payload = status_payload('t1', 'SUCCESS', result)
+
+    assert payload['status'] == 'completed'
+    assert payload['result'] == result
+
+
+def test_pipeline_error_returned_as_result_is_an_error():
+    result = {'status': 'success', 'result': {'status': 'error', 'error': 'Transcription failed'}}
+
+    payload = status_payload('t1', 'SUCCESS', result)
+
+    assert payload == {'task_id': 't1', 'status': 'error', 'error': 'Transcription failed'}
+
+
+def test_task_error_result_is_an_error():
+    payload = status_payload('t1', 'SUCCESS', {'status': 'error', 'error': 'Worker lost'})
+
+    assert payload['status'] == 'error'
+    assert payload['error'] == 'Worker lost'
+
+
+def test_failed_task_is_an_error():
+    payload = status_payload('t1', 'FAILURE', ValueError('boom'))
+
+    assert payload == {'task_id': 't1', 'status': 'error', 'error': 'boom'}
+
+
+def test_publish_status_sends_the_payload_on_the_task_channel(server):
+    subscriber = fakeredis.FakeRedis(server=server).pubsub()
+    subscriber.subscribe(progress_channel('t1'))
+    assert subscriber.get_message(timeout=1)['type'] == 'subscribe'
+    publish_status('t1', 'PROCESSING', {'percent': 30})
+
+    message = subscriber.get_message(timeout=1)
+    assert json.loads(message['data'])['percent'] == 30
+
+
+def test_broadcaster_fans_updates_out_and_shares_one_subscription(server):
+    async def run():
+        broadcaster = StatusBroadcaster()
+        first = await broadcaster.subscribe('t1')
+        second = await broadcaster.subscribe('t1')
+        other = await broadcaster.subscribe('t2')
+        publish_status('t1', 'PROCESSING', {'percent': 50})
+        updates = [await asyncio.wait_for(queue.get(), timeout=2) for queue in (first, second)]
+        channels = await broadcaster._client.pubsub_channels()
+
+        await broadcaster.unsubscribe('t1', first)
+        still_watched = 't1' in broadcaster._watchers
+        await broadcaster.unsubscribe('t1', second)
+        await broadcaster.close()
+        return updates, channels, still_watched, other.empty(), broadcaster._watchers
+
+    updates, channels, still_watched, other_empty, watchers = asyncio.run(run())
+    assert [update['percent'] for update in updates] == [50, 50]
+    assert sorted(channels) == [progress_channel('t1').encode(), progress_channel('t2').encode()]
+    assert still_watched
+    assert other_empty
+    assert list(watchers) == ['t2']
+
+
+def test_slow_watchers_keep_only_the_latest_updates(server):
+    async def run():
+        broadcaster = StatusBroadcaster(queue_size=2)
+        queue = await broadcaster.subscribe('t1')
+        for percent in (10, 20, 30):
+            publish_status('t1', 'PROCESSING', {'percent': percent})
+        for _ in range(50):
+            if queue.full() and queue._queue[-1]['percent'] == 30:
+                break
+            await asyncio.sleep(0.02)
+        await broadcaster.close()
+        return [queue.get_nowait()['percent'] for _ in range(queue.qsize())]
+
+    assert asyncio.run(run()) == [20, 30]
@@ -0,0 +1,81 @@
+import wave
+
+import numpy as np
+import pytest
+
+from services.transcription_engine import (
+    SAMPLE_RATE, TranscriptionEngine, find_windows, load_wav, speech_windows
+)
+
+
+def _tone_with_gaps(seconds: float, gaps: list) -> np.ndarray:
+    """A loud tone of ``seconds`` with silence over each ``(start, end)`` gap."""
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    audio = (0.5 * np.sin(2 * np.pi * 220 * t)).astype(np.float32)
+    for start, end in gaps:
+        audio[int(start * SAMPLE_RATE):int(end * SAMPLE_RATE)] = 0
+    return audio
+
+
+def test_short_audio_is_one_window():
+    assert find_windows(np.zeros(SAMPLE_RATE * 5, np.float32), window_seconds=10) == [(0, SAMPLE_RATE * 5)]
+
+
+def test_windows_cover_the_track_and_cut_at_silence():
+    audio = _tone_with_gaps(25, [(8.5, 9.0), (19.0, 19.5)])
+    windows = find_windows(audio, window_seconds=10, search_seconds=2)
+
+    assert windows[0][0] == 0
+    assert windows[-1][1] == len(audio)
+    assert all(a[1] == b[0] for a, b in zip(windows, windows[1:]))
+    cuts = [end / SAMPLE_RATE for _, end in windows[:-1]]
+    assert 8.5 <= cuts[0] <= 9.0
+    assert 19.0 <= cuts[1] <= 19.5
+
+
+def test_speech_windows_merge_close_regions_and_skip_long_silence():
+    audio = np.zeros(SAMPLE_RATE * 60, np.float32)
+    windows = speech_windows(audio, [[1.0, 3.0], [4.0, 6.0], [30.0, 32.0]], window_seconds=20, merge_gap=2.0)
+
+    assert windows == [(1 * SAMPLE_RATE, 6 * SAMPLE_RATE), (30 * SAMPLE_RATE, 32 * SAMPLE_RATE)]
+
+
+def test_speech_windows_split_long_regions():
+    audio = _tone_with_gaps(40, [])
+    windows = speech_windows(audio, [[0.0, 40.0]], window_seconds=15)
+
+    assert len(windows) > 2
+    assert windows[0][0] == 0 and windows[-1][1] == len(audio)
+    # Cuts may only move within the default 5 s search range
+    assert all(end - start <= 20 * SAMPLE_RATE for start, end in windows)
+
+
+def test_speech_windows_ignore_regions_past_the_audio():
+    assert speech_windows(np.zeros(SAMPLE_RATE, np.float32), [[5.0, 6.0]], window_seconds=10) == []
+
+
+def test_stitch_orders_windows_and_shifts_timestamps():
+    first = {'text': ' Hello ', 'language': 'en', 'segments': [{'start': 0.0, 'end': 1.0, 'text': 'Hello'}]}
+    second = {'text': 'world', 'language': 'fr', 'segments': [
+        {'start': 0.5, 'end': 1.5, 'text': 'world', 'seek': 0, 'words': [{'word': 'world', 'start': 0.5, 'end': 1.5}]}
+    ]}
+
+    result = TranscriptionEngine._stitch([(1, 60.0, second), (0, 0.0, first)])
+
+    assert result['text'] == 'Hello world'
+    assert result['language'] == 'en'
+    assert [s['id'] for s in result['segments']] == [0, 1]
+    assert result['segments'][1]['start'] == pytest.approx(60.5)
+    assert result['segments'][1]['seek'] == 6000
+    assert result['segments'][1]['words'][0]['end'] == pytest.approx(61.5)
+
+
+def test_load_wav_downmixes_to_float(tmp_path):
+    path = str(tmp_path / 'stereo.wav')
+    with wave.open(path, 'wb') as wav:
+        wav.setnchannels(2)
+        wav.setsampwidth(2)
+        wav.setframerate(SAMPLE_RATE)
+        wav.writeframes(np.array([16384, 0, -16384, -16384], dtype=np.int16).tobytes())
+
+    assert load_wav(path).tolist() == [0.25, -0.5]
@@ -0,0 +1,143 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip('whisper')
+pytest.importorskip('google.generativeai')
+
+from services.translation_engine import (  # noqa: E402
+    LocalTranslationEngine, TranslationEngine, _parse_translations, batch_segments, default_translation_backend,
+    estimate_tokens
+)
+
+
+def _segments(*texts):
+    return [{'id': i, 'start': float(i), 'end': i + 1.0, 'text': text} for i, text in enumerate(texts)]
+
+
+class FakeGemini:
+    """Replies to each prompt with its lines upper-cased, or with ``reply`` when set."""
+
+    def __init__(self, reply=None):
+        self.reply = reply
+        self.prompts = []
+
+    def generate_content(self, prompt):
+        self.prompts.append(prompt)
+        lines = json.loads(prompt.split('Lines: ', 1)[1].strip())
+        if self.reply is not None and len(lines) > 1:
+            return SimpleNamespace(text=self.reply)
+        return SimpleNamespace(text=json.dumps([line.upper() for line in lines]))
+
+
+def test_estimate_tokens():
+    assert estimate_tokens('') == 1
+    assert estimate_tokens('x' * 40) == 11
+
+
+def test_batches_respect_the_token_budget_and_keep_order():
+    segments = _segments(*['x' * 40] * 5)
+    # Each segment costs 11 + 4 tokens
+    batches = batch_segments(segments, token_budget=30)
+
+    assert [len(batch) for batch in batches] == [2, 2, 1]
+    assert [s['id'] for batch in batches for s in batch] == [0, 1, 2, 3, 4]
+
+
+def test_oversized_segment_gets_its_own_batch():
+    batches = batch_segments(_segments('short', 'x' * 400, 'short'), token_budget=20)
+    assert [len(batch) for batch in batches] == [1, 1, 1]
+
+
+@pytest.mark.parametrize('reply', ['["a", "b"]', '```json\n["a", "b"]\n```', ' ```\n["a","b"]```'])
+def test_parse_translations_accepts_plain_and_fenced_json(reply):
+    assert _parse_translations(reply, 2) == ['a', 'b']
+
+
+@pytest.mark.parametrize('reply', ['not json', '{"a": 1}', '["only one"]'])
+def test_parse_translations_rejects_misaligned_replies(reply):
+    assert _parse_translations(reply, 2) is None
+
+
+def test_translations_stay_attached_to_their_segments():
+    engine = TranslationEngine(FakeGemini(), token_budget=10, max_concurrency=2)
+    progress = []
+
+    result = engine.translate_segments(_segments('hello', ' ', 'good morning'), 'french',
+                                       on_progress=lambda done, total: progress.append((done, total)))
+
+    assert [(r['start'], r['text'], r['translation']) for r in result] == [
+        (0.0, 'hello', 'HELLO'), (2.0, 'good morning', 'GOOD MORNING')
+    ]
+    assert progress[-1] == (2, 2)
+
+
+def test_misaligned_batches_are_split_and_retried():
+    model = FakeGemini(reply='["one line for three"]')
+    engine = TranslationEngine(model, token_budget=1000)
+
+    result = engine.translate_segments(_segments('a', 'b', 'c'), 'german')
+
+    assert [r['translation'] for r in result] == ['A', 'B', 'C']
+    assert len(model.prompts) > 1
+
+
+@pytest.mark.parametrize('language, code', [('French', 'fr'), (' german ', 'de'), ('pt', 'pt'), ('Klingon', 'klingon')])
+def test_language_code(language, code):
+    assert LocalTranslationEngine.language_code(language) == code
+
+
+def test_default_backend_is_gemini(monkeypatch):
+    monkeypatch.delenv('TRANSLATION_BACKEND', raising=False)
+    assert default_translation_backend() == 'gemini'
+
+
+class FakeNllbTokenizer:
+    """Records the source language in force when each batch is tokenized."""
+
+    def __init__(self):
+        self.src_lang = None
+        self.calls = []
+
+    def __call__(self, texts, **kwargs):
+        self.calls.append((self.src_lang, list(texts)))
+        return {'texts': list(texts)}
+
+    def convert_tokens_to_ids(self, token):
+        return f"id:{token}"
+
+    def batch_decode(self, output, skip_special_tokens=True):
+        return output
+
+
+class FakeSeq2Seq:
+    def __init__(self):
+        self.mt_tokenizer = FakeNllbTokenizer()
+        self.options = []
+
+    def generate(self, texts, **options):
+        self.options.append(options)
+        return [f"<{text}>" for text in texts]
+
+
+def test_local_engine_batches_by_length_and_steers_languages(monkeypatch):
+    pytest.importorskip('torch')
+    model = FakeSeq2Seq()
+    engine = LocalTranslationEngine(batch_size=2)
+    monkeypatch.setattr(engine, 'load', lambda source, target: model)
+
+    result = engine.translate_segments(_segments('ccc', 'a', 'bb'), 'French', source_language='es')
+
+    assert [r['translation'] for r in result] == ['<ccc>', '<a>', '<bb>']
+    assert model.mt_tokenizer.calls == [('spa_Latn', ['a', 'bb']), ('spa_Latn', ['ccc'])]
+    assert model.options[0]['forced_bos_token_id'] == 'id:fra_Latn'
+
+
+def test_local_engine_rejects_unsupported_pairs(monkeypatch):
+    pytest.importorskip('torch')
+    engine = LocalTranslationEngine()
+    monkeypatch.setattr(engine, 'load', lambda source, target: FakeSeq2Seq())
+
+    with pytest.raises(Exception, match='does not support'):
+        engine.translate_segments(_segments('hello'), 'Klingon')
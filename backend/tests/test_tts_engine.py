@@ -0,0 +1,67 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+pytest.importorskip('whisper')
+pytest.importorskip('google.generativeai')
+
+from services import tts_engine  # noqa: E402
+from services.tts_engine import ElevenLabsTTS, LocalTTS, get_tts_backend, local_tts_supports  # noqa: E402
+
+
+@pytest.mark.parametrize('lang, supported', [
+    ('Spanish', True), ('fra', True), (' german ', True), ('japanese', False), ('rus', False)
+])
+def test_local_tts_languages(lang, supported):
+    assert local_tts_supports(lang) is supported
+
+
+def test_model_name_uses_the_iso_code():
+    tts = LocalTTS(model_template='facebook/mms-tts-{code}')
+    assert tts.model_name('French') == 'facebook/mms-tts-fra'
+    assert tts.model_name('deu') == 'facebook/mms-tts-deu'
+
+
+def test_wav_round_trip_duration():
+    content = LocalTTS._to_wav(np.zeros(8000, dtype=np.float32), 16000)
+    assert LocalTTS.clip_duration(content) == pytest.approx(0.5)
+
+
+def test_elevenlabs_clip_duration_from_bitrate():
+    assert ElevenLabsTTS.clip_duration(b'x' * 32000) == pytest.approx(2.0)
+
+
+def test_backends_are_validated_and_shared(monkeypatch):
+    monkeypatch.setattr(tts_engine, '_backends', {})
+    with pytest.raises(ValueError):
+        get_tts_backend('festival')
+    with pytest.raises(ValueError):
+        get_tts_backend('elevenlabs')
+    assert get_tts_backend('local') is get_tts_backend('LOCAL')
+
+
+def test_batches_come_back_in_input_order(monkeypatch):
+    torch = pytest.importorskip('torch')
+
+    class FakeVits:
+        config = SimpleNamespace(sampling_rate=100)
+
+        def __init__(self):
+            self.batches = []
+            self.tts_tokenizer = lambda texts, **kwargs: {'texts': texts}
+
+        def __call__(self, texts):
+            self.batches.append(texts)
+            lengths = [len(text) for text in texts]
+            waveform = torch.zeros(len(texts), max(lengths))
+            return SimpleNamespace(waveform=waveform, sequence_lengths=torch.tensor(lengths))
+
+    model = FakeVits()
+    tts = LocalTTS(batch_size=2)
+    monkeypatch.setattr(tts, 'load', lambda lang: model)
+
+    clips = tts.synthesize_many(['ccc', 'a', 'bb'], 'spanish')
+
+    assert [round(LocalTTS.clip_duration(clip) * 100) for clip in clips] == [3, 1, 2]
+    assert model.batches == [['a', 'bb'], ['ccc']]
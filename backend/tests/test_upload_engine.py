@@ -0,0 +1,131 @@
+import asyncio
+import hashlib
+import os
+
+import pytest
+
+from services.upload_engine import (
+    UploadBusyError, UploadEngine, UploadNotFoundError, UploadOffsetError, UploadTooLargeError
+)
+
+
+async def _stream(data: bytes, size: int = 4, delay: float = 0):
+    for i in range(0, len(data), size):
+        if delay:
+            await asyncio.sleep(delay)
+        yield data[i:i + size]
+
+
+@pytest.fixture
+def engine(tmp_path):
+    return UploadEngine(str(tmp_path), chunk_size=4, max_size=1000)
+
+
+def test_chunks_append_in_order_and_complete(engine):
+    async def run():
+        session = engine.create_session('clip.mp4', 10)
+        upload_id = session['upload_id']
+        assert (await engine.append_chunk(upload_id, 0, _stream(b'hello')))['received'] == 5
+        assert (await engine.append_chunk(upload_id, 5, _stream(b'world')))['received'] == 10
+        return await engine.complete(upload_id)
+
+    stored = asyncio.run(run())
+    assert stored['sha256'] == hashlib.sha256(b'helloworld').hexdigest()
+    assert stored['file_path'].endswith('.mp4')
+    with open(stored['file_path'], 'rb') as f:
+        assert f.read() == b'helloworld'
+
+
+def test_wrong_offset_reports_expected_offset(engine):
+    async def run():
+        upload_id = engine.create_session('clip.mp4', 10)['upload_id']
+        await engine.append_chunk(upload_id, 0, _stream(b'hello'))
+        await engine.append_chunk(upload_id, 2, _stream(b'xyz'))
+
+    with pytest.raises(UploadOffsetError) as error:
+        asyncio.run(run())
+    assert error.value.expected_offset == 5
+
+
+def test_oversized_chunk_is_rolled_back(engine):
+    async def run():
+        upload_id = engine.create_session('clip.mp4', 6)['upload_id']
+        await engine.append_chunk(upload_id, 0, _stream(b'abc'))
+        with pytest.raises(UploadTooLargeError):
+            await engine.append_chunk(upload_id, 3, _stream(b'defghij'))
+        # The client retries from the last good offset
+        await engine.append_chunk(upload_id, 3, _stream(b'def'))
+        return await engine.complete(upload_id)
+
+    stored = asyncio.run(run())
+    assert stored['sha256'] == hashlib.sha256(b'abcdef').hexdigest()
+
+
+def test_incomplete_upload_cannot_complete(engine):
+    async def run():
+        upload_id = engine.create_session('clip.mp4', 10)['upload_id']
+        await engine.append_chunk(upload_id, 0, _stream(b'hello'))
+        await engine.complete(upload_id)
+
+    with pytest.raises(UploadOffsetError):
+        asyncio.run(run())
+
+
+def test_concurrent_chunks_at_same_offset_do_not_interleave(engine):
+    async def run():
+        upload_id = engine.create_session('clip.mp4', 8)['upload_id']
+        results = await asyncio.gather(
+            engine.append_chunk(upload_id, 0, _stream(b'aaaa', size=1, delay=0.01)),
+            engine.append_chunk(upload_id, 0, _stream(b'bbbb', size=1, delay=0.01)),
+            return_exceptions=True
+        )
+        return upload_id, results
+
+    upload_id, results = asyncio.run(run())
+    assert sum(isinstance(r, UploadBusyError) for r in results) == 1
+    assert engine.get_session(upload_id)['received'] == 4
+    with open(engine._data_path(upload_id), 'rb') as f:
+        assert f.read() in (b'aaaa', b'bbbb')
+
+
+def test_abort_and_unknown_sessions(engine):
+    upload_id = engine.create_session('clip.mp4', 10)['upload_id']
+    engine.abort(upload_id)
+    with pytest.raises(UploadNotFoundError):
+        engine.get_session(upload_id)
+    with pytest.raises(UploadNotFoundError):
+        engine.abort(upload_id)
+    with pytest.raises(UploadNotFoundError):
+        engine.get_session('../../etc/passwd')
+
+
+def test_cleanup_removes_only_idle_sessions(engine):
+    idle = engine.create_session('old.mp4', 10)['upload_id']
+    active = engine.create_session('new.mp4', 10)['upload_id']
+    old = os.path.getmtime(engine._data_path(idle)) - 7200
+    os.utime(engine._data_path(idle), (old, old))
+    session = engine.get_session(idle)
+    session['created_at'] = old
+    engine._save_session(session)
+
+    assert engine.cleanup_stale_sessions(max_age=3600) == 1
+    with pytest.raises(UploadNotFoundError):
+        engine.get_session(idle)
+    assert engine.get_session(active)['received'] == 0
+
+
+def test_cleanup_removes_sessions_whose_data_is_gone(engine):
+    orphan = engine.create_session('lost.mp4', 10)['upload_id']
+    os.remove(engine._data_path(orphan))
+
+    assert engine.cleanup_stale_sessions(max_age=3600) == 1
+    with pytest.raises(UploadNotFoundError):
+        engine.get_session(orphan)
+    assert engine.cleanup_stale_sessions(max_age=3600) == 0
+
+
+def test_session_size_is_validated(engine):
+    with pytest.raises(ValueError):
+        engine.create_session('clip.mp4', 0)
+    with pytest.raises(UploadTooLargeError):
+        engine.create_session('clip.mp4', 1001)
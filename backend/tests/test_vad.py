@@ -0,0 +1,81 @@
+import numpy as np
+import pytest
+
+from services.vad import SAMPLE_RATE, detect_speech, speech_seconds, vad_mode
+
+
+def _track(*parts):
+    """Concatenate ``(seconds, amplitude)`` parts of a 220 Hz tone over faint noise."""
+    rng = np.random.default_rng(0)
+    chunks = []
+    for seconds, amplitude in parts:
+        t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+        noise = rng.normal(0, 0.001, len(t))
+        chunks.append(amplitude * np.sin(2 * np.pi * 220 * t) + noise)
+    return np.concatenate(chunks).astype(np.float32)
+
+
+def test_finds_speech_between_silences():
+    regions = detect_speech(_track((2, 0), (3, 0.5), (2, 0)), mode='energy')
+    assert len(regions) == 1
+    start, end = regions[0]
+    # Widened by VAD_PADDING (0.2 s) on both sides
+    assert start == pytest.approx(1.8, abs=0.05)
+    assert end == pytest.approx(5.2, abs=0.05)
+
+
+def test_bridges_short_pauses_and_splits_long_ones():
+    short_pause = detect_speech(_track((1, 0), (1, 0.5), (0.3, 0), (1, 0.5), (1, 0)), mode='energy')
+    assert len(short_pause) == 1
+    long_pause = detect_speech(_track((1, 0), (1, 0.5), (2, 0), (1, 0.5), (1, 0)), mode='energy')
+    assert len(long_pause) == 2
+
+
+def test_drops_blips_shorter_than_min_speech():
+    assert detect_speech(_track((2, 0), (0.1, 0.5), (2, 0)), mode='energy') == []
+
+
+def test_continuous_speech_is_one_region():
+    regions = detect_speech(_track((5, 0.5)), mode='energy')
+    assert regions == [[0.0, 5.0]]
+
+
+def test_off_mode_and_empty_audio():
+    audio = _track((2, 0))
+    assert detect_speech(audio, mode='off') == [[0.0, 2.0]]
+    assert detect_speech(np.zeros(0, dtype=np.float32), mode='energy') == []
+
+
+def test_regions_are_plain_floats():
+    regions = detect_speech(_track((1, 0), (1, 0.5), (1, 0)), mode='energy')
+    assert all(type(value) is float for region in regions for value in region)
+
+
+def test_speech_seconds():
+    assert speech_seconds([[0.0, 1.5], [3.0, 4.0]]) == pytest.approx(2.5)
+
+
+def test_vad_mode_rejects_unknown(monkeypatch):
+    monkeypatch.setenv('VAD_MODE', 'WEBRTC')
+    assert vad_mode() == 'webrtc'
+    monkeypatch.setenv('VAD_MODE', 'magic')
+    with pytest.raises(ValueError):
+        vad_mode()
+
+
+def test_vad_is_off_by_default(monkeypatch):
+    monkeypatch.delenv('VAD_MODE', raising=False)
+    assert vad_mode() == 'off'
+
+
+def test_keeps_speech_at_the_track_edges():
+    regions = detect_speech(_track((1, 0.5), (2, 0), (1, 0.5)), mode='energy')
+    assert regions[0][0] == 0.0
+    assert regions[-1][1] == pytest.approx(4.0)
+
+
+def test_keeps_quiet_onset_next_to_a_speech_region():
+    # A soft 0.1 s onset is too short to stand alone, but sits inside the gate's bridged pause
+    regions = detect_speech(_track((2, 0), (0.1, 0.1), (0.2, 0), (1, 0.5), (2, 0)), mode='energy')
+    assert len(regions) == 1
+    assert regions[0][0] <= 2.0
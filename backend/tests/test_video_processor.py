@@ -0,0 +1,108 @@
+import os
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+pytest.importorskip('whisper')
+pytest.importorskip('google.generativeai')
+
+from services import video_processor  # noqa: E402
+from services.chunking import plan_windows  # noqa: E402
+from services.video_processor import VideoProcessor  # noqa: E402
+
+
+@pytest.fixture
+def processor(monkeypatch):
+    monkeypatch.setenv('TTS_BACKEND', 'local')
+    processor = VideoProcessor()
+    processor.tts = lambda backend=None: SimpleNamespace(name='local', supports_voice_cloning=False)
+    processor.extract_audio_array = lambda path, start=0, duration=None, **kwargs: np.zeros(16000, np.float32)
+    processor.translate_segments = lambda transcription, lang, on_progress=None, backend=None: {
+        'text': ' '.join(s['text'] for s in transcription['segments']),
+        'segments': [dict(s, translation=s['text'].upper()) for s in transcription['segments']]
+    }
+    return processor
+
+
+def test_process_window_starts_speech_at_boundary_segment(processor, tmp_path):
+    second = plan_windows(1200, window_seconds=600, overlap_seconds=15)[1]
+    # Read from 585 s: this segment runs 597-605 s, so the second window owns it by its midpoint
+    processor.transcribe_audio = lambda samples, **kwargs: {
+        'language': 'en',
+        'segments': [{'start': 12.0, 'end': 20.0, 'text': 'crossing'}, {'start': 30.0, 'end': 32.0, 'text': 'next'}]
+    }
+    rendered = {}
+
+    def synthesize(translation, lang, duration, **kwargs):
+        rendered.update(segments=translation['segments'], duration=duration)
+        path = tmp_path / 'speech.tmp.wav'
+        path.write_bytes(b'')
+        return str(path)
+
+    processor.synthesize_translation = synthesize
+    result = processor.process_window('video.mp4', second, 'spanish', str(tmp_path / 'speech.wav'))
+
+    assert result['speech_start'] == pytest.approx(597)
+    assert min(s['start'] for s in rendered['segments']) == pytest.approx(0)
+    assert rendered['duration'] == pytest.approx(1200 - 597)
+    assert [s['text'] for s in result['segments']] == ['crossing', 'next']
+
+
+@pytest.fixture
+def merges(monkeypatch):
+    """Capture the ffmpeg arguments of each merge instead of running it."""
+    commands = []
+    monkeypatch.setattr(video_processor, 'probe_duration', lambda path: 60.0)
+    monkeypatch.setattr(video_processor.ffmpeg_executor, 'run',
+                        lambda stream, **kwargs: commands.append(stream.get_args()))
+    return commands
+
+
+def _option(args, name):
+    return [args[i + 1] for i, arg in enumerate(args) if arg == name]
+
+
+def test_merge_copies_video_and_encodes_only_the_speech(processor, merges):
+    output = processor.merge_audio_video('media/talk.mov', 'media/speech.wav')
+
+    args = merges[0]
+    assert output == 'media/talk_translated.mp4'
+    assert _option(args, '-map') == ['0:v:0', '1:a:0']
+    assert _option(args, '-vcodec') == ['copy']
+    assert _option(args, '-acodec') == ['aac']
+    assert _option(args, '-movflags') == ['+faststart']
+    assert _option(args, '-disposition:a:0') == ['default']
+
+
+def test_merge_can_keep_the_original_audio_as_a_second_track(processor, merges):
+    processor.merge_audio_video('media/talk.mp4', 'media/speech.wav', keep_original_audio=True)
+
+    args = merges[0]
+    assert _option(args, '-map') == ['0:v:0', '1:a:0', '0:a:0?']
+    assert _option(args, '-metadata:s:a:1') == ['title=Original']
+
+
+def test_merge_reads_chunk_lists_through_the_concat_demuxer(processor, merges):
+    processor.merge_audio_video('media/talk.mp4', 'media/speech.ffconcat')
+
+    args = merges[0]
+    list_input = args.index('media/speech.ffconcat')
+    assert args[list_input - 5:list_input] == ['-f', 'concat', '-safe', '0', '-i']
+
+
+def test_chunk_list_escapes_quotes_and_lists_every_chunk(processor, monkeypatch, tmp_path):
+    monkeypatch.setattr(video_processor.tempfile, 'tempdir', str(tmp_path / "it's"))
+    (tmp_path / "it's").mkdir()
+    processor.tts = lambda backend=None: SimpleNamespace(
+        name='local', format='wav', max_chunk_chars=20,
+        synthesize_many=lambda chunks, lang, voice_id=None, on_progress=None: [b'a' for _ in chunks]
+    )
+
+    list_path = processor.generate_speech_chunks('One sentence. Another sentence.', 'spanish')
+
+    files = processor._speech_files(list_path)
+    assert len(files) == 3 and files[-1] == list_path
+    assert all(os.path.exists(path) for path in files)
+    with open(list_path) as f:
+        assert "it'\\''s" in f.read()
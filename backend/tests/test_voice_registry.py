@@ -0,0 +1,115 @@
+import contextlib
+import json
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from models import Base, Voice
+from services.voice_registry import VoiceRegistry, speaker_fingerprint
+
+
+def _voice(pitch: float, seconds: float = 3.0, seed: int = 0) -> np.ndarray:
+    """A harmonic-rich 'voice' at ``pitch`` Hz with a little noise."""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * 16000)) / 16000
+    tone = sum(np.sin(2 * np.pi * pitch * k * t) / k for k in range(1, 8))
+    return (0.2 * tone + rng.normal(0, 0.01, len(t))).astype(np.float32)
+
+
+@pytest.fixture
+def sessions(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'voices.db'}")
+    Base.metadata.create_all(engine)
+    return sessionmaker(bind=engine)
+
+
+@pytest.fixture
+def registry(sessions, monkeypatch):
+    monkeypatch.setenv('VOICE_EVICT_MIN_IDLE_SECONDS', '3600')
+    registry = VoiceRegistry(sessions, max_voices=2, match_threshold=0.97)
+    # The Redis lock only serializes workers; a single test process does not need it
+    registry._lock = contextlib.nullcontext
+    return registry
+
+
+def _store(sessions, voice_id, fingerprint, idle_seconds):
+    session = sessions()
+    last_used = datetime.utcnow() - timedelta(seconds=idle_seconds)
+    session.add(Voice(voice_id=voice_id, fingerprint=json.dumps(fingerprint.tolist()), last_used_at=last_used))
+    session.commit()
+    session.close()
+
+
+def _voice_ids(sessions):
+    session = sessions()
+    try:
+        return sorted(voice.voice_id for voice in session.query(Voice))
+    finally:
+        session.close()
+
+
+def test_fingerprint_is_normalized_and_speaker_specific():
+    same = speaker_fingerprint(_voice(120), 16000)
+    again = speaker_fingerprint(_voice(120, seed=1), 16000)
+    other = speaker_fingerprint(_voice(310), 16000)
+
+    assert np.linalg.norm(same) == pytest.approx(1.0)
+    assert float(np.dot(same, again)) > 0.99
+    assert float(np.dot(same, other)) < float(np.dot(same, again))
+
+
+def test_fingerprint_needs_at_least_one_frame():
+    with pytest.raises(ValueError):
+        speaker_fingerprint(np.zeros(100, dtype=np.float32), 16000)
+
+
+def test_matching_speaker_reuses_the_stored_voice(registry, sessions):
+    clones = []
+    first = registry.get_or_clone(_voice(120), 16000, lambda: clones.append(1) or 'voice-a', lambda v: None)
+    second = registry.get_or_clone(_voice(120, seed=1), 16000, lambda: clones.append(1) or 'voice-b', lambda v: None)
+
+    assert first == second == 'voice-a'
+    assert len(clones) == 1
+
+
+def test_least_recently_used_idle_voice_is_evicted_at_the_cap(registry, sessions):
+    unrelated = np.eye(1, 38, 0).ravel()
+    _store(sessions, 'oldest', unrelated, idle_seconds=7200)
+    _store(sessions, 'older', np.eye(1, 38, 1).ravel(), idle_seconds=5000)
+    deleted = []
+
+    voice_id = registry.get_or_clone(_voice(120), 16000, lambda: 'new', deleted.append)
+
+    assert voice_id == 'new'
+    assert deleted == ['oldest']
+    assert _voice_ids(sessions) == ['new', 'older']
+
+
+def test_voices_in_use_are_never_evicted(registry, sessions):
+    _store(sessions, 'busy-1', np.eye(1, 38, 0).ravel(), idle_seconds=10)
+    _store(sessions, 'busy-2', np.eye(1, 38, 1).ravel(), idle_seconds=20)
+
+    voice_id = registry.get_or_clone(_voice(120), 16000, lambda: pytest.fail('must not clone'), lambda v: None)
+
+    assert voice_id is None
+    assert _voice_ids(sessions) == ['busy-1', 'busy-2']
+
+
+def test_failed_provider_delete_keeps_the_row(registry, sessions):
+    _store(sessions, 'stuck', np.eye(1, 38, 0).ravel(), idle_seconds=7200)
+    _store(sessions, 'busy', np.eye(1, 38, 1).ravel(), idle_seconds=10)
+
+    def delete(voice_id):
+        raise RuntimeError('provider down')
+
+    assert registry.get_or_clone(_voice(120), 16000, lambda: 'new', delete) is None
+    assert _voice_ids(sessions) == ['busy', 'stuck']
+
+
+def test_without_a_database_every_call_clones(monkeypatch):
+    monkeypatch.delenv('DATABASE_URL', raising=False)
+    registry = VoiceRegistry()
+    assert registry.get_or_clone(np.zeros(10, dtype=np.float32), 16000, lambda: 'fresh', lambda v: None) == 'fresh'
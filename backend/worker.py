@@ -1,5 +1,11 @@
 from celery import Celery
+from typing import Optional
+from celery.signals import celeryd_after_setup, task_postrun, worker_process_init
 from services.video_processor import VideoProcessor
+from services import model_registry
+from services.job_registry import job_registry
+from services.status_stream import publish_status, report_progress
+from services.ffmpeg_executor import install_revoke_handler
 import os
 from dotenv import load_dotenv
 
@@ -9,6 +15,9 @@ load_dotenv()
 # Get Redis URL from environment variables, fallback to default if not set
 REDIS_URL = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
 
+# Tasks whose result is a job's result
+FINAL_TASKS = ('worker.process_video_task',)
+
 # Initialize Celery
 celery = Celery('video_translator',
              broker=REDIS_URL,
@@ -25,9 +34,47 @@ celery.conf.update(
     task_time_limit=3600,  # 1 hour timeout for tasks
 )
 
+@worker_process_init.connect
+def kill_ffmpeg_on_revoke(**kwargs):
+    """Make revoke(terminate=True) also stop the task's running ffmpeg processes."""
+    install_revoke_handler()
+
+@celeryd_after_setup.connect
+def record_worker_concurrency(sender=None, instance=None, **kwargs):
+    """Expose the pool size to the worker's processes so they split the cores between them."""
+    pool = str(instance.pool_cls).lower()
+    in_process = 'solo' in pool or 'gevent' in pool or 'eventlet' in pool
+    if not os.getenv('WORKER_CONCURRENCY'):
+        os.environ['WORKER_CONCURRENCY'] = '1' if in_process else str(instance.concurrency)
+    if 'solo' in pool:
+        # Solo workers run tasks in this process, which never sees worker_process_init
+        model_registry.configure_threads()
+
+@worker_process_init.connect
+def limit_torch_threads(**kwargs):
+    """Cap each forked process's torch threads at its share of the host's cores."""
+    print(f"Using {model_registry.configure_threads()} torch threads in this worker process")
+
+@worker_process_init.connect
+def warm_model_cache(**kwargs):
+    """Load models once per worker process so tasks reuse them."""
+    try:
+        model_registry.warm_up()
+    except Exception as e:
+        # Tasks will load lazily if warm-up fails (e.g. missing API key)
+        print(f"Model warm-up failed: {str(e)}")
+
+@task_postrun.connect
+def publish_final_status(sender=None, task_id=None, retval=None, state=None, **kwargs):
+    """Record a job's final status and push it to stream watchers once its result is stored."""
+    if sender.name in FINAL_TASKS and state in ('SUCCESS', 'FAILURE'):
+        job_registry.record_result(task_id, retval)
+        publish_status(task_id, state, retval)
+
 @celery.task(bind=True)
-def process_video_task(self, file_path: str, target_language: str, preserve_voice: bool = True):
-    """Celery task for processing videos."""
+def process_video_task(self, file_path: str, target_language: str, preserve_voice: bool = True,
+                       content_hash: Optional[str] = None, options: Optional[dict] = None):
+    """Celery task for processing videos; ``options`` carries per-job settings."""
     try:
         # Update task state to processing
         self.update_state(state='PROCESSING',
@@ -36,16 +83,14 @@ def process_video_task(self, file_path: str, target_language: str, preserve_voic
         
         processor = VideoProcessor()
         
-        # Update progress for audio extraction
-        self.update_state(state='PROCESSING',
-                         meta={'current': 'Extracting audio...',
-                               'percent': 20})
-        
-        # Process the video
+        # Process the video, publishing throttled per-stage progress
         result = processor.process_video(
             video_path=file_path,
             target_language=target_language,
-            preserve_voice=preserve_voice
+            preserve_voice=preserve_voice,
+            content_hash=content_hash,
+            progress_callback=lambda meta: report_progress(self, meta),
+            options=options
         )
         
         # Clean up the original file
@@ -50,7 +50,7 @@ Group=ubuntu
 WorkingDirectory=/home/ubuntu/vedi-trans/backend
 Environment="PATH=/home/ubuntu/vedi-trans/venv/bin"
 Environment="PYTHONPATH=/home/ubuntu/vedi-trans/backend"
-ExecStart=/home/ubuntu/vedi-trans/venv/bin/celery -A celery_app worker --loglevel=info
+ExecStart=/home/ubuntu/vedi-trans/venv/bin/celery -A celery_app worker --loglevel=info -Q celery,fast,ffmpeg,cpu,io
 
 [Install]
 WantedBy=multi-user.target
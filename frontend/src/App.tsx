@@ -193,7 +193,7 @@ function App() {
       });
 
       if (response.data.task_id) {
-        await pollTaskStatus(response.data.task_id);
+        watchTaskStatus(response.data.task_id);
       }
     } catch (err: any) {
       console.error('Upload error:', err);
@@ -203,95 +203,137 @@ function App() {
     }
   };
 
-  const pollTaskStatus = async (taskId: string) => {
-    const pollInterval = setInterval(async () => {
-      try {
-        const response = await axios.get(`${API_URL}/api/status/${taskId}`);
-        const status = response.data.status;
-        const currentStepInfo = response.data.current_step;
-        const result = response.data.result;
-        const stepTime = response.data.step_timing;
-
-        console.log('Current step:', currentStepInfo);
-        console.log('Processing status:', status);
-        
-        // Update step timing if available
-        if (stepTime) {
-          setStepTiming(stepTime);
-        }
+  // Applies one status update; returns true once the job has finished
+  const handleStatusUpdate = (data: any): boolean => {
+    const status = data.status;
+    const currentStepInfo = data.current_step;
+    const result = data.result;
+    const stepTime = data.step_timing;
 
-        // Update current step if available
-        if (currentStepInfo) {
-          const stepNumber = currentStepInfo.step_number;
-          updateStepStatus(stepNumber, 'active');
-        }
+    console.log('Current step:', currentStepInfo);
+    console.log('Processing status:', status);
+    
+    // Update step timing if available
+    if (stepTime) {
+      setStepTiming(stepTime);
+    }
 
-        // Check for completion
-        if (status === 'completed' || result?.status === 'success') {
-          clearInterval(pollInterval);
-          setIsProcessing(false);
-          setSuccess(true);
-          updateStepStatus(5, 'completed');
-          
-          if (processingTime > 0) {
-            updateProcessingHistory(processingTime);
-          }
+    // Update current step if available
+    if (currentStepInfo) {
+      const stepNumber = currentStepInfo.step_number;
+      updateStepStatus(stepNumber, 'active');
+    }
 
-          // Set results and download URL
-          if (result) {
-            setMainResults({
-              audio_extraction: {
-                status: 'success',
-                duration: result.audio_duration
-              },
-              transcription: {
-                status: 'success',
-                text: result.transcription?.text,
-                text_length: result.transcription?.text?.length
-              },
-              translation: {
-                status: 'success',
-                original_text: result.transcription?.text,
-                translated_text: result.translation,
-                original_length: result.transcription?.text?.length,
-                translated_length: result.translation?.length
-              },
-              speech_generation: {
-                status: 'success',
-                duration: result.audio_duration
-              },
-              audio_merge: {
-                status: 'success',
-                file_path: result.video_path,
-                size: result.file_size
-              }
-            });
-            setDownloadUrl(result.video_path);
-          } else {
-            setError('Video processing completed but no results available');
+    // Check for completion
+    if (status === 'completed' || result?.status === 'success') {
+      setIsProcessing(false);
+      setSuccess(true);
+      updateStepStatus(5, 'completed');
+      
+      if (processingTime > 0) {
+        updateProcessingHistory(processingTime);
+      }
+
+      // Set results and download URL
+      if (result) {
+        setMainResults({
+          audio_extraction: {
+            status: 'success',
+            duration: result.audio_duration
+          },
+          transcription: {
+            status: 'success',
+            text: result.transcription?.text,
+            text_length: result.transcription?.text?.length
+          },
+          translation: {
+            status: 'success',
+            original_text: result.transcription?.text,
+            translated_text: result.translation,
+            original_length: result.transcription?.text?.length,
+            translated_length: result.translation?.length
+          },
+          speech_generation: {
+            status: 'success',
+            duration: result.audio_duration
+          },
+          audio_merge: {
+            status: 'success',
+            file_path: result.video_path,
+            size: result.file_size
           }
-        } 
-        // Check for error
-        else if (status === 'error' || result?.status === 'error') {
+        });
+        setDownloadUrl(result.video_path);
+      } else {
+        setError('Video processing completed but no results available');
+      }
+      return true;
+    } 
+    // Check for error
+    else if (status === 'error' || result?.status === 'error') {
+      const errorMsg = result?.error || data.error || 'Processing failed';
+      setError(errorMsg);
+      setIsProcessing(false);
+      updateStepStatus(currentStep, 'error');
+      return true;
+    }
+    return false;
+  };
+
+  const handleStatusError = (err: any) => {
+    console.error('Status check error:', err);
+    const errorMessage = err.response?.data?.detail || err.message || 'Failed to check processing status';
+    setError(`Status check failed: ${errorMessage}`);
+    setIsProcessing(false);
+    updateStepStatus(currentStep, 'error');
+  };
+
+  const pollTaskStatus = async (taskId: string) => {
+    const pollInterval = setInterval(async () => {
+      try {
+        const response = await axios.get(`${API_URL}/api/status/${taskId}`);
+        if (handleStatusUpdate(response.data)) {
           clearInterval(pollInterval);
-          const errorMsg = result?.error || response.data.error || 'Processing failed';
-          setError(errorMsg);
-          setIsProcessing(false);
-          updateStepStatus(currentStep, 'error');
         }
       } catch (err: any) {
-        console.error('Status check error:', err);
         clearInterval(pollInterval);
-        const errorMessage = err.response?.data?.detail || err.message || 'Failed to check processing status';
-        setError(`Status check failed: ${errorMessage}`);
-        setIsProcessing(false);
-        updateStepStatus(currentStep, 'error');
+        handleStatusError(err);
       }
     }, 2000);
 
     return () => clearInterval(pollInterval);
   };
 
+  // Follows the job over server-sent events, falling back to polling if the stream fails
+  const watchTaskStatus = (taskId: string) => {
+    if (typeof EventSource === 'undefined') {
+      return pollTaskStatus(taskId);
+    }
+
+    const source = new EventSource(`${API_URL}/api/status/${taskId}/stream`);
+    let finished = false;
+    source.onmessage = (event) => {
+      try {
+        finished = handleStatusUpdate(JSON.parse(event.data));
+      } catch (err: any) {
+        finished = true;
+        handleStatusError(err);
+      }
+      if (finished) {
+        source.close();
+      }
+    };
+    source.onerror = () => {
+      source.close();
+      if (!finished) {
+        console.warn('Status stream unavailable, falling back to polling');
+        pollTaskStatus(taskId);
+      }
+    };
+
+    return () => source.close();
+  };
+
   const handleTest = async () => {
     if (!selectedFile) {
       setError('Please select a file first');